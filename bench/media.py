@@ -0,0 +1,154 @@
+"""Synthetic media and a local HTTP server for offline benchmarks.
+
+Everything is generated from fixed seeds, so every run downloads the same
+bytes. Any path segment named ``<name>`` can be anything: the same content
+is served under every name. yt-dlp names its output after it, so jobs that
+run side by side need names of their own.
+
+    /progressive/<name>.mp4     one file, with Range and ETag support
+    /hls/<name>.m3u8            HLS media playlist (VOD)
+    /hls/<name>/seg<i>.ts       its MPEG-TS segments
+    /page/<name>.html           HTML page embedding the progressive file
+
+yt-dlp's generic extractor handles all of them without network access or
+ffmpeg.
+"""
+from __future__ import annotations
+
+import random
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TS_PACKET = 188
+
+
+def progressive_bytes(size: int, seed: int = 1) -> bytes:
+    # An ftyp box up front so the file sniffs as MP4; the rest is noise
+    head = b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2"
+    return head + random.Random(seed).randbytes(max(0, size - len(head)))
+
+
+def ts_segment(size: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    packets = max(1, size // TS_PACKET)
+    return b"".join(b"\x47" + rng.randbytes(TS_PACKET - 1) for _ in range(packets))
+
+
+class MediaServer:
+    """Serves the synthetic media on 127.0.0.1 from a background thread."""
+
+    def __init__(
+        self,
+        progressive_size: int = 8 * 1024 * 1024,
+        segments: int = 10,
+        segment_size: int = 512 * 1024,
+        segment_seconds: float = 4.0,
+    ):
+        self.progressive = progressive_bytes(progressive_size)
+        self.segments = [ts_segment(segment_size, seed=i) for i in range(segments)]
+        self.segment_seconds = segment_seconds
+        self.hls_size = sum(len(s) for s in self.segments)
+        self.requests = 0
+        self._server: ThreadingHTTPServer | None = None
+
+    @property
+    def base_url(self) -> str:
+        assert self._server is not None, "server not started"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def start(self) -> "MediaServer":
+        media = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self._serve(head=True)
+
+            def do_GET(self):
+                self._serve(head=False)
+
+            def _serve(self, head: bool):
+                media.requests += 1
+                found = media._route(self.path.split("?", 1)[0])
+                if found is None:
+                    self.send_error(404)
+                    return
+                body, ctype = found
+                start, end, status = 0, len(body) - 1, 200
+                m = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+                if m and body:
+                    start = int(m.group(1))
+                    end = min(int(m.group(2)) if m.group(2) else end, len(body) - 1)
+                    if start > end:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{len(body)}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    status = 206
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(end - start + 1))
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("ETag", f'"{len(body):x}"')
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+                self.end_headers()
+                if not head:
+                    try:
+                        self.wfile.write(memoryview(body)[start:end + 1])
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass  # yt-dlp sniffing the first bytes and hanging up
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="bench-media", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MediaServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _route(self, path: str) -> tuple[bytes, str] | None:
+        if re.fullmatch(r"/progressive/[\w-]+\.mp4", path):
+            return self.progressive, "video/mp4"
+        m = re.fullmatch(r"/hls/([\w-]+)\.m3u8", path)
+        if m:
+            return self._playlist(m.group(1)), "application/vnd.apple.mpegurl"
+        m = re.fullmatch(r"/hls/[\w-]+/seg(\d+)\.ts", path)
+        if m and int(m.group(1)) < len(self.segments):
+            return self.segments[int(m.group(1))], "video/mp2t"
+        m = re.fullmatch(r"/page/([\w-]+)\.html", path)
+        if m:
+            html = (
+                f"<!doctype html><html><head><title>{m.group(1)}</title></head><body>"
+                f'<video src="/progressive/{m.group(1)}.mp4" controls></video></body></html>'
+            )
+            return html.encode(), "text/html; charset=utf-8"
+        return None
+
+    def _playlist(self, name: str) -> bytes:
+        # yt-dlp names the file after the playlist, so each name gets its own
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{int(self.segment_seconds)}",
+                 "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:VOD"]
+        for i in range(len(self.segments)):
+            lines += [f"#EXTINF:{self.segment_seconds:.1f},", f"{name}/seg{i}.ts"]
+        lines.append("#EXT-X-ENDLIST")
+        return ("\n".join(lines) + "\n").encode()
@@ -0,0 +1,360 @@
+"""Offline benchmarks for the runner, previews and the UI bridge.
+
+Run from the repository root:
+
+    python bench/run.py                          # everything, both yt-dlp modes
+    python bench/run.py --modes worker -o a.json
+    python bench/run.py --compare a.json         # print changes against an earlier run
+
+Media comes from bench/media.py on 127.0.0.1, so no internet is needed and
+every run downloads the same bytes. ``Api`` and ``Runner`` run headless
+against a fake window, with the data dir pointed at a throwaway folder so
+the probe cache, library and throughput history start empty each time.
+Jobs run with a fixed throughput profile (``balanced`` unless told
+otherwise) rather than ``auto``, which would drift with past results.
+
+Scenarios, each reported under its own key:
+
+- ``bridge``: how fast ``Api._ui_log`` accepts lines and how many reach the
+  window per second. The fake window parses every batch to count lines, a
+  cost the real webview pays too (and more).
+- ``<mode>.probe``: ``Api.probe`` latency, fresh (``refresh=True``) and
+  served from the probe cache, for a direct file, an HLS playlist and an
+  HTML page embedding a video. The first probe is reported on its own
+  (``cold_ms``) since it pays for starting a worker or importing yt-dlp.
+- ``<mode>.runner``: wall time, throughput and per-job latencies for a batch
+  of progressive and HLS downloads queued on the ``Api``'s ``Runner``, which
+  starts with the workers the probes left warm, as it would in the app.
+
+``<mode>`` is ``worker`` (subprocesses, as when run from source) and/or
+``inprocess`` (as in the frozen build). Peak RSS is that of this process
+and of the worker processes, in MB; it is null on Windows.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from media import MediaServer  # noqa: E402
+
+SCHEMA = 1
+MB = 1024 * 1024
+
+
+class FakeWindow:
+    """Stands in for the pywebview window: counts what the bridge delivers."""
+
+    PREFIX = "ui.onBatch("
+
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        self.lines = 0
+        self.skipped = 0
+        self.changed = threading.Event()
+
+    def evaluate_js(self, script: str):
+        self.calls += 1
+        self.bytes += len(script)
+        if script.startswith(self.PREFIX):
+            batch = json.loads(script[len(self.PREFIX):-1])
+            for _, line in batch["lines"]:
+                if line.startswith("[ui] output too fast, skipped "):
+                    self.skipped += int(line.split()[5])
+                else:
+                    self.lines += 1
+        self.changed.set()
+
+    def create_file_dialog(self, *args, **kwargs):
+        return None
+
+
+# ---------- Stats ----------
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"n": 0}
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        # Nearest rank, so small samples report a value that was actually seen
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered) + 0.5) - 1))]
+
+    return {
+        "n": len(ordered),
+        "min": round(ordered[0], 2),
+        "p50": round(pct(50), 2),
+        "p90": round(pct(90), 2),
+        "p99": round(pct(99), 2),
+        "max": round(ordered[-1], 2),
+        "mean": round(statistics.fmean(ordered), 2),
+    }
+
+
+def peak_rss_mb() -> dict:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return {"self": None, "children": None}
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / MB, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit / MB, 1),
+    }
+
+
+# ---------- Scenarios ----------
+
+def bench_bridge(api, window: FakeWindow, lines: int) -> dict:
+    payload = "[download]  42.0% of ~  12.34MiB at    3.21MiB/s ETA 00:03 (frag 17/40)"
+    t0 = time.perf_counter()
+    for i in range(lines):
+        api._ui_log(payload, "bench")
+    produced = time.perf_counter() - t0
+
+    # Delivery is done once every line has either arrived or been reported skipped
+    deadline = time.monotonic() + 60
+    while window.lines + window.skipped < lines and time.monotonic() < deadline:
+        window.changed.wait(0.5)
+        window.changed.clear()
+    delivered = time.perf_counter() - t0
+    return {
+        "lines": lines,
+        "produce_lines_per_s": round(lines / produced),
+        "deliver_lines_per_s": round(window.lines / delivered),
+        "delivered": window.lines,
+        "skipped": window.skipped,
+        "batches": window.calls,
+        "batch_kb": round(window.bytes / max(1, window.calls) / 1024, 1),
+        "drain_s": round(delivered, 3),
+    }
+
+
+def bench_probe(api, server: MediaServer, mode: str, repeat: int) -> dict:
+    urls = {
+        "progressive": server.url(f"/progressive/probe-prog-{mode}.mp4"),
+        "hls": server.url(f"/hls/probe-hls-{mode}.m3u8"),
+        "page": server.url(f"/page/probe-page-{mode}.html"),
+    }
+    t0 = time.perf_counter()
+    res = api.probe(urls["progressive"], refresh=True)
+    cold_ms = (time.perf_counter() - t0) * 1000
+    if not res.get("ok"):
+        raise RuntimeError(f"probe failed: {res.get('error')}")
+
+    report: dict = {"cold_ms": round(cold_ms, 2)}
+    for kind, url in urls.items():
+        fresh, cached, failures = [], [], 0
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            failures += not api.probe(url, refresh=True).get("ok")
+            fresh.append((time.perf_counter() - t0) * 1000)
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            failures += not api.probe(url).get("ok")
+            cached.append((time.perf_counter() - t0) * 1000)
+        report[kind] = {"fresh_ms": percentiles(fresh), "cached_ms": percentiles(cached), "failures": failures}
+    return report
+
+
+def bench_runner(runner, server: MediaServer, mode: str, jobs: int, concurrency: int, profile: str,
+                 out_dir: Path) -> dict:
+    runner.set_max_concurrent(concurrency)
+    runner.set_throughput(profile)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    out_dir.mkdir(parents=True)
+
+    timings: dict[str, dict] = {}
+    done = threading.Semaphore(0)
+    lock = threading.Lock()
+
+    def on_log(job_id, line):
+        if "ERROR" in line or line.startswith("[error]"):
+            with lock:
+                timings[job_id].setdefault("error", line)
+
+    def on_progress(job_id, event):
+        with lock:
+            timings[job_id].setdefault("first_progress", time.perf_counter())
+
+    def on_file(job_id, file):
+        with lock:
+            timings[job_id]["bytes"] += file.get("size") or 0
+
+    def on_done(job_id, code):
+        with lock:
+            timings[job_id].update(end=time.perf_counter(), code=code)
+        done.release()
+
+    urls = []
+    for i in range(jobs):
+        urls.append(("progressive", server.url(f"/progressive/prog-{mode}-{i}.mp4")))
+        urls.append(("hls", server.url(f"/hls/hls-{mode}-{i}.m3u8")))
+
+    t0 = time.perf_counter()
+    for kind, url in urls:
+        with lock:
+            job_id = runner.start_ytdlp(
+                url, str(out_dir), "best", "",
+                on_log=on_log,
+                on_progress=on_progress,
+                on_done=on_done,
+                on_file=on_file,
+            )
+            timings[job_id] = {"kind": kind, "start": time.perf_counter(), "bytes": 0}
+    for _ in urls:
+        if not done.acquire(timeout=300):
+            raise RuntimeError("runner jobs did not finish within 300 s")
+    wall = time.perf_counter() - t0
+
+    report: dict = {
+        "jobs": len(urls),
+        "concurrency": runner.max_concurrent,
+        "profile": profile,
+        "wall_s": round(wall, 3),
+        "failures": sum(1 for t in timings.values() if t["code"] != 0),
+        "errors": sorted({t["error"] for t in timings.values() if t["code"] != 0 and "error" in t}),
+    }
+    total = sum(t["bytes"] for t in timings.values())
+    report["mb"] = round(total / MB, 2)
+    report["mb_per_s"] = round(total / MB / wall, 2)
+    for kind in ("progressive", "hls"):
+        rows = [t for t in timings.values() if t["kind"] == kind]
+        report[kind] = {
+            "job_s": percentiles([t["end"] - t["start"] for t in rows]),
+            "first_progress_ms": percentiles(
+                [(t["first_progress"] - t["start"]) * 1000 for t in rows if "first_progress" in t]
+            ),
+        }
+    return report
+
+
+# ---------- Report ----------
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "-C", str(ROOT), "describe", "--always", "--dirty"],
+            capture_output=True, text=True, timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def flatten(d: dict, prefix: str = "") -> dict[str, float]:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = v
+    return out
+
+
+def compare(old: dict, new: dict) -> None:
+    if old.get("meta", {}).get("params") != new.get("meta", {}).get("params"):
+        print("note: runs used different parameters, deltas may not mean much")
+    a, b = flatten(old.get("results", {})), flatten(new.get("results", {}))
+    width = max((len(k) for k in b), default=10)
+    for key, value in b.items():
+        if key not in a or key.endswith(".n"):
+            continue
+        before = a[key]
+        delta = f"{(value - before) / before * 100:+.1f}%" if before else ""
+        print(f"{key:<{width}}  {before:>12}  ->  {value:>12}  {delta}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for yt-dlp GUI.")
+    parser.add_argument("--modes", default="worker,inprocess", help="comma-separated: worker, inprocess")
+    parser.add_argument("--jobs", type=int, default=4, help="progressive and HLS downloads each, per mode")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--profile", default="balanced", help="throughput profile for jobs")
+    parser.add_argument("--probes", type=int, default=10, help="probes per URL kind, fresh and cached each")
+    parser.add_argument("--lines", type=int, default=200_000, help="log lines pushed through the bridge")
+    parser.add_argument("--size-mb", type=int, default=8, help="size of the progressive file")
+    parser.add_argument("-o", "--out", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--compare", help="earlier report to print deltas against")
+    args = parser.parse_args(argv)
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    if not set(modes) <= {"worker", "inprocess"}:
+        parser.error("--modes takes worker and/or inprocess")
+
+    scratch = Path(tempfile.mkdtemp(prefix="ytdlp-gui-bench-"))
+    # The data dir follows these, and worker processes inherit them
+    os.environ["HOME"] = os.environ["LOCALAPPDATA"] = str(scratch)
+
+    import yt_dlp
+
+    import app
+    from app.api import Api
+
+    params = {k: v for k, v in vars(args).items() if k not in ("out", "compare")}
+    results: dict = {}
+    try:
+        with MediaServer(progressive_size=args.size_mb * MB) as server:
+            api = Api()
+            window = FakeWindow()
+            api.attach_window(window)
+            results["bridge"] = bench_bridge(api, window, args.lines)
+
+            for mode in modes:
+                if mode == "inprocess":
+                    sys.frozen = True
+                try:
+                    results[mode] = {
+                        "probe": bench_probe(api, server, mode, args.probes),
+                        "runner": bench_runner(
+                            api.runner, server, mode, args.jobs, args.concurrency, args.profile, scratch / "out" / mode
+                        ),
+                    }
+                finally:
+                    sys.__dict__.pop("frozen", None)
+            api.runner.pool.shutdown()
+            results["server_requests"] = server.requests
+        results["peak_rss_mb"] = peak_rss_mb()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "schema": SCHEMA,
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "app": app.__version__,
+            "yt_dlp": yt_dlp.version.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "git": git_revision(),
+            "params": params,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    if args.compare:
+        print()
+        compare(json.loads(Path(args.compare).read_text(encoding="utf-8")), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,118 +1,463 @@
 # src/app/api.py
 from __future__ import annotations
 
-import json
+import io
 import os
 import shutil
 import subprocess
 import sys
 import threading
 import time
-import webview
+import uuid
 import app
-from app import deps, updater
-from app.runner import Runner
+from app import archive, bandwidth, deps, handoff, playlist, profiling
+from app.bridge import UiBridge
+from app.cache import ProbeCache, cache_key, normalize_url
+from app.library import Library
+from app.thumbs import ThumbnailCache
+from app.ydlpool import cancellable
+from app.progress import ProgressEvent
+from app.runner import Runner, QUEUED, RUNNING, DONE, FAILED, STOPPED
+
+PROBE_CANCEL_GRACE = 1.0  # seconds a superseded probe's worker gets to stop before it is killed
 
 
 class Api:
     def __init__(self):
         self._window = None
         self.runner = Runner()
-        self.active_job_id: str | None = None
-        self._ui_lock = threading.Lock()
-        self._progress_max = 0.0
+        self._bridge = UiBridge()
+        self.probe_cache = ProbeCache(deps.get_data_dir() / "cache" / "probe")
+        self.thumbs = ThumbnailCache(deps.get_data_dir() / "cache" / "thumbs")
+        self._probes: dict[str, _ProbeFlight] = {}  # cache key -> extraction in flight
+        self._probes_lock = threading.Lock()
+        self.playlists = playlist.PlaylistStore(deps.get_data_dir() / "cache" / "playlists")
+        self._listings: dict[str, dict] = {}  # playlist id -> {"stop": Event, "worker": Worker|None}
+        self._listings_lock = threading.Lock()
+        self.archive = archive.DownloadArchive(deps.get_data_dir() / "archive.txt")
+        self._import: archive.UrlImport | None = None
+        self._job_archive_ids: dict[str, str] = {}
+        self.library = Library(deps.get_data_dir() / "library.sqlite3")
+        self._job_records: dict[str, dict] = {}  # job id -> url, preset, started_at, files
+        self._progress_max: dict[str, float] = {}
+        self._job_out_dirs: dict[str, str] = {}
+        self._batch_results: dict[str, str] = {}  # job id -> final state
         self._last_out_dir = ""
         self._cookies_browser: str = ""
 
     def attach_window(self, window):
         self._window = window
+        self._bridge.attach_window(window)
+
+    def attach_sink(self, sink):
+        """Send UI updates to *sink* as batch dicts instead of a window; see ``app.daemon``."""
+        self._bridge.attach_sink(sink)
+
+    def ui_ready(self):
+        """Called by the UI after its first painted frame; starts the work startup put off.
+
+        Warming a worker (or importing yt-dlp in-process) would otherwise
+        compete with window creation for the CPU.
+        """
+        first = profiling.startup.report is None
+        report = profiling.startup.finish(deps.get_data_dir() / "logs")
+        if first:
+            self._ui_log(profiling.startup.summary())
+        self.warm_up()
+        return {"ok": True, "startup": report}
+
+    def warm_up(self):
+        """Start a worker, or import yt-dlp in-process, so the first job doesn't start cold.
+
+        Also opens the session log, which startup doesn't wait for.
+        """
+        if self._bridge.log_path is None:
+            self._bridge.open_session_log(deps.get_data_dir() / "logs")
+        if _use_inprocess_ytdlp():
+            threading.Thread(target=_preimport_ytdlp, name="ytdlp-preimport", daemon=True).start()
+        else:
+            self.runner.pool.prewarm()
+        return {"ok": True}
 
     # ---------- UI communication ----------
+    # All UI calls go through the bridge so worker threads never block on the
+    # webview; see app.bridge for batching and drop behaviour.
 
-    def _ui_log(self, line: str):
-        if not self._window:
-            return
-        payload = json.dumps(line)
-        with self._ui_lock:
-            self._window.evaluate_js(f"ui.onLog({payload})")
+    def _ui_log(self, line: str, job_id: str = ""):
+        self._bridge.log(line, job_id)
 
-    def _ui_progress(self, pct: float):
-        if not self._window:
-            return
+    def _ui_progress(self, job_id: str, event: ProgressEvent):
+        progress_max = self._progress_max.get(job_id, 0.0)
+        pct = progress_max
+        if event.pct is not None:
+            pct = max(0.0, min(100.0, event.pct))
 
-        pct = max(0.0, min(100.0, pct))
+            if pct >= 99.9 and progress_max < 95.0:
+                return
 
-        if pct >= 99.9 and self._progress_max < 95.0:
-            return
+            if pct < progress_max:
+                pct = progress_max
+            else:
+                self._progress_max[job_id] = pct
 
-        if pct < self._progress_max:
-            pct = self._progress_max
-        else:
-            self._progress_max = pct
+        self._bridge.latest("onProgress", job_id, job_id, dict(event.to_dict(), pct=pct))
 
-        with self._ui_lock:
-            self._window.evaluate_js(f"ui.onProgress({pct})")
+    def _ui_job_update(self, job: dict):
+        self._bridge.emit("onJobUpdate", job)
 
-    def _ui_done(self, code: int):
-        if not self._window:
-            return
-        out_dir_json = json.dumps(self._last_out_dir)
-        with self._ui_lock:
-            self._window.evaluate_js(f"ui.onJobEnd({code}, {out_dir_json})")
+    def _ui_done(self, job_id: str, code: int):
+        out_dir = self._job_out_dirs.get(job_id, self._last_out_dir)
+        self._bridge.emit("onJobEnd", job_id, code, out_dir)
+
+    def _ui_queue_idle(self, summary: dict):
+        self._bridge.emit("onQueueIdle", summary)
 
     # ---------- JS-callable methods ----------
 
     def choose_folder(self):
         assert self._window is not None
+        import webview  # only the GUI needs it; the daemon runs without pywebview
         folders = self._window.create_file_dialog(webview.FileDialog.FOLDER)
         return folders[0] if folders else None
 
-    def start_download(self, url: str, out_dir: str, preset: str = "best", cookies_browser: str = ""):
-        url = (url or "").strip()
+    def save_log(self):
+        """Copy this session's full log (not just what the UI keeps) to a user-chosen file."""
+        assert self._window is not None
+        src = self._bridge.log_path
+        if src is None or not src.exists():
+            return {"ok": False, "error": "No session log available"}
+
+        import webview
+
+        dest = self._window.create_file_dialog(
+            webview.FileDialog.SAVE, save_filename=src.name
+        )
+        if isinstance(dest, (list, tuple)):
+            dest = dest[0] if dest else None
+        if not dest:
+            return {"ok": False, "error": "cancelled"}
+
+        try:
+            self._bridge.flush_log()
+            shutil.copyfile(src, dest)
+            return {"ok": True, "path": str(dest)}
+        except Exception as e:
+            return {"ok": False, "error": repr(e)}
+
+    def start_download(
+        self,
+        url: str,
+        out_dir: str,
+        preset: str = "best",
+        cookies_browser: str = "",
+        force: bool = False,
+    ):
+        """Queue one download, or several if *url* holds whitespace-separated URLs.
+
+        URLs already in the library with the same preset are skipped unless
+        *force* is set; they come back in ``already_downloaded``.
+        """
+        urls = (url or "").split()
         out_dir = (out_dir or "").strip()
 
-        if not url:
+        if not urls:
             return {"ok": False, "error": "Missing URL"}
 
         if not out_dir:
             return {"ok": False, "error": "Select an output folder."}
 
-        if self.active_job_id is not None:
-            return {"ok": False, "error": "A job is already running"}
-
         if cookies_browser:
             self._cookies_browser = cookies_browser.lower()
 
         self._last_out_dir = out_dir
-        self._progress_max = 0.0
 
-        job_id = self.runner.start_ytdlp(
-            url=url,
-            out_dir=out_dir,
-            preset=preset,
-            cookies_browser=self._resolve_cookies(cookies_browser),
-            on_log=self._ui_log,
-            on_progress=self._ui_progress,
-            on_done=self._on_done,
+        already = []
+        if not force:
+            preset_key = (preset or "best").strip().lower()
+            for u in list(urls):
+                hit = self.library.find(u, preset_key)
+                if hit:
+                    urls.remove(u)
+                    already.append(_history_item(hit))
+        if not urls:
+            return {"ok": False, "error": "Already downloaded", "already_downloaded": already}
+
+        job_ids = [self._queue_job(u, out_dir, preset, cookies_browser) for u in urls]
+        return {"ok": True, "job_id": job_ids[0], "job_ids": job_ids, "already_downloaded": already}
+
+    def download_entries(
+        self,
+        playlist_id: str,
+        indexes: list,
+        out_dir: str,
+        preset: str = "best",
+        cookies_browser: str = "",
+    ):
+        """Queue one job per selected playlist entry so they download in parallel."""
+        out_dir = (out_dir or "").strip()
+        if not out_dir:
+            return {"ok": False, "error": "Select an output folder."}
+
+        stored = self.playlists.load(playlist_id)
+        if not stored:
+            return {"ok": False, "error": "Playlist listing expired. Refresh the preview."}
+
+        wanted = {int(i) for i in indexes or ()}
+        entries = [e for e in stored["entries"] if e.get("index") in wanted]
+        if not entries:
+            return {"ok": False, "error": "No entries selected"}
+
+        if cookies_browser:
+            self._cookies_browser = cookies_browser.lower()
+        self._last_out_dir = out_dir
+
+        job_ids = []
+        for entry in entries:
+            if entry.get("url"):
+                job_id = self._queue_job(entry["url"], out_dir, preset, cookies_browser, entry.get("title", ""))
+            else:
+                # Entries without a URL of their own are picked out of the playlist
+                job_id = self._queue_job(
+                    stored["url"], out_dir, preset, cookies_browser,
+                    entry.get("title", ""), str(entry["index"]),
+                )
+            job_ids.append(job_id)
+        return {"ok": True, "job_id": job_ids[0], "job_ids": job_ids}
+
+    def import_urls(self, text: str, out_dir: str, preset: str = "best", cookies_browser: str = ""):
+        """Queue every URL in a pasted block, skipping duplicates and archived ones."""
+        return self._start_import(lambda: io.StringIO(text or ""), False, out_dir, preset, cookies_browser)
+
+    def import_file(self, out_dir: str, preset: str = "best", cookies_browser: str = ""):
+        """Ask for a .txt or .csv file and queue the URLs in it, read as a stream."""
+        assert self._window is not None
+        import webview
+
+        paths = self._window.create_file_dialog(
+            webview.FileDialog.OPEN,
+            file_types=("URL lists (*.txt;*.csv)", "All files (*.*)"),
+        )
+        if not paths:
+            return {"ok": False, "error": "cancelled"}
+        path = paths[0]
+        return self._start_import(
+            lambda: open(path, encoding="utf-8-sig", errors="replace", newline=""),
+            path.lower().endswith(".csv"),
+            out_dir,
+            preset,
+            cookies_browser,
         )
-        self.active_job_id = job_id
-        self._ui_log(f"[api] started job {job_id}")
-        return {"ok": True, "job_id": job_id}
 
-    def stop(self):
-        if not self.active_job_id:
+    def stop_import(self):
+        url_import = self._import
+        if url_import is None:
+            return {"ok": False, "error": "No import running"}
+        url_import.stop()
+        return {"ok": True}
+
+    def stop(self, job_id: str = ""):
+        """Stop one job, or every running and queued job when *job_id* is empty."""
+        if job_id:
+            return {"ok": self.runner.stop(job_id)}
+        url_import = self._import
+        if url_import is not None:
+            url_import.stop()
+        if self.runner.is_idle():
             return {"ok": False, "error": "No active job"}
-        ok = self.runner.stop(self.active_job_id)
-        return {"ok": ok}
+        return {"ok": self.runner.stop_all() > 0}
+
+    def move_job(self, job_id: str, index: int):
+        return {"ok": self.runner.move(job_id, index), "jobs": self.runner.jobs()}
+
+    def set_concurrency(self, n: int = 0):
+        return {"ok": True, "concurrency": self.runner.set_max_concurrent(n)}
+
+    def set_throughput(self, profile: str = ""):
+        """Throughput profile (conservative, balanced, max or auto) for jobs not yet started."""
+        return {"ok": True, "throughput": self.runner.set_throughput(profile)}
 
-    def probe(self, url: str, cookies_browser: str = ""):
+    def set_bandwidth_limit(self, bytes_per_sec: float = 0):
+        """Total speed limit for downloads and background fetches; 0 = unlimited. Applies live."""
+        return {"ok": True, "limit": bandwidth.budget.set_limit(bytes_per_sec)}
+
+    def list_jobs(self):
+        return {
+            "ok": True,
+            "concurrency": self.runner.max_concurrent,
+            "throughput": self.runner.throughput,
+            "bandwidth": bandwidth.budget.status(),
+            "jobs": self.runner.jobs(),
+        }
+
+    def get_metrics(self, fmt: str = "json"):
+        """Download metrics per extractor and host, plus recent jobs; ``fmt="prometheus"`` for text."""
+        store = self.runner.metrics
+        if fmt == "prometheus":
+            return {"ok": True, "text": store.prometheus(), "path": str(store.prom_path)}
+        return {"ok": True, **store.snapshot(), "path": str(store.path)}
+
+    def probe(self, url: str, cookies_browser: str = "", refresh: bool = False, latest: bool = False):
+        """Preview *url*; served from the probe cache unless *refresh* is set.
+
+        Calls for a URL that is already being probed share that probe. With
+        *latest*, this call supersedes earlier *latest* probes of other URLs
+        (the preview box only shows the newest): they are cancelled and
+        answer ``{"ok": False, "cancelled": True}``.
+        """
+        with profiling.span("api.probe", url=url, refresh=refresh) as sp:
+            res = self._probe(url, cookies_browser, refresh, latest)
+            sp.set(ok=bool(res.get("ok")), cached=bool((res.get("preview") or {}).get("cached")))
+        if res.get("ok"):
+            self._attach_thumbnail(res["preview"])
+        return res
+
+    def _attach_thumbnail(self, preview: dict) -> None:
+        # The cached copy goes in the reply; otherwise it arrives via onThumbnail
+        url = preview.get("thumbnail") or ""
+        if not url or not self.thumbs.available():
+            return
+        data_url = self.thumbs.get(url)
+        if data_url:
+            preview["thumbnail_data"] = data_url
+            return
+        preview["thumbnail_pending"] = True
+        self.thumbs.fetch_async(url, lambda data_url: self._bridge.emit("onThumbnail", url, data_url or ""))
+
+    def _probe(self, url: str, cookies_browser: str, refresh: bool, latest: bool = False):
         url = (url or "").strip()
         if not url:
             return {"ok": False, "error": "Missing URL"}
 
-        if _use_inprocess_ytdlp():
-            return self._probe_inprocess(url, cookies_browser)
-        return self._probe_subprocess(url, cookies_browser)
+        cookies = self._resolve_cookies(cookies_browser)
+        t0 = time.time()
+        if not refresh:
+            hit = self.library.find(url)
+            preview = self.probe_cache.get(url, cookies)
+            if preview is None and hit and normalize_url(hit["webpage_url"]) == normalize_url(url):
+                # Downloaded before from this very page: no need to ask the site
+                preview = _library_preview(hit)
+            if preview is not None:
+                preview["took_ms"] = int((time.time() - t0) * 1000)
+                preview["cached"] = True
+                if hit:
+                    preview["downloaded"] = _history_item(hit)
+                return {"ok": True, "preview": preview}
+
+        flight, leader = self._join_probe(cache_key(url, cookies), latest)
+        if not leader:
+            with profiling.span("api.probe.shared"):
+                flight.done.wait()
+            return flight.result_copy()
+
+        res: dict = {"ok": False, "error": "Preview failed"}
+        try:
+            res = self._extract_preview(url, cookies_browser, cookies, flight)
+        finally:
+            self._finish_probe(flight, res)
+        return flight.result_copy()
+
+    def _extract_preview(self, url: str, cookies_browser: str, cookies: str, flight: "_ProbeFlight") -> dict:
+        # Probes can't be metered, but holding a lease shrinks everyone else's share
+        with bandwidth.budget.lease(bandwidth.PROBE), profiling.span("api.probe.extract"):
+            if _use_inprocess_ytdlp():
+                res = self._probe_inprocess(url, cookies_browser, flight)
+            else:
+                res = self._probe_subprocess(url, cookies_browser, flight)
+        if flight.cancel.is_set() and not res.get("ok"):
+            # One that finished anyway still goes in the cache below
+            res = {"ok": False, "error": "Preview cancelled", "cancelled": True}
+
+        info = res.pop("info", None)
+        if res.get("ok"):
+            self.probe_cache.put(url, cookies, res["preview"], info)
+            archive_id = None
+            if info and info.get("extractor_key") and info.get("id"):
+                archive_id = f"{info['extractor_key'].lower()} {info['id']}"
+            hit = self.library.find(url, archive_id=archive_id)
+            if hit:
+                res["preview"]["downloaded"] = _history_item(hit)
+        return res
+
+    def _join_probe(self, key: str, latest: bool) -> tuple["_ProbeFlight", bool]:
+        """The flight probing *key*, and whether the caller has to run it."""
+        with self._probes_lock:
+            superseded = [f for k, f in self._probes.items() if latest and k != key and f.latest]
+            flight = self._probes.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._probes[key] = _ProbeFlight(key, latest)
+            elif not latest:
+                flight.latest = False  # someone else wants the answer too
+        for f in superseded:
+            f.supersede()
+        return flight, leader
+
+    def _finish_probe(self, flight: "_ProbeFlight", res: dict) -> None:
+        with self._probes_lock:
+            if self._probes.get(flight.key) is flight:
+                del self._probes[flight.key]
+        flight.result = res
+        flight.done.set()
+
+    def search_history(self, query: str = "", limit: int = 100, offset: int = 0):
+        """Completed downloads, newest first, filtered by title, uploader or URL."""
+        rows = self.library.search(query, limit, offset)
+        return {"ok": True, "items": [_history_item(r) for r in rows], "total": self.library.count()}
+
+    def delete_history(self, row_id: int):
+        """Forget one download; the file itself is left alone."""
+        return {"ok": self.library.delete(row_id)}
+
+    def list_playlist(self, url: str, cookies_browser: str = "", refresh: bool = False):
+        """List a playlist's entries, resuming a stored listing unless *refresh* is set.
+
+        Returns the entries known so far; the rest arrive through
+        ``onPlaylistEntries`` and end with ``onPlaylistDone``.
+        """
+        url = (url or "").strip()
+        if not url:
+            return {"ok": False, "error": "Missing URL"}
+
+        cookies = self._resolve_cookies(cookies_browser)
+        playlist_id = cache_key(url, cookies)
+
+        with self._listings_lock:
+            running = playlist_id in self._listings
+            if refresh and not running:
+                self.playlists.discard(playlist_id)
+            stored = self.playlists.load(playlist_id) or {}
+            complete = bool(stored.get("complete")) and not running
+            start = not (running or complete)
+            if start:
+                self._listings[playlist_id] = {"stop": threading.Event(), "worker": None}
+
+        entries = stored.get("entries") or []
+        if start:
+            t = threading.Thread(
+                target=self._list_playlist,
+                args=(playlist_id, url, cookies, entries),
+                daemon=True,
+            )
+            t.start()
+
+        return {
+            "ok": True,
+            "playlist_id": playlist_id,
+            "title": stored.get("title") or "",
+            "entries": entries,
+            "complete": complete,
+        }
+
+    def stop_playlist(self, playlist_id: str):
+        with self._listings_lock:
+            listing = self._listings.get(playlist_id)
+        if not listing:
+            return {"ok": False, "error": "Not listing"}
+        listing["stop"].set()
+        worker = listing["worker"]
+        if worker is not None:
+            worker.cancel()
+        return {"ok": True}
 
     def set_cookies_browser(self, browser: str):
         self._cookies_browser = (browser or "").strip().lower()
@@ -145,25 +490,13 @@ class Api:
 
     def install_deps(self):
         def _on_status(text):
-            if not self._window:
-                return
-            payload = json.dumps(text)
-            with self._ui_lock:
-                self._window.evaluate_js(f"ui.onDepStatus({payload})")
+            self._bridge.emit("onDepStatus", text)
 
         def _on_progress(dep, pct):
-            if not self._window:
-                return
-            payload = json.dumps({"dep": dep, "pct": pct})
-            with self._ui_lock:
-                self._window.evaluate_js(f"ui.onDepProgress({payload})")
+            self._bridge.latest("onDepProgress", dep, {"dep": dep, "pct": pct})
 
         def _on_complete(status):
-            if not self._window:
-                return
-            payload = json.dumps(status)
-            with self._ui_lock:
-                self._window.evaluate_js(f"ui.onDepComplete({payload})")
+            self._bridge.emit("onDepComplete", status)
 
         t = threading.Thread(
             target=deps.ensure_deps,
@@ -175,6 +508,8 @@ class Api:
 
     def check_for_updates(self):
         def _run():
+            from app import updater
+
             result: dict[str, dict | None] = {"app": None, "pip": None}
             try:
                 result["app"] = updater.check_for_app_update(app.__version__)
@@ -185,12 +520,8 @@ class Api:
                     result["pip"] = updater.check_pip_updates()
                 except Exception:
                     pass
-            if not self._window:
-                return
             if result["app"] or (result["pip"] and any(result["pip"].values())):
-                payload = json.dumps(result)
-                with self._ui_lock:
-                    self._window.evaluate_js(f"ui.onUpdateAvailable({payload})")
+                self._bridge.emit("onUpdateAvailable", result)
 
         t = threading.Thread(target=_run, daemon=True)
         t.start()
@@ -198,75 +529,314 @@ class Api:
 
     def update_pip_deps(self):
         def _run():
+            from app import updater
+
             ok = updater.run_pip_update(on_log=self._ui_log)
-            if not self._window:
-                return
-            with self._ui_lock:
-                self._window.evaluate_js(f"ui.onPipUpdateComplete({json.dumps(ok)})")
+            self._bridge.emit("onPipUpdateComplete", ok)
 
         t = threading.Thread(target=_run, daemon=True)
         t.start()
         return {"ok": True}
 
+    # ---------- Profiling (debug panel) ----------
+
+    def profiling_status(self):
+        logs = deps.get_data_dir() / "logs"
+        return dict(
+            profiling.status(),
+            ok=True,
+            startup=profiling.startup.report,
+            history=profiling.history(logs)[-10:],
+            folder=str(deps.get_data_dir() / "profiles"),
+        )
+
+    def set_profiling(self, enabled: bool, cpu: bool = False, memory: bool = False):
+        """Start or stop recording spans (and cProfile / tracemalloc); stopping dumps first."""
+        paths = None
+        if enabled:
+            profiling.enable(cpu=cpu, memory=memory)
+        elif profiling.enabled:
+            paths = profiling.dump(deps.get_data_dir() / "profiles")
+            profiling.disable()
+        return dict(self.profiling_status(), paths=paths)
+
+    def dump_profile(self):
+        """Write the spans and snapshots collected so far to a new folder in the data dir."""
+        try:
+            paths = profiling.dump(deps.get_data_dir() / "profiles")
+        except OSError as e:
+            return {"ok": False, "error": repr(e)}
+        return {"ok": True, "paths": paths}
+
     # ---------- Private helpers ----------
 
-    def _on_done(self, code: int):
-        self._progress_max = 0.0
-        self._ui_log(f"[api] job finished with code {code}")
-        self.active_job_id = None
-        self._ui_done(code)
+    def _queue_job(
+        self,
+        url: str,
+        out_dir: str,
+        preset: str,
+        cookies_browser: str,
+        title: str = "",
+        playlist_items: str = "",
+        download_archive: str = "",
+    ) -> str:
+        cookies = self._resolve_cookies(cookies_browser)
+
+        def load_info():
+            return self.probe_cache.get_info(url, cookies, max_age=handoff.MAX_AGE)
+
+        job_id = self.runner.start_ytdlp(
+            url=url,
+            out_dir=out_dir,
+            preset=preset,
+            cookies_browser=cookies,
+            on_log=self._on_job_log,
+            on_progress=self._ui_progress,
+            on_done=self._on_done,
+            on_update=self._on_job_update,
+            title=title,
+            playlist_items=playlist_items,
+            download_archive=download_archive,
+            on_file=self._on_job_file,
+            load_info=None if playlist_items else load_info,
+        )
+        # The job may already be running and have filled in started_at
+        self._job_records.setdefault(job_id, {"files": []}).update(
+            url=url, preset=(preset or "best").strip().lower()
+        )
+        self._job_out_dirs[job_id] = out_dir
+        self._ui_log(f"[api] queued job {job_id}", job_id)
+        return job_id
+
+    def _start_import(self, open_source, is_csv: bool, out_dir: str, preset: str, cookies_browser: str):
+        out_dir = (out_dir or "").strip()
+        if not out_dir:
+            return {"ok": False, "error": "Select an output folder."}
+        if self._import is not None:
+            return {"ok": False, "error": "An import is already running"}
+
+        if cookies_browser:
+            self._cookies_browser = cookies_browser.lower()
+        self._last_out_dir = out_dir
+        archive_path = str(self.archive.path)
+
+        def queue(url: str, archive_id: str | None):
+            job_id = self._queue_job(url, out_dir, preset, cookies_browser, download_archive=archive_path)
+            if archive_id:
+                self._job_archive_ids[job_id] = archive_id
+
+        def on_progress(stats: dict):
+            self._bridge.latest("onImportProgress", "import", stats)
+
+        def _run():
+            try:
+                with open_source() as f:
+                    stats = url_import.run(archive.iter_urls(f, is_csv))
+            except Exception as e:
+                stats = dict(url_import.stats, error=repr(e))
+            self._import = None
+            self._ui_log(
+                f"[import] {stats['read']} read, {stats['queued']} queued, "
+                f"{stats['duplicates']} duplicates, {stats['archived']} already downloaded"
+            )
+            self._bridge.emit("onImportDone", stats)
+            self._check_queue_idle()
+
+        url_import = archive.UrlImport(
+            self.archive,
+            resolve_ids=self._archive_ids,
+            queue=queue,
+            wait_for_room=self._wait_for_import_room,
+            on_progress=on_progress,
+        )
+        self._import = url_import
+        threading.Thread(target=_run, daemon=True).start()
+        return {"ok": True}
+
+    def _archive_ids(self, urls: list[str]) -> list[str | None]:
+        """Archive ids for *urls*; None for all of them if they can't be worked out."""
+        try:
+            if _use_inprocess_ytdlp():
+                return archive.archive_ids(urls)
+            pool = self.runner.pool
+            worker = pool.acquire()
+            try:
+                res = worker.request({"type": "archive_ids", "urls": urls}, timeout=60)
+            finally:
+                pool.release(worker)
+            if res.get("ok"):
+                return res["ids"]
+            self._ui_log(f"[import] archive check failed: {res.get('error')}")
+        except Exception as e:
+            self._ui_log(f"[import] archive check failed: {e!r}")
+        return [None] * len(urls)
+
+    def _wait_for_import_room(self, stop: threading.Event) -> bool:
+        while self.runner.queued_count() >= archive.IMPORT_QUEUE_AHEAD:
+            if stop.wait(0.25):
+                return False
+        return not stop.is_set()
+
+    def _on_job_log(self, job_id: str, line: str):
+        self._ui_log(line, job_id)
+
+    def _on_job_file(self, job_id: str, file: dict):
+        record = self._job_records.get(job_id)
+        if record is not None:
+            record["files"].append(file)
+
+    def _on_done(self, job_id: str, code: int):
+        self._progress_max.pop(job_id, None)
+        archive_id = self._job_archive_ids.pop(job_id, None)
+        if archive_id and code == 0:
+            self.archive.add(archive_id)
+        record = self._job_records.pop(job_id, None)
+        if record and record["files"]:
+            try:
+                self.library.add(record["url"], record["preset"], record["files"], record.get("started_at"))
+            except Exception as e:
+                self._ui_log(f"[library] could not record download: {e!r}", job_id)
+        self._ui_log(f"[api] job finished with code {code}", job_id)
+        self._ui_done(job_id, code)
+
+    def _on_job_update(self, job: dict):
+        self._ui_job_update(job)
+        if job["state"] == RUNNING:
+            self._job_records.setdefault(job["job_id"], {"files": []})["started_at"] = job.get("started_at")
+        if job["state"] in (QUEUED, RUNNING):
+            return
+        self._job_out_dirs.pop(job["job_id"], None)
+        # Jobs stopped before they ran never reach _on_done
+        self._job_records.pop(job["job_id"], None)
+        self._job_archive_ids.pop(job["job_id"], None)
+        self._batch_results[job["job_id"]] = job["state"]
+        self._check_queue_idle()
+
+    def _check_queue_idle(self):
+        # An import may still be about to queue more, so wait for it too
+        if self.runner.is_idle() and self._import is None and self._batch_results:
+            results, self._batch_results = self._batch_results, {}
+            states = list(results.values())
+            self._ui_queue_idle({
+                "done": states.count(DONE),
+                "failed": states.count(FAILED),
+                "stopped": states.count(STOPPED),
+                "out_dir": self._last_out_dir,
+            })
 
     def _resolve_cookies(self, cookies_browser: str = "") -> str:
         return (cookies_browser or self._cookies_browser or "").strip().lower()
 
-    def _probe_subprocess(self, url: str, cookies_browser: str = ""):
-        creationflags = 0
-        if sys.platform.startswith("win"):
-            creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    def _list_playlist(self, playlist_id: str, url: str, cookies_browser: str, entries: list[dict]):
+        listing = self._listings[playlist_id]
+        stop = listing["stop"]
+        start = entries[-1]["index"] if entries else 0
+        count = len(entries)
+        result: dict = {"ok": True, "complete": False}
+
+        ydl_opts: dict = {"quiet": True, "skip_download": True, "socket_timeout": 20}
+        if cookies_browser:
+            ydl_opts["cookiesfrombrowser"] = (cookies_browser,)
 
-        args = [sys.executable, "-m", "yt_dlp"]
+        self.playlists.save_meta(playlist_id, url=url, complete=False)
+        if start:
+            self._ui_log(f"[playlist] resuming listing after entry {start}")
+
+        try:
+            with self.playlists.appending(playlist_id, entries) as add:
+                def on_meta(meta: dict):
+                    self.playlists.save_meta(playlist_id, title=meta.get("title") or "")
+
+                def on_entry(entry: dict):
+                    nonlocal count
+                    count += 1
+                    add(entry)
+                    self._bridge.append("onPlaylistEntries", playlist_id, entry)
+
+                if _use_inprocess_ytdlp():
+                    ydl_opts = self.runner.snapshot_cookies(ydl_opts)
+                    with self.runner.contexts.borrow(ydl_opts) as ydl:
+                        result["complete"] = playlist.enumerate_playlist(
+                            ydl, url, start, on_meta, on_entry, stop.is_set
+                        )
+                else:
+                    pool = self.runner.pool
+                    worker = pool.acquire()
+                    listing["worker"] = worker
+                    try:
+                        ydl_opts = self.runner.snapshot_cookies(ydl_opts, worker=worker)
+
+                        def on_message(msg: dict):
+                            if msg.get("type") == "meta":
+                                on_meta(msg["meta"])
+                            elif msg.get("type") == "entry":
+                                on_entry(msg["entry"])
+
+                        if not stop.is_set():
+                            res = worker.request(
+                                {"type": "playlist", "url": url, "opts": ydl_opts, "start": start},
+                                on_message=on_message,
+                            )
+                            if not res.get("ok"):
+                                raise RuntimeError(res.get("error") or "Listing failed")
+                            result["complete"] = bool(res.get("complete"))
+                    finally:
+                        listing["worker"] = None
+                        pool.release(worker)
+        except Exception as e:
+            result = {"ok": False, "complete": False, "error": str(e) or repr(e)}
+        finally:
+            with self._listings_lock:
+                self._listings.pop(playlist_id, None)
+
+        self.playlists.save_meta(playlist_id, complete=result["complete"], count=count)
+        self._ui_log(f"[playlist] listed {count} entries" + ("" if result["complete"] else " (incomplete)"))
+        self._bridge.emit("onPlaylistDone", playlist_id, dict(result, count=count))
+
+    def _probe_subprocess(self, url: str, cookies_browser: str = "", flight: "_ProbeFlight | None" = None):
+        ydl_opts: dict = {
+            "skip_download": True,
+            "noplaylist": True,
+            "socket_timeout": 20,
+        }
 
         b = self._resolve_cookies(cookies_browser)
         if b:
-            args += ["--cookies-from-browser", b]
-
-        args += ["--dump-single-json", "--no-playlist", "--skip-download", url]
+            ydl_opts["cookiesfrombrowser"] = (b,)
 
+        pool = self.runner.pool
+        worker = pool.acquire()
         try:
             t0 = time.time()
-            proc = subprocess.run(
-                args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                timeout=20,
-                creationflags=creationflags,
-            )
-
-            out = (proc.stdout or "").strip()
-
-            if proc.returncode != 0:
-                last = out.splitlines()[-1] if out else "yt-dlp failed"
-                low = out.lower()
+            ydl_opts = self.runner.snapshot_cookies(ydl_opts, worker=worker)
+            if flight is not None and not flight.attach(worker):
+                return {"ok": False, "error": "Preview cancelled", "cancelled": True}
+            res = worker.request({"type": "probe", "url": url, "opts": ydl_opts}, timeout=20, tag=flight.id if flight else "")
+
+            if not res.get("ok"):
+                last = res.get("error") or "yt-dlp failed"
+                low = last.lower()
                 if "cookies" in low or "sign in" in low or "login" in low:
                     last = "Preview needs cookies. Select a browser in Cookies and retry."
                 return {"ok": False, "error": last}
 
-            data = _extract_first_json(out)
-            if data is None:
+            data = res.get("info")
+            if not isinstance(data, dict):
                 return {"ok": False, "error": "Could not parse preview data. Try switching Cookies, then Refresh."}
 
             took_ms = int((time.time() - t0) * 1000)
-            return {"ok": True, "preview": _build_preview(data, url, took_ms)}
+            return {"ok": True, "preview": _build_preview(data, url, took_ms), "info": data}
 
-        except subprocess.TimeoutExpired:
+        except TimeoutError:
             return {"ok": False, "error": "Preview timed out"}
         except Exception as e:
             return {"ok": False, "error": repr(e)}
+        finally:
+            if flight is not None:
+                flight.attach(None)
+            pool.release(worker)
 
-    def _probe_inprocess(self, url: str, cookies_browser: str = ""):
+    def _probe_inprocess(self, url: str, cookies_browser: str = "", flight: "_ProbeFlight | None" = None):
         try:
             import yt_dlp
 
@@ -280,9 +850,11 @@ class Api:
             b = self._resolve_cookies(cookies_browser)
             if b:
                 ydl_opts["cookiesfrombrowser"] = (b,)
+            ydl_opts = self.runner.snapshot_cookies(ydl_opts)
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:  # type: ignore[arg-type]
-                data: dict = ydl.extract_info(url, download=False)  # type: ignore[assignment]
+            cancelled = flight.cancel.is_set if flight is not None else (lambda: False)
+            with self.runner.contexts.borrow(ydl_opts) as ydl, cancellable(ydl, cancelled):
+                data: dict = playlist.probe_info(ydl, url)  # type: ignore[assignment]
 
             if not data:
                 return {"ok": False, "error": "Preview failed"}
@@ -290,7 +862,7 @@ class Api:
             if data.get("entries"):
                 data = dict(next(iter(data["entries"]), data))
 
-            return {"ok": True, "preview": _build_preview(data, url)}
+            return {"ok": True, "preview": _build_preview(data, url), "info": yt_dlp.YoutubeDL.sanitize_info(data)}
 
         except Exception as e:
             return {"ok": False, "error": repr(e)}
@@ -298,6 +870,49 @@ class Api:
 
 # ---------- Module-level helpers ----------
 
+class _ProbeFlight:
+    """One extraction in flight, shared by every ``probe`` call for its URL."""
+
+    def __init__(self, key: str, latest: bool):
+        self.key = key
+        self.id = uuid.uuid4().hex  # worker tag; a later probe of the same URL may reuse the worker
+        self.latest = latest  # every caller is a preview box that only wants its newest URL
+        self.cancel = threading.Event()
+        self.done = threading.Event()
+        self.result: dict = {}
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def attach(self, worker) -> bool:
+        """Note the worker running the probe (None when done); False if already cancelled."""
+        with self._lock:
+            self._worker = worker
+            return worker is None or not self.cancel.is_set()
+
+    def supersede(self) -> None:
+        with self._lock:
+            self.cancel.set()
+            worker = self._worker
+        if worker is None:
+            return  # in-process: cancellable() stops it at its next request
+        # Cancel keeps the worker warm; kill it if it sits in one long request
+        worker.cancel()
+
+        def _kill_if_stuck():
+            if worker.busy_with == self.id:
+                worker.kill()
+
+        t = threading.Timer(PROBE_CANCEL_GRACE, _kill_if_stuck)
+        t.daemon = True
+        t.start()
+
+    def result_copy(self) -> dict:
+        res = dict(self.result)
+        if isinstance(res.get("preview"), dict):
+            res["preview"] = dict(res["preview"])
+        return res
+
+
 def _build_preview(data: dict, fallback_url: str, took_ms: int = 0) -> dict:
     duration = data.get("duration")
     if not isinstance(duration, int):
@@ -311,10 +926,29 @@ def _build_preview(data: dict, fallback_url: str, took_ms: int = 0) -> dict:
         "webpage_url": data.get("webpage_url") or fallback_url,
         "is_live": bool(data.get("is_live")),
         "extractor": data.get("extractor") or "",
+        "is_playlist": data.get("_type") == "playlist",
+        "playlist_count": data.get("playlist_count"),
         "took_ms": took_ms,
     }
 
 
+def _library_preview(row: dict) -> dict:
+    data = {
+        "title": row["title"],
+        "uploader": row["uploader"],
+        "duration": row["duration"],
+        "thumbnail": row["thumbnail"],
+        "webpage_url": row["webpage_url"],
+        "extractor": row["extractor"],
+    }
+    return _build_preview(data, row["url"])
+
+
+def _history_item(row: dict) -> dict:
+    path = row.get("path") or ""
+    return dict(row, folder=os.path.dirname(path), exists=bool(path) and os.path.exists(path))
+
+
 def _fmt_duration(seconds: int | None) -> str:
     if not seconds or seconds < 0:
         return ""
@@ -324,18 +958,14 @@ def _fmt_duration(seconds: int | None) -> str:
     return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
 
 
-def _extract_first_json(text: str) -> dict | None:
-    if not text:
-        return None
-    i = text.find("{")
-    if i == -1:
-        return None
-    try:
-        obj, _ = json.JSONDecoder().raw_decode(text[i:])
-        return obj if isinstance(obj, dict) else None
-    except Exception:
-        return None
-
-
 def _use_inprocess_ytdlp() -> bool:
     return bool(getattr(sys, "frozen", False))
+
+
+def _preimport_ytdlp() -> None:
+    # In-process mode would otherwise pay for the import on the first probe
+    try:
+        with profiling.span("startup.ytdlp_import"):
+            import yt_dlp  # noqa: F401
+    except Exception as e:
+        print(f"[startup] yt-dlp pre-import failed: {e!r}")
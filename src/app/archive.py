@@ -0,0 +1,156 @@
+"""Download archive and bulk URL import.
+
+The archive is a yt-dlp ``--download-archive`` file (one ``<extractor> <id>``
+per line) that imported jobs pass to yt-dlp, so it records finished
+downloads itself. For imports we also keep the file's ids in a set and
+work out each URL's archive id from the extractor's URL pattern (no
+network), so URLs that are already done are skipped with one set lookup
+before they ever reach the queue.
+"""
+from __future__ import annotations
+
+import csv
+import functools
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from app.cache import normalize_url
+
+IMPORT_CHUNK = 200       # URLs resolved to archive ids per round trip
+IMPORT_QUEUE_AHEAD = 50  # waiting jobs to keep ahead of the runner while importing
+
+
+class DownloadArchive:
+    """Set of archive ids backed by a yt-dlp download archive file.
+
+    The file is read once, on first use. yt-dlp appends to it as imported
+    jobs finish; ``add`` keeps the in-memory set in step without rereading.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._ids: set[str] | None = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, archive_id: str) -> bool:
+        return archive_id in self._load()
+
+    def add(self, archive_id: str) -> None:
+        self._load().add(archive_id)
+
+    def _load(self) -> set[str]:
+        with self._lock:
+            if self._ids is None:
+                ids: set[str] = set()
+                try:
+                    with open(self.path, encoding="utf-8", errors="replace") as f:
+                        ids.update(line.strip() for line in f if line.strip())
+                except OSError:
+                    pass
+                self._ids = ids
+            return self._ids
+
+
+def archive_ids(urls: list[str]) -> list[str | None]:
+    """Archive id of each URL as yt-dlp would record it, or None if it can't be told.
+
+    Uses only the extractors' URL patterns, like yt-dlp's own pre-extraction
+    archive check. Needs yt-dlp, so it runs wherever yt-dlp lives.
+    """
+    from yt_dlp.utils import make_archive_id
+
+    extractors = _extractor_classes()
+    ids: list[str | None] = []
+    for url in urls:
+        archive_id = None
+        for ie in extractors:
+            if ie.suitable(url):
+                temp_id = ie.get_temp_id(url)
+                if temp_id:
+                    archive_id = make_archive_id(ie.ie_key(), temp_id)
+                break
+        ids.append(archive_id)
+    return ids
+
+
+@functools.lru_cache(maxsize=1)
+def _extractor_classes() -> list:
+    from yt_dlp.extractor import gen_extractor_classes
+
+    return list(gen_extractor_classes())
+
+
+def iter_urls(lines: Iterable[str], is_csv: bool = False) -> Iterator[str]:
+    """Yield http(s) URLs from a text block or CSV, one line at a time.
+
+    Text is split on whitespace; in a CSV every cell that is a URL counts.
+    """
+    rows = csv.reader(lines) if is_csv else (line.split() for line in lines)
+    for row in rows:
+        for cell in row:
+            cell = cell.strip()
+            if cell.lower().startswith(("http://", "https://")):
+                yield cell
+
+
+class UrlImport:
+    """Feeds a (possibly huge) stream of URLs into the download queue.
+
+    URLs are read lazily, normalised, deduplicated and checked against the
+    archive in chunks of IMPORT_CHUNK. Only the set of normalised URLs seen
+    so far is kept; nothing is probed up front. *queue* is called once per
+    URL that should be downloaded, and *wait_for_room* blocks until the
+    runner can take more so the queue never holds the whole import.
+    """
+
+    def __init__(
+        self,
+        archive: DownloadArchive,
+        resolve_ids: Callable[[list[str]], list[str | None]],
+        queue: Callable[[str, str | None], None],
+        wait_for_room: Callable[[threading.Event], bool],
+        on_progress: Callable[[dict], None],
+    ):
+        self._archive = archive
+        self._resolve_ids = resolve_ids
+        self._queue = queue
+        self._wait_for_room = wait_for_room
+        self._on_progress = on_progress
+        self.stop_event = threading.Event()
+        self.stats = {"read": 0, "queued": 0, "duplicates": 0, "archived": 0, "stopped": False}
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def run(self, urls: Iterable[str]) -> dict:
+        seen: set[str] = set()
+        chunk: list[str] = []
+        for url in urls:
+            if self.stop_event.is_set():
+                break
+            self.stats["read"] += 1
+            key = normalize_url(url)
+            if key in seen:
+                self.stats["duplicates"] += 1
+                continue
+            seen.add(key)
+            chunk.append(url)
+            if len(chunk) >= IMPORT_CHUNK:
+                self._flush(chunk)
+                chunk = []
+        if chunk and not self.stop_event.is_set():
+            self._flush(chunk)
+        self.stats["stopped"] = self.stop_event.is_set()
+        return dict(self.stats)
+
+    def _flush(self, chunk: list[str]) -> None:
+        for url, archive_id in zip(chunk, self._resolve_ids(chunk)):
+            if archive_id and archive_id in self._archive:
+                self.stats["archived"] += 1
+                continue
+            if not self._wait_for_room(self.stop_event):
+                return
+            self._queue(url, archive_id)
+            self.stats["queued"] += 1
+        self._on_progress(dict(self.stats))
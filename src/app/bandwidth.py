@@ -0,0 +1,195 @@
+"""Global bandwidth budget shared by downloads, probes and background fetches.
+
+Everything that moves bytes takes a lease from ``budget`` for as long as it
+runs. The limit is split between open leases by priority class: probes
+weigh most, then downloads, then background fetches (dependency installs
+and update checks), and leases of the same class get equal shares. The
+limit can change at any time; every open lease is rebalanced at once.
+
+Downloads are throttled from yt-dlp's progress hook, which runs for every
+block written on every path (plain HTTP, and each fragment thread of
+HLS/DASH), so a new share applies mid-transfer. Probe traffic can't be
+metered, so a probe lease only reserves its share while it runs.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+# Priority classes
+PROBE = "probe"
+DOWNLOAD = "download"
+BACKGROUND = "background"
+
+WEIGHTS = {PROBE: 8, DOWNLOAD: 4, BACKGROUND: 1}
+
+MAX_LEAD = 0.25  # seconds a consumer may run ahead of its rate
+SLEEP_SLICE = 0.25  # longest single sleep, so cancels and new rates are noticed
+
+ShareFn = Callable[[float], None]  # bytes/second, 0 = unlimited
+
+
+class TokenBucket:
+    """Rate limiter that can be shared by several threads; a rate of 0 means unlimited."""
+
+    def __init__(self, rate: float = 0.0):
+        self._rate = max(0.0, float(rate or 0))
+        self._due = 0.0  # when everything consumed so far would have gone out at the rate
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def set_rate(self, rate: float) -> None:
+        rate = max(0.0, float(rate or 0))
+        with self._lock:
+            now = time.monotonic()
+            # Bytes already owed are repaid at the new rate
+            if self._due > now and self._rate and rate:
+                self._due = now + (self._due - now) * self._rate / rate
+            elif not rate:
+                self._due = now
+            self._rate = rate
+
+    def consume(self, n: int, cancelled: Callable[[], bool] | None = None) -> None:
+        """Account for *n* bytes, sleeping while the bucket is more than MAX_LEAD ahead."""
+        with self._lock:
+            if self._rate <= 0 or n <= 0:
+                return
+            self._due = max(self._due, time.monotonic()) + n / self._rate
+        while True:
+            with self._lock:
+                wait = self._due - time.monotonic() - MAX_LEAD
+            if wait <= 0 or (cancelled is not None and cancelled()):
+                return
+            time.sleep(min(wait, SLEEP_SLICE))
+
+
+class Lease:
+    """One consumer's claim on the budget; close it when the transfer ends."""
+
+    def __init__(self, owner: "BandwidthBudget", priority: str, on_share: ShareFn | None):
+        self.priority = priority
+        self.bucket = TokenBucket()
+        self._owner = owner
+        self._on_share = on_share
+
+    @property
+    def share(self) -> float:
+        return self.bucket.rate
+
+    def throttle(self, n: int, cancelled: Callable[[], bool] | None = None) -> None:
+        self.bucket.consume(n, cancelled)
+
+    def close(self) -> None:
+        self._owner._release(self)
+
+    def pause(self) -> None:
+        """Hand the share back while not transferring (e.g. during postprocessing)."""
+        self._owner._release(self)
+
+    def resume(self) -> None:
+        self._owner._add(self)
+
+    def _apply(self, share: float) -> None:
+        self.bucket.set_rate(share)
+        if self._on_share is not None:
+            try:
+                self._on_share(share)
+            except Exception as e:
+                print(f"[bandwidth] share callback failed: {e!r}")
+
+    def __enter__(self) -> "Lease":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class BandwidthBudget:
+    def __init__(self, limit: float = 0.0):
+        self._limit = max(0.0, float(limit or 0))
+        self._leases: list[Lease] = []
+        self._lock = threading.Lock()
+        # Serialises rebalances so the newest shares are the ones applied last
+        self._rebalance_lock = threading.Lock()
+
+    @property
+    def limit(self) -> float:
+        return self._limit
+
+    def set_limit(self, limit: float) -> float:
+        """Total bytes/second for everything; 0 removes the limit. Applies to open leases."""
+        self._limit = max(0.0, float(limit or 0))
+        self._rebalance()
+        return self._limit
+
+    def lease(self, priority: str, on_share: ShareFn | None = None) -> Lease:
+        """Open a lease; *on_share* hears its share now and whenever it changes."""
+        if priority not in WEIGHTS:
+            raise ValueError(f"unknown priority {priority!r}")
+        lease = Lease(self, priority, on_share)
+        self._add(lease)
+        return lease
+
+    def status(self) -> dict:
+        with self._lock:
+            counts = {p: sum(1 for lease in self._leases if lease.priority == p) for p in WEIGHTS}
+        return {"limit": self._limit, "leases": counts}
+
+    def _add(self, lease: Lease) -> None:
+        with self._lock:
+            if lease in self._leases:
+                return
+            self._leases.append(lease)
+        self._rebalance()
+
+    def _release(self, lease: Lease) -> None:
+        with self._lock:
+            if lease not in self._leases:
+                return
+            self._leases.remove(lease)
+        self._rebalance()
+
+    def _rebalance(self) -> None:
+        # Share callbacks send to workers, so they run outside ``_lock`` but
+        # under ``_rebalance_lock``; they must not open or close leases
+        with self._rebalance_lock:
+            with self._lock:
+                leases = list(self._leases)
+                limit = self._limit
+            total = sum(WEIGHTS[lease.priority] for lease in leases)
+            for lease in leases:
+                lease._apply(limit * WEIGHTS[lease.priority] / total if limit else 0.0)
+
+
+class ProgressThrottle:
+    """yt-dlp progress hook that charges the bytes written since its last call to *bucket*.
+
+    ``downloaded_bytes`` is a running total per file (fragment downloads
+    keep one total across all their fragment threads), so the cost of a
+    call is the difference from the previous call for the same file.
+    """
+
+    def __init__(self, bucket: TokenBucket, cancelled: Callable[[], bool] | None = None):
+        self._bucket = bucket
+        self._cancelled = cancelled
+        self._seen: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, d: dict) -> None:
+        if d.get("status") != "downloading":
+            return
+        downloaded = d.get("downloaded_bytes") or 0
+        key = d.get("tmpfilename") or d.get("filename") or ""
+        with self._lock:
+            delta = downloaded - self._seen.get(key, 0)
+            if delta > 0:
+                self._seen[key] = downloaded
+        if delta > 0:
+            self._bucket.consume(delta, self._cancelled)
+
+
+budget = BandwidthBudget()
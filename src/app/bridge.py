@@ -0,0 +1,196 @@
+"""Batched, non-blocking delivery of UI updates to the webview."""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable
+
+from app import profiling
+
+FLUSH_HZ = 30
+MAX_PENDING_LINES = 5000   # older lines are dropped past this and summarised
+MAX_LINES_PER_FLUSH = 1000
+MAX_PENDING_EVENTS = 2000  # producers wait for the next frame past this
+KEEP_SESSION_LOGS = 5
+
+
+class UiBridge:
+    """Collects UI calls from any thread and sends them to JS in one call per frame.
+
+    Producers never touch the webview, so a runner thread draining yt-dlp's
+    output only pays for a deque append. A dispatcher thread wakes when
+    something is pending, waits out the rest of the frame and delivers one
+    ``ui.onBatch`` call containing:
+
+    - ``lines``:  log lines in order, at most MAX_LINES_PER_FLUSH per frame
+    - ``events``: calls in the order they were queued, e.g. ``onJobEnd``
+
+    Calls queued with ``latest`` are coalesced: only the newest value per
+    key is sent (e.g. one ``onProgress`` per job), at the position of the
+    newest call, so a stale progress update never lands after the event
+    that ended it. ``append`` coalesces the same way but keeps every item,
+    turning a stream of playlist entries into one call per frame.
+
+    When lines arrive faster than they can be delivered the oldest ones are
+    dropped once MAX_PENDING_LINES is reached, and a single summary line
+    tells the user how many were skipped. Calls can't be dropped, so past
+    MAX_PENDING_EVENTS producers wait for the next frame instead. With a session log open every line
+    is also written to disk, so the full log survives both drops and the
+    UI's own line cap.
+
+    Batches go to the webview by default; ``attach_sink`` hands them to any
+    callable instead (the headless daemon streams them to its clients).
+    """
+
+    def __init__(self, window=None, hz: int = FLUSH_HZ):
+        self._sink: Callable[[dict], None] | None = None
+        self._interval = 1.0 / hz
+        self._lock = threading.Lock()
+        self._lines: deque[tuple[str, str]] = deque()
+        self._dropped = 0
+        self._room = threading.Condition(self._lock)
+        self._events: list[tuple[str, tuple] | None] = []  # None marks a superseded call
+        self._coalesced: dict[tuple[str, str], int] = {}  # (fn, key) -> index in _events
+        self._queued = 0  # calls in _events that are still to be delivered
+        self._pending = threading.Event()
+        self._last_flush = 0.0
+        self._log_file = None
+        self.log_path: Path | None = None
+        if window is not None:
+            self.attach_window(window)
+        self._thread = threading.Thread(target=self._run, name="ui-bridge", daemon=True)
+        self._thread.start()
+
+    def attach_window(self, window) -> None:
+        def deliver(batch: dict) -> None:
+            window.evaluate_js(f"ui.onBatch({json.dumps(batch)})")
+
+        self.attach_sink(deliver)
+
+    def attach_sink(self, sink: Callable[[dict], None]) -> None:
+        """Deliver every batch as a dict to *sink*, called from the dispatcher thread."""
+        self._sink = sink
+        self._pending.set()
+
+    def open_session_log(self, log_dir: Path) -> Path | None:
+        """Start writing every log line to a new file in *log_dir*, pruning old sessions."""
+        try:
+            log_dir.mkdir(parents=True, exist_ok=True)
+            for old in sorted(log_dir.glob("session-*.log"))[:-(KEEP_SESSION_LOGS - 1)]:
+                old.unlink(missing_ok=True)
+            path = log_dir / time.strftime("session-%Y%m%d-%H%M%S.log")
+            f = open(path, "a", encoding="utf-8", errors="replace")
+        except OSError as e:
+            print(f"[bridge] could not open session log: {e!r}")
+            return None
+        with self._lock:
+            self._log_file, self.log_path = f, path
+        return path
+
+    # ---------- Producers (any thread) ----------
+
+    def log(self, line: str, job_id: str = "") -> None:
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.write(f"[{job_id[:6]}] {line}\n" if job_id else line + "\n")
+            if len(self._lines) >= MAX_PENDING_LINES:
+                self._lines.popleft()
+                self._dropped += 1
+            self._lines.append((job_id, line))
+        self._pending.set()
+
+    def emit(self, fn: str, *args) -> None:
+        """Queue ``ui.<fn>(*args)``; queued calls run in order."""
+        with self._lock:
+            self._wait_for_room()
+            self._events.append((fn, args))
+            self._queued += 1
+        self._pending.set()
+
+    def latest(self, fn: str, key: str, *args) -> None:
+        """Queue ``ui.<fn>(*args)``, replacing any undelivered call with the same key."""
+        with self._lock:
+            self._wait_for_room()
+            self._requeue(fn, key, args)
+        self._pending.set()
+
+    def append(self, fn: str, key: str, item) -> None:
+        """Queue ``ui.<fn>(key, items)``, adding *item* to any undelivered call with the same key."""
+        with self._lock:
+            self._wait_for_room()
+            i = self._coalesced.get((fn, key))
+            items = self._events[i][1][1] if i is not None else []
+            items.append(item)
+            self._requeue(fn, key, (key, items))
+        self._pending.set()
+
+    def _requeue(self, fn: str, key: str, args: tuple) -> None:
+        # Caller holds the lock. The call moves to the end of the queue so it
+        # still runs after everything queued before it
+        i = self._coalesced.get((fn, key))
+        if i is not None:
+            self._events[i] = None
+        else:
+            self._queued += 1
+        self._coalesced[(fn, key)] = len(self._events)
+        self._events.append((fn, args))
+
+    def _wait_for_room(self) -> None:
+        # Caller holds the lock. The dispatcher itself must never wait here
+        if threading.current_thread() is self._thread:
+            return
+        while self._queued >= MAX_PENDING_EVENTS:
+            self._pending.set()
+            self._room.wait()
+
+    def flush_log(self) -> None:
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.flush()
+
+    # ---------- Dispatcher ----------
+
+    def flush(self) -> None:
+        with self._lock:
+            n = min(len(self._lines), MAX_LINES_PER_FLUSH)
+            lines = [self._lines.popleft() for _ in range(n)]
+            dropped, self._dropped = self._dropped, 0
+            events, self._events = self._events, []
+            self._coalesced = {}
+            self._queued = 0
+            self._room.notify_all()
+            if self._lines:
+                self._pending.set()
+            if self._log_file is not None:
+                self._log_file.flush()
+
+        events = [call for call in events if call is not None]
+        if dropped:
+            lines.insert(0, ("", f"[ui] output too fast, skipped {dropped} log lines"))
+        if not (lines or events):
+            return
+
+        sink = self._sink
+        if sink is None:
+            return
+
+        batch = {"lines": lines, "events": events}
+        try:
+            with profiling.span("bridge.deliver", lines=len(lines), events=len(events)):
+                sink(batch)
+        except Exception as e:
+            print(f"[bridge] delivery failed: {e!r}")
+
+    def _run(self) -> None:
+        while True:
+            self._pending.wait()
+            # Let a frame's worth of updates pile up, then send them together
+            wait = self._interval - (time.monotonic() - self._last_flush)
+            if wait > 0:
+                time.sleep(wait)
+            self._pending.clear()
+            self._last_flush = time.monotonic()
+            self.flush()
@@ -0,0 +1,187 @@
+"""LRU + TTL cache of probe results, in memory and on disk."""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_TTL = 6 * 3600            # seconds a cached preview stays valid
+DEFAULT_MEMORY_ENTRIES = 200
+DEFAULT_DISK_BYTES = 64 * 1024 * 1024
+
+# Query parameters that never change what a URL points to
+_TRACKING_PARAMS = {"si", "feature", "fbclid", "gclid", "pp"}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of *url* for cache keys and duplicate checks.
+
+    Lowercases scheme and host, drops the fragment and tracking parameters
+    and sorts the remaining query so equivalent URLs compare equal.
+    """
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    if not parts.scheme or not parts.netloc:
+        return url
+
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in _TRACKING_PARAMS and not k.startswith("utm_")
+    ]
+    query.sort()
+    return urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path or "/",
+        urlencode(query),
+        "",
+    ))
+
+
+def cache_key(url: str, cookies_browser: str = "") -> str:
+    raw = f"{normalize_url(url)}\n{(cookies_browser or '').strip().lower()}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class ProbeCache:
+    """Previews (and optionally raw info dicts) keyed by URL + cookie source.
+
+    Previews are kept in a small in-memory LRU backed by gzip'd JSON files in
+    *cache_dir*. Raw info dicts can be large, so they only live on disk and
+    are read back on demand with ``get_info``. The disk side is trimmed to
+    *max_disk_bytes* by evicting the least recently used files.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MEMORY_ENTRIES,
+        max_disk_bytes: int = DEFAULT_DISK_BYTES,
+        store_info: bool = True,
+    ):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.store_info = store_info
+        self._mem: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---------- Public API ----------
+
+    def get(self, url: str, cookies_browser: str = "") -> dict | None:
+        """Return the cached preview, or None if missing or expired."""
+        key = cache_key(url, cookies_browser)
+        now = time.time()
+
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                created, preview = hit
+                if now - created < self.ttl:
+                    self._mem.move_to_end(key)
+                    return dict(preview)
+                del self._mem[key]
+
+        entry = self._read(key)
+        if entry is None or now - entry.get("created", 0) >= self.ttl:
+            return None
+
+        preview = entry.get("preview")
+        if not isinstance(preview, dict):
+            return None
+        self._remember(key, entry["created"], preview)
+        return dict(preview)
+
+    def get_info(self, url: str, cookies_browser: str = "", max_age: float | None = None) -> dict | None:
+        """Return the raw info dict stored with the preview, if still fresh enough."""
+        entry = self._read(cache_key(url, cookies_browser))
+        if entry is None:
+            return None
+        age = time.time() - entry.get("created", 0)
+        if age >= (self.ttl if max_age is None else max_age):
+            return None
+        info = entry.get("info")
+        return info if isinstance(info, dict) else None
+
+    def put(self, url: str, cookies_browser: str, preview: dict, info: dict | None = None) -> None:
+        key = cache_key(url, cookies_browser)
+        created = time.time()
+        self._remember(key, created, preview)
+
+        entry = {"url": url, "created": created, "preview": preview}
+        if self.store_info and info is not None:
+            entry["info"] = info
+        self._write(key, entry)
+
+    def invalidate(self, url: str, cookies_browser: str = "") -> None:
+        key = cache_key(url, cookies_browser)
+        with self._lock:
+            self._mem.pop(key, None)
+        try:
+            self._path(key).unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    # ---------- Internals ----------
+
+    def _remember(self, key: str, created: float, preview: dict) -> None:
+        with self._lock:
+            self._mem[key] = (created, dict(preview))
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json.gz"
+
+    def _read(self, key: str) -> dict | None:
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mtime doubles as last-used time for eviction
+        except (OSError, ValueError):
+            return None
+        return entry if isinstance(entry, dict) else None
+
+    def _write(self, key: str, entry: dict) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp = path.with_name(f"{key}.{threading.get_ident()}.tmp")
+            with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=1) as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"[cache] could not write probe cache entry: {e!r}")
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        try:
+            files = [(p, p.stat()) for p in self.cache_dir.glob("*.json.gz")]
+        except OSError:
+            return
+        total = sum(st.st_size for _, st in files)
+        if total <= self.max_disk_bytes:
+            return
+        for path, st in sorted(files, key=lambda f: f[1].st_mtime):
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= st.st_size
+            if total <= self.max_disk_bytes:
+                break
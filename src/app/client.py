@@ -0,0 +1,226 @@
+"""Command line client for ``app.daemon``.
+
+    python -m app.client submit URL [URL ...] -o DIR [--preset mp4] [--wait]
+    python -m app.client import urls.txt -o DIR [--wait]   # "-" reads stdin
+    python -m app.client probe URL
+    python -m app.client jobs | stop [JOB_ID] | status | metrics [--prometheus]
+    python -m app.client events
+
+The daemon's URL and token are read from ``daemon.json`` in the data dir
+unless ``--url`` and ``--token`` are given. Results are printed as JSON.
+With ``--wait``, submit and import follow the daemon's event stream,
+print the jobs' log lines and exit non-zero if any job did not finish.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import sys
+import urllib.error
+import urllib.request
+
+from app.daemon import info_path
+
+TIMEOUT = 60
+
+
+class DaemonError(Exception):
+    pass
+
+
+class Connection:
+    def __init__(self, url: str, token: str):
+        self.url = url.rstrip("/")
+        self.token = token
+        self._ids = itertools.count(1)
+
+    @classmethod
+    def from_info(cls, url: str = "", token: str = "") -> "Connection":
+        if not (url and token):
+            try:
+                info = json.loads(info_path().read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                raise DaemonError(f"No daemon running ({info_path()} not found); start one with python -m app.daemon")
+            url, token = url or info["url"], token or info["token"]
+        return cls(url, token)
+
+    def call(self, method: str, *args, **kwargs):
+        if args and kwargs:
+            raise ValueError("pass params by position or by name, not both")
+        reply = self._post({"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": kwargs or list(args)})
+        if "error" in reply:
+            raise DaemonError(reply["error"]["message"])
+        return reply["result"]
+
+    def events(self):
+        """Yield (event name, data) from the daemon's event stream; the stream is open on return."""
+        resp = self._open("/events", None, timeout=None)
+
+        def read():
+            name, data = "message", []
+            with resp:
+                for raw in resp:
+                    line = raw.decode("utf-8").rstrip("\r\n")
+                    if not line:
+                        if data:
+                            yield name, json.loads("\n".join(data))
+                        name, data = "message", []
+                    elif line.startswith("event:"):
+                        name = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data.append(line[5:].strip())
+
+        return read()
+
+    def get(self, path: str) -> str:
+        with self._open(path, None) as resp:
+            return resp.read().decode("utf-8")
+
+    def _post(self, payload) -> dict:
+        with self._open("/rpc", json.dumps(payload).encode()) as resp:
+            return json.loads(resp.read() or b"null")
+
+    def _open(self, path: str, body: bytes | None, timeout: float | None = TIMEOUT):
+        req = urllib.request.Request(self.url + path, data=body, headers={"Authorization": f"Bearer {self.token}"})
+        if body is not None:
+            req.add_header("Content-Type", "application/json")
+        try:
+            return urllib.request.urlopen(req, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            raise DaemonError(f"{e.code} {e.read().decode('utf-8', 'replace').strip()}")
+        except urllib.error.URLError as e:
+            raise DaemonError(f"Daemon not reachable at {self.url}: {e.reason}")
+
+
+def _wait_for(conn: Connection, submit, quiet: bool) -> int:
+    # Subscribe before submitting so no event of the new jobs is missed
+    stream = conn.events()
+    result = submit()
+    _print(result)
+    pending = set(result.get("job_ids") or [])
+    if not result.get("ok"):
+        return 1
+    if not pending:
+        return _follow_import(stream, quiet)
+
+    failed = 0
+    for name, data in stream:
+        if name == "log" and not quiet:
+            for item in data:
+                if item["job_id"] in pending:
+                    print(f"[{item['job_id'][:6]}] {item['line']}")
+        elif name == "jobUpdate":
+            job = data[0]
+            if job["job_id"] in pending and job["state"] in ("done", "failed", "stopped"):
+                pending.discard(job["job_id"])
+                failed += job["state"] != "done"
+                print(f"[{job['job_id'][:6]}] {job['state']}: {job.get('title') or job['url']}")
+                if not pending:
+                    break
+    return 1 if failed else 0
+
+
+def _follow_import(stream, quiet: bool) -> int:
+    # An import queues jobs as it reads, so wait for the queue to go idle instead
+    for name, data in stream:
+        if name == "log" and not quiet:
+            for item in data:
+                print(f"[{item['job_id'][:6]}] {item['line']}" if item["job_id"] else item["line"])
+        elif name == "importDone":
+            _print(data[0])
+            if not data[0].get("queued"):
+                return 1 if data[0].get("error") else 0
+        elif name == "queueIdle":
+            _print(data[0])
+            return 0 if not data[0].get("failed") else 1
+    return 1
+
+
+def _print(value) -> None:
+    print(json.dumps(value, indent=2))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.client", description="Drive a running yt-dlp GUI daemon.")
+    parser.add_argument("--url", dest="daemon_url", default="", help="daemon URL (default: from daemon.json)")
+    parser.add_argument("--token", default="", help="daemon token (default: from daemon.json)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def download_args(p):
+        p.add_argument("-o", "--out", required=True, help="output folder on the daemon's machine")
+        p.add_argument("--preset", default="best")
+        p.add_argument("--cookies", default="", help="browser to take cookies from")
+        p.add_argument("--wait", action="store_true", help="follow the jobs until they end")
+        p.add_argument("-q", "--quiet", action="store_true", help="with --wait, don't print log lines")
+
+    p = sub.add_parser("submit", help="queue one or more URLs")
+    p.add_argument("urls", nargs="+")
+    p.add_argument("--force", action="store_true", help="download even if already in the history")
+    download_args(p)
+    p = sub.add_parser("import", help="queue every URL in a .txt or .csv file")
+    p.add_argument("file", help='path, or "-" for stdin')
+    download_args(p)
+    p = sub.add_parser("probe", help="preview a URL")
+    p.add_argument("url")
+    p.add_argument("--refresh", action="store_true")
+    sub.add_parser("jobs", help="list running and queued jobs")
+    p = sub.add_parser("stop", help="stop one job, or all of them")
+    p.add_argument("job_id", nargs="?", default="")
+    sub.add_parser("status", help="check ffmpeg and deno on the daemon's machine")
+    p = sub.add_parser("metrics", help="download metrics")
+    p.add_argument("--prometheus", action="store_true")
+    sub.add_parser("events", help="print the event stream")
+    args = parser.parse_args(argv)
+
+    try:
+        conn = Connection.from_info(args.daemon_url, args.token)
+        if args.command == "submit":
+            def submit():
+                return conn.call("start_download", " ".join(args.urls), args.out, args.preset, args.cookies, args.force)
+        elif args.command == "import":
+            if args.file == "-":
+                text = sys.stdin.read()
+            else:
+                with open(args.file, encoding="utf-8-sig", errors="replace") as f:
+                    text = f.read()
+
+            def submit():
+                return conn.call("import_urls", text, args.out, args.preset, args.cookies)
+        elif args.command == "probe":
+            _print(conn.call("probe", args.url, "", args.refresh))
+            return 0
+        elif args.command == "jobs":
+            _print(conn.call("list_jobs"))
+            return 0
+        elif args.command == "stop":
+            _print(conn.call("stop", args.job_id))
+            return 0
+        elif args.command == "status":
+            _print(conn.call("system_status"))
+            return 0
+        elif args.command == "metrics":
+            if args.prometheus:
+                print(conn.get("/metrics"), end="")
+            else:
+                _print(conn.call("get_metrics"))
+            return 0
+        else:
+            for name, data in conn.events():
+                print(f"{name} {json.dumps(data)}", flush=True)
+            return 0
+
+        if args.wait:
+            return _wait_for(conn, submit, args.quiet)
+        result = submit()
+        _print(result)
+        return 0 if result.get("ok") else 1
+    except DaemonError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Snapshots of browser cookies in Netscape cookie files.
+
+``--cookies-from-browser`` makes yt-dlp open, copy and decrypt the browser's
+cookie database on every run, which can take seconds and on macOS may show
+a keychain prompt each time. We take one snapshot per browser, store it as
+a cookie file in the app data dir and hand that file to yt-dlp instead.
+A snapshot is retaken when the browser's cookie database changes or the
+snapshot gets older than ``max_age``.
+
+Everything here needs yt-dlp, so in source mode it runs inside a worker
+process (see app.worker); Runner.snapshot_cookies decides where.
+"""
+from __future__ import annotations
+
+import glob
+import os
+import time
+from pathlib import Path
+
+SNAPSHOT_MAX_AGE = 30 * 60  # seconds
+
+
+class CookieSnapshots:
+    def __init__(self, snap_dir: Path, max_age: float = SNAPSHOT_MAX_AGE):
+        self.snap_dir = Path(snap_dir)
+        self.max_age = max_age
+
+    def path_for(self, browser: str) -> Path:
+        return self.snap_dir / f"{browser}.txt"
+
+    def get(self, browser: str, force: bool = False) -> Path:
+        """Return a current snapshot for *browser*, taking a new one if needed.
+
+        Not safe to call concurrently for the same browser; callers serialise.
+        Raises whatever yt-dlp raises when the browser can't be read.
+        """
+        path = self.path_for(browser)
+        if force or self.is_stale(browser):
+            self.snap_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            export_browser_cookies(browser, tmp)
+            # Atomic swap; the new mtime also tells pooled YoutubeDLs to reload
+            os.replace(tmp, path)
+        return path
+
+    def is_stale(self, browser: str) -> bool:
+        try:
+            taken = self.path_for(browser).stat().st_mtime
+        except OSError:
+            return True
+        if time.time() - taken > self.max_age:
+            return True
+        db_mtime = browser_db_mtime(browser)
+        return db_mtime is not None and db_mtime > taken
+
+
+def export_browser_cookies(browser: str, dest: Path) -> None:
+    """Write *browser*'s cookies to *dest* as a Netscape cookie file."""
+    from yt_dlp.cookies import extract_cookies_from_browser
+
+    jar = extract_cookies_from_browser(browser)
+    # Create the file owner-only before any cookie is written to it
+    fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.close(fd)
+    jar.save(str(dest), ignore_discard=True, ignore_expires=True)
+
+
+def browser_db_mtime(browser: str) -> float | None:
+    """Newest mtime of *browser*'s cookie database files, or None if unknown."""
+    patterns: list[str] = []
+    try:
+        from yt_dlp import cookies as ytc
+
+        if browser == "firefox":
+            for root in ytc._firefox_browser_dirs():
+                patterns.append(os.path.join(root, "*", "cookies.sqlite*"))
+        elif browser == "safari":
+            patterns += [
+                os.path.expanduser("~/Library/Cookies/Cookies.binarycookies"),
+                os.path.expanduser(
+                    "~/Library/Containers/com.apple.Safari/Data/Library/Cookies/Cookies.binarycookies"
+                ),
+            ]
+        else:
+            root = ytc._get_chromium_based_browser_settings(browser)["browser_dir"]
+            patterns += [
+                os.path.join(root, "*", "Cookies"),
+                os.path.join(root, "*", "Network", "Cookies"),
+            ]
+    except Exception:
+        # yt-dlp internals moved or the browser is unknown: rely on max_age only
+        return None
+
+    newest = None
+    for pattern in patterns:
+        for f in glob.glob(pattern):
+            try:
+                m = os.path.getmtime(f)
+            except OSError:
+                continue
+            newest = m if newest is None else max(newest, m)
+    return newest
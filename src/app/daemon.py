@@ -0,0 +1,321 @@
+"""Headless mode: the app's ``Api`` and ``Runner`` behind a local HTTP API.
+
+    python -m app.daemon [--host 127.0.0.1] [--port 0]
+
+One long-lived process keeps everything the GUI keeps warm (worker
+processes or an imported yt-dlp, the probe cache, cookie snapshots,
+throughput history) across any number of submissions, so scripts and
+headless machines don't pay a cold start per download. ``app.client`` is a
+small command line client for it.
+
+Endpoints, all requiring ``Authorization: Bearer <token>``:
+
+    POST /rpc       JSON-RPC 2.0, single calls or batches, for the Api
+                    methods in METHODS; params by position or by name
+    GET  /events    server-sent events carrying what the window would get:
+                    ``log`` (a list of {job_id, line}) and one event per UI
+                    call, named after it without the ``on`` (``jobUpdate``,
+                    ``progress``, ``jobEnd``, ``queueIdle``, ...) with the
+                    call's arguments as a JSON array
+    GET  /metrics   download metrics in Prometheus' text format
+
+The URL and a fresh token are written to ``daemon.json`` in the data dir,
+readable only by the current user, and removed on exit.
+"""
+from __future__ import annotations
+
+import argparse
+import hmac
+import inspect
+import ipaddress
+import json
+import os
+import queue
+import secrets
+import signal
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from app.deps import get_bin_dir, get_data_dir
+
+METHODS = (
+    "start_download",
+    "import_urls",
+    "stop",
+    "probe",
+    "list_jobs",
+    "system_status",
+    "install_deps",
+    "set_concurrency",
+    "set_throughput",
+    "set_bandwidth_limit",
+    "get_metrics",
+    "search_history",
+)
+
+MAX_REQUEST_BYTES = 4 * 1024 * 1024
+CLIENT_QUEUE = 1000   # undelivered events per /events client before it is cut off
+KEEPALIVE = 15.0      # seconds between SSE comments on an idle stream
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+def info_path() -> Path:
+    return get_data_dir() / "daemon.json"
+
+
+class EventHub:
+    """Fans the bridge's batches out to every connected ``/events`` client.
+
+    Each client has a bounded queue; one that stops reading is dropped
+    rather than holding up the bridge or the other clients.
+    """
+
+    def __init__(self):
+        self._clients: set[queue.Queue] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        q: queue.Queue = queue.Queue(maxsize=CLIENT_QUEUE)
+        with self._lock:
+            self._clients.add(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue) -> None:
+        with self._lock:
+            self._clients.discard(q)
+
+    def is_subscribed(self, q: queue.Queue) -> bool:
+        with self._lock:
+            return q in self._clients
+
+    def publish(self, batch: dict) -> None:
+        """Bridge sink: turn one batch into SSE messages for every client."""
+        with self._lock:
+            clients = list(self._clients)
+        if not clients:
+            return
+        messages = [_sse(name, data) for name, data in _batch_events(batch)]
+        for q in clients:
+            try:
+                for message in messages:
+                    q.put_nowait(message)
+            except queue.Full:
+                self.unsubscribe(q)
+
+
+def _batch_events(batch: dict):
+    if batch["lines"]:
+        yield "log", [{"job_id": job_id, "line": line} for job_id, line in batch["lines"]]
+    for fn, args in batch["events"]:
+        yield _event_name(fn), list(args)
+
+
+def _event_name(fn: str) -> str:
+    if fn.startswith("on") and len(fn) > 2:
+        return fn[2].lower() + fn[3:]
+    return fn
+
+
+def _sse(name: str, data) -> bytes:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+class Daemon:
+    def __init__(self, api, token: str):
+        self.api = api
+        self.token = token
+        self.events = EventHub()
+        api.attach_sink(self.events.publish)
+
+    def authorized(self, header: str) -> bool:
+        return hmac.compare_digest(header.encode(), f"Bearer {self.token}".encode())
+
+    def handle_rpc(self, payload):
+        """Response for a JSON-RPC request or batch; None when nothing needs answering."""
+        if isinstance(payload, list):
+            if not payload:
+                return _error(None, INVALID_REQUEST, "Empty batch")
+            replies = [r for r in (self._call(req) for req in payload) if r is not None]
+            return replies or None
+        return self._call(payload)
+
+    def _call(self, req):
+        if not isinstance(req, dict) or req.get("jsonrpc") != "2.0" or not isinstance(req.get("method"), str):
+            return _error(None, INVALID_REQUEST, "Not a JSON-RPC 2.0 request")
+        req_id = req.get("id")
+        method = req["method"]
+        if method not in METHODS:
+            return _error(req_id, METHOD_NOT_FOUND, f"Unknown method: {method}")
+
+        fn = getattr(self.api, method)
+        params = req.get("params", [])
+        args, kwargs = (params, {}) if isinstance(params, list) else ([], params)
+        try:
+            if not isinstance(kwargs, dict):
+                raise TypeError("params must be an array or an object")
+            inspect.signature(fn).bind(*args, **kwargs)
+        except TypeError as e:
+            return _error(req_id, INVALID_PARAMS, str(e))
+
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            return _error(req_id, INTERNAL_ERROR, repr(e))
+        if "id" not in req:
+            return None  # notification
+        return {"jsonrpc": "2.0", "id": req_id, "result": result}
+
+
+def _error(req_id, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": req_id, "error": {"code": code, "message": message}}
+
+
+def make_handler(daemon: Daemon):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if not self._check_auth():
+                return
+            if self.path == "/events":
+                self._stream_events()
+            elif self.path == "/metrics":
+                self._reply(200, daemon.api.runner.metrics.prometheus().encode(), "text/plain; version=0.0.4")
+            else:
+                self._reply(404, b"Not found\n", "text/plain")
+
+        def do_POST(self):
+            if not self._check_auth():
+                return
+            if self.path != "/rpc":
+                self._reply(404, b"Not found\n", "text/plain")
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_REQUEST_BYTES:
+                self._reply(413, b"Request too large\n", "text/plain")
+                return
+            try:
+                payload = json.loads(self.rfile.read(length) or b"null")
+            except ValueError:
+                response = _error(None, PARSE_ERROR, "Invalid JSON")
+            else:
+                response = daemon.handle_rpc(payload)
+            if response is None:
+                self._reply(204, b"", "application/json")
+            else:
+                self._reply(200, json.dumps(response).encode(), "application/json")
+
+        def _check_auth(self) -> bool:
+            if daemon.authorized(self.headers.get("Authorization") or ""):
+                return True
+            self._reply(401, b"Missing or wrong token\n", "text/plain")
+            return False
+
+        def _reply(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if status >= 400:
+                # The request body may not have been read, so don't reuse the connection
+                self.send_header("Connection", "close")
+                self.close_connection = True
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream_events(self) -> None:
+            q = daemon.events.subscribe()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.wfile.write(b": connected\n\n")
+                self.wfile.flush()
+                while daemon.events.is_subscribed(q):
+                    try:
+                        message = q.get(timeout=KEEPALIVE)
+                    except queue.Empty:
+                        message = b": keepalive\n\n"
+                    self.wfile.write(message)
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                daemon.events.unsubscribe(q)
+                self.close_connection = True
+
+    return Handler
+
+
+def _write_info(path: Path, info: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    os.replace(tmp, path)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.daemon", description="Run yt-dlp GUI headless.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=0, help="port to listen on (default: any free port)")
+    args = parser.parse_args(argv)
+
+    bin_dir = get_bin_dir()
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    os.environ["PATH"] = str(bin_dir) + os.pathsep + os.environ.get("PATH", "")
+
+    from app.api import Api
+
+    daemon = Daemon(Api(), secrets.token_urlsafe(32))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(daemon))
+    server.daemon_threads = True
+    host, port = server.server_address[:2]
+    url = f"http://{host}:{port}"
+    try:
+        if not ipaddress.ip_address(host).is_loopback:
+            print(f"[daemon] warning: listening on {host}, reachable from other machines")
+    except ValueError:
+        pass
+
+    path = info_path()
+    _write_info(path, {"url": url, "token": daemon.token, "pid": os.getpid()})
+    daemon.api.warm_up()
+    print(f"[daemon] listening on {url} (token in {path})", flush=True)
+
+    def _on_term(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _on_term)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("[daemon] shutting down")
+        daemon.api.runner.stop_all()
+        daemon.api.runner.pool.shutdown()
+        server.server_close()
+        try:
+            if json.loads(path.read_text(encoding="utf-8")).get("pid") == os.getpid():
+                path.unlink()
+        except (OSError, ValueError):
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,37 @@
 # src/app/deps.py
-"""Auto-download portable ffmpeg and deno binaries on first launch."""
+"""Auto-download portable ffmpeg and deno binaries on first launch.
+
+Archives are streamed to a ``.part`` file in the data dir rather than held
+in memory (FFmpeg builds are 100+ MB). An interrupted download resumes with
+an HTTP Range request, guarded by If-Range so a file that changed upstream
+starts over. Large archives on servers that accept ranges are fetched over
+several connections at once, each segment resuming on its own.
+
+Verified archives are kept in a cache named by their SHA-256, so
+reinstalling or repairing a binary never goes back to the network. The
+binary is extracted straight from the archive on disk to a temp file and
+swapped into place with ``os.replace``, so a half-written binary is never
+on PATH. ffmpeg and deno install in parallel.
+"""
 from __future__ import annotations
 
+import hashlib
+import http.client
+import json
 import os
 import platform
 import shutil
 import stat
 import sys
+import threading
+import time
 import urllib.request
 import zipfile
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from app import bandwidth
+
 # ---------------------------------------------------------------------------
 # Binary source URLs
 # ---------------------------------------------------------------------------
@@ -43,12 +63,20 @@ def _platform_key() -> str:
 # App data directory
 # ---------------------------------------------------------------------------
 
-def get_bin_dir() -> Path:
+def get_data_dir() -> Path:
     if sys.platform.startswith("win"):
         base = Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local"))
     else:
         base = Path.home() / "Library" / "Application Support"
-    return base / "yt-dlp-gui" / "bin"
+    return base / "yt-dlp-gui"
+
+
+def get_bin_dir() -> Path:
+    return get_data_dir() / "bin"
+
+
+def get_download_dir() -> Path:
+    return get_data_dir() / "downloads"
 
 
 # ---------------------------------------------------------------------------
@@ -66,22 +94,228 @@ def check_deps() -> dict[str, bool]:
 # Download helpers
 # ---------------------------------------------------------------------------
 
-def _download_with_progress(url: str, on_progress) -> bytes:
-    """Download *url* into memory, calling on_progress(bytes_read, total)."""
-    req = urllib.request.Request(url, headers={"User-Agent": "yt-dlp-gui/1.0"})
-    resp = urllib.request.urlopen(req, timeout=120)
-    total = int(resp.headers.get("Content-Length", 0))
-    buf = BytesIO()
-    read = 0
-    while True:
-        chunk = resp.read(64 * 1024)
-        if not chunk:
-            break
-        buf.write(chunk)
-        read += len(chunk)
+DOWNLOAD_RETRIES = 4
+CHUNK_SIZE = 256 * 1024
+SEGMENTS = 4                      # connections for one large archive
+SEGMENTED_MIN_SIZE = 16 * 1024 * 1024
+
+
+class _RangeIgnored(http.client.HTTPException):
+    """The server answered a range request with the whole file."""
+
+
+def _download_to_file(url: str, dest: Path, on_progress) -> Path:
+    """Download *url* to *dest*, calling on_progress(bytes_read, total).
+
+    Runs as a background transfer within the bandwidth budget. Anything
+    that goes wrong with a segmented download falls back to one connection.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        remote = _probe_remote(url)
+    except (OSError, http.client.HTTPException) as e:
+        print(f"[deps] could not probe {url}: {e!r}")
+        remote = None
+    if remote and remote["size"] >= SEGMENTED_MIN_SIZE:
+        try:
+            _download_segmented(url, remote, dest, on_progress)
+            dest.with_name(dest.name + ".part").unlink(missing_ok=True)
+            return dest
+        except (OSError, http.client.HTTPException) as e:
+            print(f"[deps] segmented download failed ({e!r}), using one connection")
+            _discard_segments(dest)
+    return _download_single(url, dest, on_progress)
+
+
+def _probe_remote(url: str) -> dict | None:
+    """Size, validator and final URL of *url* if its server serves byte ranges, else None."""
+    req = urllib.request.Request(url, headers={"User-Agent": "yt-dlp-gui/1.0", "Range": "bytes=0-0"})
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        content_range = resp.headers.get("Content-Range") or ""
+        validator = _strong_validator(resp.headers)
+        if resp.status != 206 or "/" not in content_range or not validator:
+            return None
+        try:
+            size = int(content_range.rsplit("/", 1)[1])
+        except ValueError:
+            return None
+        # Redirects (e.g. GitHub release assets) are resolved once for every segment
+        return {"url": resp.geturl(), "size": size, "validator": validator}
+
+
+def _download_segmented(url: str, remote: dict, dest: Path, on_progress) -> Path:
+    size = remote["size"]
+    bounds = [(i * size // SEGMENTS, (i + 1) * size // SEGMENTS - 1) for i in range(SEGMENTS)]
+    parts = [dest.with_name(f"{dest.name}.seg{i}") for i in range(SEGMENTS)]
+    state_path = dest.with_name(dest.name + ".seg.json")
+    state = {"url": url, "validator": remote["validator"], "size": size}
+    if _load_part_state(state_path, url) != state:
+        _discard_segments(dest)
+        _save_part_state(state_path, state)
+
+    done = [p.stat().st_size if p.exists() else 0 for p in parts]
+    lock = threading.Lock()
+
+    def _on_bytes(i: int, n: int) -> None:
+        with lock:
+            done[i] += n
+            read = sum(done)
         if on_progress:
-            on_progress(read, total)
-    return buf.getvalue()
+            on_progress(read, size)
+
+    with bandwidth.budget.lease(bandwidth.BACKGROUND) as lease, ThreadPoolExecutor(SEGMENTS) as pool:
+        futures = [
+            pool.submit(
+                _fetch_segment, remote["url"], remote["validator"], parts[i], start, end, lease,
+                lambda n, _i=i: _on_bytes(_i, n),
+            )
+            for i, (start, end) in enumerate(bounds)
+        ]
+        for future in futures:
+            future.result()
+
+    tmp = dest.with_name(dest.name + ".tmp")
+    with open(tmp, "wb") as out:
+        for part in parts:
+            with open(part, "rb") as src:
+                shutil.copyfileobj(src, out, CHUNK_SIZE)
+    os.replace(tmp, dest)
+    _discard_segments(dest)
+    return dest
+
+
+def _fetch_segment(url: str, validator: str, part: Path, start: int, end: int, lease, on_bytes) -> None:
+    """Append bytes *start*..*end* (inclusive) of *url* to *part*, resuming after what it holds."""
+    length = end - start + 1
+    for attempt in range(DOWNLOAD_RETRIES):
+        have = part.stat().st_size if part.exists() else 0
+        if have >= length:
+            return
+        headers = {
+            "User-Agent": "yt-dlp-gui/1.0",
+            "Range": f"bytes={start + have}-{end}",
+            "If-Range": validator,
+        }
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=120) as resp:
+                if resp.status != 206:
+                    raise _RangeIgnored(f"HTTP {resp.status} for a range request")
+                with open(part, "ab") as f:
+                    while True:
+                        chunk = resp.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        lease.throttle(len(chunk))
+                        on_bytes(len(chunk))
+            if part.stat().st_size < length:
+                raise http.client.IncompleteRead(b"", length - part.stat().st_size)
+            return
+        except (OSError, http.client.HTTPException) as e:
+            if isinstance(e, _RangeIgnored) or attempt == DOWNLOAD_RETRIES - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+
+def _discard_segments(dest: Path) -> None:
+    for path in dest.parent.glob(dest.name + ".seg*"):
+        path.unlink(missing_ok=True)
+
+
+def _download_single(url: str, dest: Path, on_progress) -> Path:
+    """One connection to ``<dest>.part``; a failed attempt (or an earlier launch) resumes where it stopped."""
+    part = dest.with_name(dest.name + ".part")
+    state_path = dest.with_name(dest.name + ".part.json")
+    state = _load_part_state(state_path, url)
+    if not state:
+        part.unlink(missing_ok=True)
+
+    for attempt in range(DOWNLOAD_RETRIES):
+        offset = part.stat().st_size if part.exists() else 0
+        if offset and offset == state.get("total"):
+            break
+        headers = {"User-Agent": "yt-dlp-gui/1.0"}
+        if offset and state.get("validator"):
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = state["validator"]
+        else:
+            offset = 0
+        try:
+            with bandwidth.budget.lease(bandwidth.BACKGROUND) as lease, \
+                    urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=120) as resp:
+                if resp.status != 206:
+                    offset = 0  # server sent the whole file (or it changed): start over
+                length = int(resp.headers.get("Content-Length") or 0)
+                state = {
+                    "url": url,
+                    "validator": _strong_validator(resp.headers),
+                    "total": offset + length if length else None,
+                }
+                _save_part_state(state_path, state)
+                read = offset
+                with open(part, "ab" if offset else "wb") as f:
+                    while True:
+                        chunk = resp.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        read += len(chunk)
+                        lease.throttle(len(chunk))
+                        if on_progress:
+                            on_progress(read, state["total"] or 0)
+            if state["total"] and read < state["total"]:
+                raise http.client.IncompleteRead(b"", state["total"] - read)
+            break
+        except (OSError, http.client.HTTPException) as e:
+            if attempt == DOWNLOAD_RETRIES - 1:
+                raise
+            print(f"[deps] download interrupted ({e!r}), resuming")
+            time.sleep(2 ** attempt)
+
+    os.replace(part, dest)
+    state_path.unlink(missing_ok=True)
+    return dest
+
+
+def _strong_validator(headers) -> str | None:
+    # If-Range needs a strong ETag; a Last-Modified date works too
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+def _load_part_state(path: Path, url: str) -> dict:
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) and state.get("url") == url else {}
+
+
+def _save_part_state(path: Path, state: dict) -> None:
+    try:
+        path.write_text(json.dumps(state), encoding="utf-8")
+    except OSError as e:
+        print(f"[deps] could not save download state: {e!r}")
+
+
+def _install_from_zip(archive: Path, exe_name: str, bin_dir: Path) -> Path:
+    """Extract the member named *exe_name* (at any depth) into *bin_dir*, replacing it atomically."""
+    dest = bin_dir / exe_name
+    tmp = bin_dir / f".{exe_name}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(archive) as zf:
+        target = next((n for n in zf.namelist() if n.rsplit("/", 1)[-1] == exe_name), None)
+        if target is None:
+            raise RuntimeError(f"{exe_name} not found inside zip")
+        try:
+            with zf.open(target) as src, open(tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            _make_executable(tmp)
+            os.replace(tmp, dest)
+        finally:
+            tmp.unlink(missing_ok=True)
+    return dest
 
 
 def _make_executable(path: Path):
@@ -90,44 +324,114 @@ def _make_executable(path: Path):
 
 
 def _install_deno(bin_dir: Path, on_progress):
-    key = _platform_key()
-    url = _DENO_URLS.get(key)
-    if not url:
-        raise RuntimeError(f"No deno binary available for {key}")
-
-    data = _download_with_progress(url, on_progress)
-    with zipfile.ZipFile(BytesIO(data)) as zf:
-        exe_name = "deno.exe" if sys.platform.startswith("win") else "deno"
-        zf.extract(exe_name, bin_dir)
-    _make_executable(bin_dir / exe_name)
+    exe_name = "deno.exe" if sys.platform.startswith("win") else "deno"
+    _install_binary("deno", _DENO_URLS, exe_name, bin_dir, on_progress)
 
 
 def _install_ffmpeg(bin_dir: Path, on_progress):
+    # The ffmpeg binary may be nested in a bin/ folder inside the zip
+    exe_name = "ffmpeg.exe" if sys.platform.startswith("win") else "ffmpeg"
+    _install_binary("ffmpeg", _FFMPEG_URLS, exe_name, bin_dir, on_progress)
+
+
+def _install_binary(dep: str, urls: dict[str, str], exe_name: str, bin_dir: Path, on_progress):
     key = _platform_key()
-    url = _FFMPEG_URLS.get(key)
+    url = urls.get(key)
     if not url:
-        raise RuntimeError(f"No ffmpeg binary available for {key}")
+        raise RuntimeError(f"No {dep} binary available for {key}")
 
-    data = _download_with_progress(url, on_progress)
-    exe_name = "ffmpeg.exe" if sys.platform.startswith("win") else "ffmpeg"
+    cache = _archive_cache()
+    archive = cache.get(dep, url)
+    if archive is None:
+        download = _download_to_file(url, get_download_dir() / f"{dep}.zip", on_progress)
+        archive = cache.put(dep, url, download)
+    elif on_progress:
+        on_progress(1, 1)
+    _install_from_zip(archive, exe_name, bin_dir)
 
-    with zipfile.ZipFile(BytesIO(data)) as zf:
-        # Find the ffmpeg binary inside the zip (may be nested in a bin/ folder)
-        target = None
-        for name in zf.namelist():
-            basename = name.rsplit("/", 1)[-1] if "/" in name else name
-            if basename == exe_name:
-                target = name
-                break
-        if target is None:
-            raise RuntimeError(f"{exe_name} not found inside zip")
 
-        # Extract to bin_dir with flat name
-        dest = bin_dir / exe_name
-        with zf.open(target) as src, open(dest, "wb") as dst:
-            shutil.copyfileobj(src, dst)
+# ---------------------------------------------------------------------------
+# Archive cache
+# ---------------------------------------------------------------------------
 
-    _make_executable(bin_dir / exe_name)
+class ArchiveCache:
+    """Verified dependency archives, stored as ``<sha256>.zip`` with an index of which is whose.
+
+    An archive is only stored once its zip CRCs check out, and its hash is
+    checked again before it is reused, so a corrupted cache entry is
+    downloaded afresh rather than installed. Only the newest archive per
+    dependency is kept.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self._index_path = self.cache_dir / "index.json"
+        self._lock = threading.Lock()
+
+    def get(self, dep: str, url: str) -> Path | None:
+        with self._lock:
+            entry = self._load().get(dep)
+        if not entry or entry.get("url") != url:
+            return None
+        path = self.cache_dir / f"{entry['sha256']}.zip"
+        try:
+            if _sha256(path) == entry["sha256"]:
+                return path
+        except OSError:
+            return None
+        print(f"[deps] cached {dep} archive is corrupt, downloading again")
+        path.unlink(missing_ok=True)
+        return None
+
+    def put(self, dep: str, url: str, archive: Path) -> Path:
+        """Verify *archive*, move it into the cache and return its new path."""
+        with zipfile.ZipFile(archive) as zf:
+            bad = zf.testzip()
+        if bad is not None:
+            archive.unlink(missing_ok=True)
+            raise RuntimeError(f"{dep} archive is corrupt ({bad})")
+        digest = _sha256(archive)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{digest}.zip"
+        os.replace(archive, path)
+        with self._lock:
+            index = self._load()
+            index[dep] = {"url": url, "sha256": digest, "size": path.stat().st_size}
+            tmp = self._index_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(index), encoding="utf-8")
+            os.replace(tmp, self._index_path)
+            keep = {f"{e['sha256']}.zip" for e in index.values()}
+        for old in self.cache_dir.glob("*.zip"):
+            if old.name not in keep:
+                old.unlink(missing_ok=True)
+        return path
+
+    def _load(self) -> dict:
+        try:
+            index = json.loads(self._index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+_cache: ArchiveCache | None = None
+_cache_lock = threading.Lock()
+
+
+def _archive_cache() -> ArchiveCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ArchiveCache(get_data_dir() / "cache" / "archives")
+        return _cache
 
 
 # ---------------------------------------------------------------------------
@@ -135,11 +439,11 @@ def _install_ffmpeg(bin_dir: Path, on_progress):
 # ---------------------------------------------------------------------------
 
 def ensure_deps(on_status, on_progress, on_complete):
-    """Check and install missing deps. Callbacks are called from the caller's thread.
+    """Check and install missing deps, all at once. Callbacks run on installer threads.
 
-    on_status(text)          — e.g. "downloading_ffmpeg"
+    on_status(text)          — e.g. "downloading_ffmpeg", once per dep as it starts
     on_progress(dep, pct)    — 0-100 or -1 on failure
-    on_complete(result)      — {"ffmpeg": bool, "deno": bool}
+    on_complete(result)      — {"ffmpeg": bool, "deno": bool}, after every install ended
     """
     status = check_deps()
     to_install: list[tuple[str, callable]] = []
@@ -156,12 +460,12 @@ def ensure_deps(on_status, on_progress, on_complete):
     bin_dir = get_bin_dir()
     bin_dir.mkdir(parents=True, exist_ok=True)
 
-    for dep_name, installer in to_install:
+    def _install(dep_name, installer):
         on_status(f"downloading_{dep_name}")
         try:
-            def _progress(read, total, _dep=dep_name):
+            def _progress(read, total):
                 pct = (read / total * 100) if total > 0 else -1
-                on_progress(_dep, pct)
+                on_progress(dep_name, pct)
 
             installer(bin_dir, _progress)
             status[dep_name] = True
@@ -170,4 +474,8 @@ def ensure_deps(on_status, on_progress, on_complete):
             on_progress(dep_name, -1)
             status[dep_name] = False
 
+    with ThreadPoolExecutor(len(to_install)) as pool:
+        for dep_name, installer in to_install:
+            pool.submit(_install, dep_name, installer)
+
     on_complete(status)
@@ -0,0 +1,72 @@
+"""Start a download from the info dict its preview already extracted.
+
+Extraction is often the slowest part of a short download: a page fetch, an
+API call or two and, on some sites, solving a signature challenge with
+deno. The preview did all of that moments ago and the probe cache kept the
+result, so a download queued soon after can skip it the way
+``yt-dlp --load-info-json`` does: format selection runs again on the cached
+formats with the download's own options, then the streams are fetched.
+
+Stream URLs are signed and expire, so the info is only used while it is
+young and none of its URLs carry an ``expire`` stamp that has passed or is
+about to. If the download from it still fails, yt-dlp extracts the page
+again and downloads from that.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import tempfile
+import time
+
+from app.cache import normalize_url
+
+MAX_AGE = 30 * 60   # seconds after the probe its info may be used
+MIN_VALIDITY = 10 * 60  # seconds a stream URL must stay valid from the job's start
+
+# e.g. googlevideo's "expire=1760000000" or ".../expire/1760000000/..."
+_EXPIRE_RE = re.compile(r"[?&/](?:expire|expires|exp)[=/](\d{10})\b", re.IGNORECASE)
+
+
+def usable_info(info: dict | None, url: str, now: float | None = None) -> dict | None:
+    """*info* if a download of *url* can start from it, else None.
+
+    Only a single video whose page is *url* itself qualifies: a preview of
+    a playlist is metadata only, and a URL that also names a playlist
+    probes as its video but downloads as the whole list.
+    """
+    if not info or info.get("_type", "video") != "video" or not info.get("formats"):
+        return None
+    page = info.get("webpage_url") or ""
+    if not page or normalize_url(page) != normalize_url(url):
+        return None
+    expires = expires_at(info)
+    if expires is not None and expires - (now or time.time()) < MIN_VALIDITY:
+        return None
+    return info
+
+
+def expires_at(info: dict) -> float | None:
+    """Earliest expiry stamped into the info's stream URLs, if any."""
+    stamps = []
+    for f in info.get("formats") or ():
+        for key in ("url", "manifest_url", "fragment_base_url"):
+            m = _EXPIRE_RE.search(f.get(key) or "")
+            if m:
+                stamps.append(int(m.group(1)))
+    return min(stamps) if stamps else None
+
+
+def download_with_info(ydl, info: dict) -> int:
+    """Download from *info* with yt-dlp's ``--load-info-json`` path; returns its exit code."""
+    fd, path = tempfile.mkstemp(prefix="ytdlp-gui-", suffix=".info.json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        return ydl.download_with_info_file(path)
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
@@ -0,0 +1,190 @@
+"""SQLite index of completed downloads.
+
+One row per downloaded file, written when its job finishes. Lookups by
+normalised URL or by extractor + video id are indexed, so checking whether
+something was already fetched costs a query, not a network round trip.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from app.cache import normalize_url
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    id          INTEGER PRIMARY KEY,
+    extractor   TEXT NOT NULL DEFAULT '',
+    video_id    TEXT NOT NULL DEFAULT '',
+    url         TEXT NOT NULL,
+    url_key     TEXT NOT NULL,
+    webpage_url TEXT NOT NULL DEFAULT '',
+    preset      TEXT NOT NULL DEFAULT '',
+    title       TEXT NOT NULL DEFAULT '',
+    uploader    TEXT NOT NULL DEFAULT '',
+    duration    INTEGER,
+    thumbnail   TEXT NOT NULL DEFAULT '',
+    path        TEXT NOT NULL DEFAULT '',
+    size        INTEGER,
+    started_at  REAL,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS downloads_video ON downloads (extractor, video_id);
+CREATE INDEX IF NOT EXISTS downloads_url ON downloads (url_key);
+CREATE INDEX IF NOT EXISTS downloads_finished ON downloads (finished_at);
+"""
+
+_COLUMNS = (
+    "id", "extractor", "video_id", "url", "webpage_url", "preset", "title", "uploader",
+    "duration", "thumbnail", "path", "size", "started_at", "finished_at",
+)
+
+
+class Library:
+    """Completed downloads, shared by every thread through one connection."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use so creating a Library costs no disk I/O at startup
+        with self._connect_lock:
+            if self._conn is None:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                with conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(_SCHEMA)
+                    conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+                self._conn = conn
+            return self._conn
+
+    # ---------- Writes ----------
+
+    def add(self, url: str, preset: str, files: list[dict], started_at: float | None = None) -> None:
+        """Record the files one job produced; see ``file_record`` for their fields."""
+        now = time.time()
+        rows = [
+            (
+                f.get("extractor") or "",
+                f.get("video_id") or "",
+                url,
+                normalize_url(url),
+                f.get("webpage_url") or "",
+                preset or "",
+                f.get("title") or "",
+                f.get("uploader") or "",
+                f.get("duration"),
+                f.get("thumbnail") or "",
+                f.get("path") or "",
+                f.get("size"),
+                started_at,
+                now,
+            )
+            for f in files
+        ]
+        if not rows:
+            return
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO downloads (extractor, video_id, url, url_key, webpage_url, preset, title,"
+                " uploader, duration, thumbnail, path, size, started_at, finished_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete(self, row_id: int) -> bool:
+        with self._lock, self._db:
+            cur = self._db.execute("DELETE FROM downloads WHERE id = ?", (int(row_id),))
+        return cur.rowcount > 0
+
+    # ---------- Reads ----------
+
+    def find(self, url: str, preset: str | None = None, archive_id: str | None = None) -> dict | None:
+        """Newest download of *url* (or of *archive_id*) whose file still exists.
+
+        *archive_id* is yt-dlp's ``"<extractor> <id>"``. With *preset* only
+        downloads made with that preset count.
+        """
+        where = ["url_key = ?"]
+        args: list = [normalize_url(url)]
+        if archive_id and " " in archive_id:
+            extractor, video_id = archive_id.split(" ", 1)
+            where.append("(extractor = ? AND video_id = ?)")
+            args += [extractor, video_id]
+        sql = f"SELECT * FROM downloads WHERE ({' OR '.join(where)})"
+        if preset is not None:
+            sql += " AND preset = ?"
+            args.append(preset)
+        sql += " ORDER BY finished_at DESC LIMIT 20"
+
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        for row in rows:
+            if row["path"] and os.path.exists(row["path"]):
+                return _row_dict(row)
+        return None
+
+    def search(self, query: str = "", limit: int = 100, offset: int = 0) -> list[dict]:
+        """Newest first; *query* matches title, uploader or URL."""
+        sql = "SELECT * FROM downloads"
+        args: list = []
+        query = (query or "").strip()
+        if query:
+            like = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            sql += (
+                " WHERE title LIKE ? ESCAPE '\\' OR uploader LIKE ? ESCAPE '\\'"
+                " OR url LIKE ? ESCAPE '\\'"
+            )
+            args += [like, like, like]
+        sql += " ORDER BY finished_at DESC LIMIT ? OFFSET ?"
+        args += [max(1, min(1000, int(limit))), max(0, int(offset))]
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [_row_dict(r) for r in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM downloads").fetchone()[0]
+
+
+def file_record(d: dict) -> dict | None:
+    """Library fields from a yt-dlp postprocessor hook call, once a file is in place.
+
+    yt-dlp runs its MoveFiles step for every file it finishes (or finds
+    already downloaded), so its ``finished`` call sees the final path.
+    """
+    if d.get("status") != "finished" or d.get("postprocessor") != "MoveFiles":
+        return None
+    info = d.get("info_dict") or {}
+    path = info.get("filepath") or info.get("_filename") or ""
+    try:
+        size = os.path.getsize(path) if path else None
+    except OSError:
+        size = None
+    duration = info.get("duration")
+    return {
+        "extractor": (info.get("extractor_key") or info.get("extractor") or "").lower(),
+        "video_id": str(info.get("id") or ""),
+        "webpage_url": info.get("webpage_url") or "",
+        "title": info.get("title") or "",
+        "uploader": info.get("uploader") or info.get("channel") or "",
+        "duration": int(duration) if isinstance(duration, (int, float)) else None,
+        "thumbnail": info.get("thumbnail") or "",
+        "path": path,
+        "size": size,
+    }
+
+
+def _row_dict(row: sqlite3.Row) -> dict:
+    return {k: row[k] for k in _COLUMNS}
@@ -1,10 +1,18 @@
+from app import profiling  # first, so the startup timeline starts as early as possible
+import sys
+
+if "--profile" in sys.argv:
+    profiling.enable(cpu=True, memory=True)
+
 from pathlib import Path
 import inspect
 import os
-import sys
 import webview
 from app.api import Api
-from app.deps import get_bin_dir
+from app.deps import get_bin_dir, get_data_dir
+
+profiling.startup.mark("imports")
+
 
 def main():
     bin_dir = get_bin_dir()
@@ -34,7 +42,9 @@ def main():
         if candidate.exists():
             icon_path = str(candidate)
 
-    api = Api()
+    with profiling.span("startup.api"):
+        api = Api()
+    profiling.startup.mark("api")
 
     window_kwargs = {
         "title": "yt-dlp GUI",
@@ -46,10 +56,13 @@ def main():
     if icon_path and "icon" in inspect.signature(webview.create_window).parameters:
         window_kwargs["icon"] = icon_path
 
-    window = webview.create_window(**window_kwargs)
+    with profiling.span("startup.create_window"):
+        window = webview.create_window(**window_kwargs)
+    profiling.startup.mark("window_created")
 
     def on_ready():
         # Attach after pywebview finishes JS API introspection to weird recursion limit bug
+        profiling.startup.mark("gui_started")
         print(f"pywebview renderer: {webview.renderer}.")
         api.attach_window(window)
 
@@ -58,5 +71,9 @@ def main():
         start_kwargs["icon"] = icon_path
     webview.start(on_ready, **start_kwargs)
 
+    if profiling.enabled:
+        paths = profiling.dump(get_data_dir() / "profiles")
+        print(f"[profiling] written to {paths['folder']}")
+
 if __name__ == "__main__":
     main()
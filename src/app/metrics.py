@@ -0,0 +1,276 @@
+"""Per-job download metrics, aggregated by extractor and host.
+
+``JobMetrics`` follows one job through the same log lines, progress events
+and finished files the UI sees and splits its time into phases: extracting
+(until the first file starts downloading), downloading, waiting for a
+postprocessing slot and postprocessing (merging, converting). It also
+counts bytes transferred, average and peak speed, yt-dlp's retries and the
+time to the first downloaded byte.
+
+``MetricsStore`` adds every finished job to running totals per extractor
+and host, keeps the most recent jobs, and saves both to ``metrics.json`` in
+the data dir. After each job it also rewrites ``metrics.prom`` next to it
+in Prometheus' text format, for node_exporter's textfile collector or
+anything else that reads it; ``Api.get_metrics`` returns the same data as
+JSON.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable
+
+from app.progress import DOWNLOAD, ProgressEvent
+from app.tuning import host_key
+
+RECENT_JOBS = 200
+
+# Phases a job's time is split into
+EXTRACT = "extract"
+TRANSFER = "download"
+POSTPROCESS_WAIT = "postprocess_wait"
+POSTPROCESS = "postprocess"
+PHASES = (EXTRACT, TRANSFER, POSTPROCESS_WAIT, POSTPROCESS)
+
+_EXTRACTING_RE = re.compile(r"^\[([\w:.-]+)\] Extracting URL")
+_DESTINATION = "[download] Destination:"
+_PREFIX = "ytdlp_gui"
+
+
+class JobMetrics:
+    """Collects one job's metrics; feed it the job's stream, then call ``finish``.
+
+    Durations are measured with *clock* (``time.monotonic`` by default).
+    """
+
+    def __init__(self, url: str, profile: str = "", clock: Callable[[], float] = time.monotonic):
+        self.url = url
+        self.profile = profile
+        self.extractor = ""
+        self.started_at = time.time()
+        self.retries = 0
+        self.peak_speed = 0.0
+        self.ttfb: float | None = None
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.result: dict | None = None  # set by finish
+        self._clock = clock
+        self._start = clock()
+        self._phase = EXTRACT
+        self._since = self._start
+        self._bytes_done = 0  # bytes of files whose transfer finished
+        self._bytes_current = 0
+        self._lock = threading.Lock()
+
+    def on_log(self, line: str) -> None:
+        with self._lock:
+            if line.startswith(_DESTINATION):
+                self._enter(TRANSFER)
+            elif "Retrying" in line:
+                self.retries += 1
+            elif not self.extractor:
+                m = _EXTRACTING_RE.match(line)
+                if m:
+                    self.extractor = m.group(1).lower()
+
+    def on_progress(self, event: ProgressEvent) -> None:
+        with self._lock:
+            if event.phase != DOWNLOAD:
+                self._enter(POSTPROCESS)
+                return
+            self._enter(TRANSFER)
+            if event.speed:
+                self.peak_speed = max(self.peak_speed, float(event.speed))
+            downloaded = event.downloaded_bytes or 0
+            if downloaded < self._bytes_current:
+                # A new file (e.g. the audio after the video) starts from zero
+                self._bytes_done += self._bytes_current
+            self._bytes_current = downloaded
+            if downloaded and self.ttfb is None:
+                self.ttfb = self._clock() - self._start
+
+    def waiting_for_cpu(self) -> None:
+        with self._lock:
+            self._enter(POSTPROCESS_WAIT)
+
+    def on_file(self, file: dict) -> None:
+        with self._lock:
+            if file.get("extractor"):
+                self.extractor = file["extractor"]
+
+    def finish(self, outcome: str) -> dict:
+        """Close the current phase and return the job's metrics as a dict."""
+        with self._lock:
+            self._enter("")
+            transferred = self._bytes_done + self._bytes_current
+            download_s = self.seconds[TRANSFER]
+            self.result = {
+                "url": self.url,
+                "host": host_key(self.url),
+                "extractor": self.extractor,
+                "profile": self.profile,
+                "outcome": outcome,
+                "started_at": self.started_at,
+                "total_s": round(self._clock() - self._start, 3),
+                "ttfb_s": round(self.ttfb, 3) if self.ttfb is not None else None,
+                **{f"{phase}_s": round(seconds, 3) for phase, seconds in self.seconds.items()},
+                "bytes": transferred,
+                "avg_speed": round(transferred / download_s) if transferred and download_s > 0 else None,
+                "peak_speed": round(self.peak_speed) or None,
+                "retries": self.retries,
+            }
+            return self.result
+
+    def summary(self) -> str:
+        """One log line for the metrics ``finish`` returned."""
+        return _summary(self.result or {})
+
+    def _enter(self, phase: str) -> None:
+        if phase == self._phase:
+            return
+        now = self._clock()
+        if self._phase:
+            self.seconds[self._phase] += now - self._since
+        self._phase, self._since = phase, now
+
+
+def _summary(m: dict) -> str:
+    mb = 1024 * 1024
+    parts = [f"{m['outcome']} in {m['total_s']:.1f} s"]
+    if m["ttfb_s"] is not None:
+        parts.append(f"first byte {m['ttfb_s']:.2f} s")
+    parts.append(f"extract {m['extract_s']:.1f} s")
+    if m["bytes"]:
+        speed = f" at {m['avg_speed'] / mb:.2f} MB/s" if m["avg_speed"] else ""
+        peak = f" (peak {m['peak_speed'] / mb:.2f})" if m["peak_speed"] else ""
+        parts.append(f"download {m['bytes'] / mb:.1f} MB in {m['download_s']:.1f} s{speed}{peak}")
+    if m["postprocess_wait_s"] >= 0.1:
+        parts.append(f"waited {m['postprocess_wait_s']:.1f} s for a postprocessing slot")
+    if m["postprocess_s"]:
+        parts.append(f"postprocess {m['postprocess_s']:.1f} s")
+    if m["retries"]:
+        parts.append(f"{m['retries']} retries")
+    return "[metrics] " + ", ".join(parts)
+
+
+class MetricsStore:
+    """Totals per (extractor, host) and the latest jobs, saved as JSON and Prometheus text."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.prom_path = self.path.with_suffix(".prom")
+        self._lock = threading.Lock()
+        self._groups: dict[str, dict] | None = None
+        self._recent: deque[dict] = deque(maxlen=RECENT_JOBS)
+
+    def record(self, m: dict) -> None:
+        with self._lock:
+            groups = self._load()
+            key = f"{m['extractor'] or 'unknown'} {m['host'] or 'unknown'}"
+            g = groups.setdefault(key, {
+                "extractor": m["extractor"] or "unknown",
+                "host": m["host"] or "unknown",
+                "jobs": {},
+                "bytes": 0,
+                **{f"{phase}_s": 0.0 for phase in PHASES},
+                "ttfb_s": 0.0,
+                "ttfb_n": 0,
+                "retries": 0,
+                "peak_speed": 0,
+            })
+            g["jobs"][m["outcome"]] = g["jobs"].get(m["outcome"], 0) + 1
+            g["bytes"] += m["bytes"]
+            for phase in PHASES:
+                field = f"{phase}_s"
+                g[field] = round(g.get(field, 0.0) + m.get(field, 0.0), 3)
+            if m["ttfb_s"] is not None:
+                g["ttfb_s"] = round(g["ttfb_s"] + m["ttfb_s"], 3)
+                g["ttfb_n"] += 1
+            g["retries"] += m["retries"]
+            g["peak_speed"] = max(g["peak_speed"], m["peak_speed"] or 0)
+            self._recent.append(m)
+            self._save()
+
+    def snapshot(self) -> dict:
+        """Totals per extractor and host, with average speed and TTFB, plus the latest jobs."""
+        with self._lock:
+            groups = json.loads(json.dumps(list(self._load().values())))
+            recent = list(self._recent)
+        for g in groups:
+            g["avg_speed"] = round(g["bytes"] / g["download_s"]) if g["download_s"] else None
+            g["avg_ttfb_s"] = round(g["ttfb_s"] / g["ttfb_n"], 3) if g["ttfb_n"] else None
+        groups.sort(key=lambda g: (g["extractor"], g["host"]))
+        return {"groups": groups, "recent": recent}
+
+    def prometheus(self) -> str:
+        with self._lock:
+            groups = sorted(self._load().values(), key=lambda g: (g["extractor"], g["host"]))
+            return _prometheus(groups)
+
+    def _load(self) -> dict:
+        if self._groups is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            if not isinstance(data, dict):
+                data = {}
+            self._groups = data.get("groups") or {}
+            self._recent.extend(data.get("recent") or [])
+        return self._groups
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            for path, text in (
+                (self.path, json.dumps({"groups": self._groups, "recent": list(self._recent)})),
+                (self.prom_path, _prometheus(self._groups.values())),
+            ):
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(text, encoding="utf-8")
+                os.replace(tmp, path)
+        except OSError as e:
+            print(f"[metrics] could not save metrics: {e!r}")
+
+
+def _prometheus(groups) -> str:
+    groups = list(groups)
+    lines: list[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples) -> None:
+        lines.append(f"# HELP {_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {_PREFIX}_{name} {kind}")
+        for suffix, labels, value in samples:
+            text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{_PREFIX}_{name}{suffix}{{{text}}} {value}")
+
+    def labels(g: dict, **extra) -> dict:
+        return {"extractor": g["extractor"], "host": g["host"], **extra}
+
+    metric("jobs_total", "counter", "Finished jobs by outcome.", [
+        ("", labels(g, outcome=outcome), n) for g in groups for outcome, n in sorted(g["jobs"].items())
+    ])
+    metric("downloaded_bytes_total", "counter", "Bytes transferred.", [("", labels(g), g["bytes"]) for g in groups])
+    for phase, help_text in (
+        ("extract", "Time spent extracting before the first download."),
+        ("download", "Time spent transferring files."),
+        ("postprocess_wait", "Time spent waiting for a postprocessing slot."),
+        ("postprocess", "Time spent merging and converting."),
+    ):
+        metric(f"{phase}_seconds_total", "counter", help_text,
+               [("", labels(g), g.get(f"{phase}_s", 0.0)) for g in groups])
+    metric("ttfb_seconds", "summary", "Time from job start to the first downloaded byte.", [
+        sample for g in groups for sample in (("_sum", labels(g), g["ttfb_s"]), ("_count", labels(g), g["ttfb_n"]))
+    ])
+    metric("retries_total", "counter", "Retries reported by yt-dlp.", [("", labels(g), g["retries"]) for g in groups])
+    metric("peak_speed_bytes", "gauge", "Highest speed seen, in bytes per second.",
+           [("", labels(g), g["peak_speed"]) for g in groups])
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
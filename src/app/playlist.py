@@ -0,0 +1,218 @@
+"""Lazy playlist/channel enumeration and resumable entry listings.
+
+Entries are read from yt-dlp's unprocessed extractor result
+(``extract_info(..., process=False)``), so nothing is resolved per entry and
+the first entries can be shown while later pages are still being fetched.
+Listings are appended to disk as they arrive; an interrupted listing resumes
+after the last stored entry instead of starting over.
+
+The extraction helpers need a YoutubeDL and run wherever yt-dlp lives
+(a worker process, or in-process when frozen). ``PlaylistStore`` is plain
+file I/O and runs in the app process.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+
+LISTING_MAX_AGE = 6 * 3600  # seconds a stored listing is reused or resumed
+MAX_LISTINGS = 50
+MAX_URL_REDIRECTS = 5
+
+_PLAYLIST_TYPES = ("playlist", "multi_video")
+
+
+# ---------- Extraction (needs yt-dlp) ----------
+
+def resolve(ydl, url: str) -> dict | None:
+    """Unprocessed extractor result for *url*, following plain URL redirects.
+
+    A channel URL usually redirects to its videos tab; following it here
+    keeps the playlist unprocessed. ``url_transparent`` results are left for
+    ``process_ie_result`` since their metadata has to be merged.
+    """
+    ie = ydl.extract_info(url, download=False, process=False)
+    for _ in range(MAX_URL_REDIRECTS):
+        if not ie or ie.get("_type") != "url":
+            break
+        ie = ydl.extract_info(ie["url"], download=False, process=False, ie_key=ie.get("ie_key"))
+    return ie
+
+
+def is_playlist(ie: dict | None) -> bool:
+    return bool(ie) and ie.get("_type") in _PLAYLIST_TYPES
+
+
+def probe_info(ydl, url: str) -> dict | None:
+    """Info dict for a preview; playlists come back as metadata only.
+
+    A playlist result keeps ``_type`` and ``playlist_count`` but has no
+    entries, so probing a 5,000 video channel costs one page, not 5,000.
+    """
+    ie = resolve(ydl, url)
+    if not ie:
+        return None
+    if is_playlist(ie):
+        return playlist_meta(ie)
+    return ydl.process_ie_result(ie, download=False)
+
+
+def playlist_meta(ie: dict) -> dict:
+    thumbs = [t.get("url") for t in ie.get("thumbnails") or () if t.get("url")]
+    return {
+        "_type": "playlist",
+        "id": ie.get("id") or "",
+        "title": ie.get("title") or "",
+        "uploader": ie.get("uploader") or ie.get("channel") or "",
+        "thumbnail": ie.get("thumbnail") or (thumbs[-1] if thumbs else ""),
+        "webpage_url": ie.get("webpage_url") or "",
+        "extractor": ie.get("extractor") or "",
+        "playlist_count": ie.get("playlist_count"),
+    }
+
+
+def entry_summary(entry: dict, index: int) -> dict:
+    """The JSON-safe bits of a flat entry the UI and the download need."""
+    duration = entry.get("duration")
+    url = entry.get("webpage_url") or entry.get("url") or ""
+    return {
+        "index": index,
+        "id": entry.get("id") or "",
+        "title": entry.get("title") or entry.get("id") or url,
+        "url": url if url.startswith(("http://", "https://")) else "",
+        "duration": int(duration) if isinstance(duration, (int, float)) else None,
+        "uploader": entry.get("uploader") or entry.get("channel") or "",
+    }
+
+
+def iter_entries(ie: dict, start: int = 0) -> Iterator[dict]:
+    """Yield entry summaries after the first *start* entries, fetching lazily."""
+    from yt_dlp.utils import PagedList
+
+    entries = ie.get("entries") or ()
+    if isinstance(entries, PagedList):
+        # Paged extractors can jump straight to the page holding *start*
+        it = entries._getslice(start, None)
+    else:
+        it = itertools.islice(entries, start, None)
+    for index, entry in enumerate(it, start + 1):
+        if isinstance(entry, dict):
+            yield entry_summary(entry, index)
+
+
+def enumerate_playlist(
+    ydl,
+    url: str,
+    start: int,
+    on_meta: Callable[[dict], None],
+    on_entry: Callable[[dict], None],
+    cancelled: Callable[[], bool],
+) -> bool:
+    """Stream *url*'s entries after *start*. Returns False if cancelled part way."""
+    ie = resolve(ydl, url)
+    if not is_playlist(ie):
+        raise ValueError("Not a playlist")
+    on_meta(playlist_meta(ie))  # type: ignore[arg-type]
+    for entry in iter_entries(ie, start):  # type: ignore[arg-type]
+        if cancelled():
+            return False
+        on_entry(entry)
+    return True
+
+
+# ---------- Stored listings ----------
+
+class PlaylistStore:
+    """Entry listings on disk, one ``<id>.jsonl`` of entries plus ``<id>.json`` of metadata.
+
+    Listings older than *max_age* are dropped rather than resumed, since
+    indexes shift as a channel uploads. Only the *max_listings* most
+    recently written listings are kept.
+    """
+
+    def __init__(self, store_dir: Path, max_age: float = LISTING_MAX_AGE, max_listings: int = MAX_LISTINGS):
+        self.store_dir = Path(store_dir)
+        self.max_age = max_age
+        self.max_listings = max_listings
+
+    def load(self, playlist_id: str) -> dict | None:
+        """Stored metadata with an ``entries`` list, or None if missing or too old."""
+        try:
+            meta = json.loads(self._meta_path(playlist_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(meta, dict) or time.time() - meta.get("updated", 0) > self.max_age:
+            self.discard(playlist_id)
+            return None
+
+        entries: list[dict] = []
+        try:
+            with open(self._entries_path(playlist_id), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break  # torn write from a crash; resume from here
+        except OSError:
+            pass
+        meta["entries"] = entries
+        return meta
+
+    def save_meta(self, playlist_id: str, **fields) -> None:
+        path = self._meta_path(playlist_id)
+        try:
+            meta = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            meta = {}
+        meta.update(fields, updated=time.time())
+        try:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(meta), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[playlist] could not save listing: {e!r}")
+
+    @contextmanager
+    def appending(self, playlist_id: str, entries: list[dict]) -> Iterator[Callable[[dict], None]]:
+        """Yield a function that appends one entry; *entries* is what ``load`` returned.
+
+        The file is rewritten from *entries* first, which also drops a torn
+        last line so new entries always follow a complete one.
+        """
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        with open(self._entries_path(playlist_id), "w", encoding="utf-8", buffering=1) as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+
+            def add(entry: dict) -> None:
+                f.write(json.dumps(entry) + "\n")
+
+            yield add
+        self._prune()
+
+    def discard(self, playlist_id: str) -> None:
+        for path in (self._meta_path(playlist_id), self._entries_path(playlist_id)):
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def _meta_path(self, playlist_id: str) -> Path:
+        return self.store_dir / f"{playlist_id}.json"
+
+    def _entries_path(self, playlist_id: str) -> Path:
+        return self.store_dir / f"{playlist_id}.jsonl"
+
+    def _prune(self) -> None:
+        try:
+            metas = sorted(self.store_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        except OSError:
+            return
+        for path in metas[:-self.max_listings]:
+            self.discard(path.stem)
@@ -0,0 +1,290 @@
+"""Startup timeline, timing spans and on-demand profilers.
+
+``startup`` collects named marks from the moment this module is imported
+(the first thing ``app.main`` does) until the UI reports its first painted
+frame through ``Api.ui_ready``. That last mark is the time to interactive;
+each launch's marks are appended to ``logs/startup.jsonl`` in the data dir,
+so a slow start shows up against TTI_TARGET_MS and against earlier runs.
+
+``span(name)`` times a block of code. Until ``enable`` is called (by the
+``--profile`` flag or the debug panel) it returns one shared no-op object,
+so instrumented hot paths pay a function call and nothing else. ``dump``
+writes the spans as a Chrome trace (open in chrome://tracing or Perfetto)
+plus cProfile and tracemalloc snapshots if those were switched on.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+TTI_TARGET_MS = 1500
+KEEP_STARTUPS = 50  # launches kept in startup.jsonl
+MAX_SPANS = 200_000  # oldest spans are dropped past this
+MEMORY_FRAMES = 25   # traceback depth tracemalloc keeps per allocation
+MEMORY_TOP = 50      # allocation sites listed in memory.txt
+
+_T0 = time.perf_counter()  # time zero for startup marks and trace timestamps
+
+
+class StartupTimeline:
+    def __init__(self):
+        self._t0 = _T0
+        self._marks: list[tuple[str, float]] = []
+        self._lock = threading.Lock()
+        self.report: dict | None = None
+
+    def mark(self, name: str) -> None:
+        """Record that startup reached *name*; ignored once startup is over."""
+        with self._lock:
+            if self.report is None:
+                self._marks.append((name, (time.perf_counter() - self._t0) * 1000))
+
+    def finish(self, log_dir: Path | None = None) -> dict:
+        """Mark ``interactive``, save the launch to *log_dir* and return its report.
+
+        Only the first call counts; later ones (a reloaded page) return the
+        same report.
+        """
+        self.mark("interactive")
+        with self._lock:
+            if self.report is not None:
+                return self.report
+            marks = {name: round(ms, 1) for name, ms in self._marks}
+            self.report = {
+                "at": time.time(),
+                "tti_ms": marks["interactive"],
+                "target_ms": TTI_TARGET_MS,
+                "marks": marks,
+            }
+        if log_dir is not None:
+            _append(Path(log_dir) / "startup.jsonl", self.report)
+        return self.report
+
+    def summary(self) -> str:
+        report = self.report or {}
+        tti = report.get("tti_ms", 0)
+        verdict = "within" if tti <= TTI_TARGET_MS else "OVER"
+        steps = ", ".join(f"{name} {ms:.0f}" for name, ms in (report.get("marks") or {}).items())
+        return f"[startup] interactive after {tti:.0f} ms, {verdict} the {TTI_TARGET_MS} ms target ({steps})"
+
+
+def history(log_dir: Path) -> list[dict]:
+    """Earlier launches' reports, oldest first."""
+    try:
+        lines = (Path(log_dir) / "startup.jsonl").read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return []
+    reports = []
+    for line in lines:
+        try:
+            reports.append(json.loads(line))
+        except ValueError:
+            continue
+    return reports
+
+
+def _append(path: Path, report: dict) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = [json.dumps(r) for r in history(path.parent)[-(KEEP_STARTUPS - 1):]]
+        lines.append(json.dumps(report))
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        tmp.replace(path)
+    except OSError as e:
+        print(f"[profiling] could not save startup timeline: {e!r}")
+
+
+startup = StartupTimeline()
+
+
+# ---------- Spans ----------
+
+enabled = False
+_spans: deque[tuple] = deque(maxlen=MAX_SPANS)  # (name, start, end, thread id, args)
+_thread_names: dict[int, str] = {}
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args) -> None:
+        pass
+
+
+class _Span:
+    __slots__ = ("name", "args", "_start")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        thread = threading.current_thread()
+        _thread_names.setdefault(thread.ident, thread.name)
+        _spans.append((self.name, self._start, time.perf_counter(), thread.ident, self.args))
+        return False
+
+    def set(self, **args) -> None:
+        """Attach more details, e.g. a result only known at the end."""
+        self.args.update(args)
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, **args):
+    """Context manager timing its block as *name*; *args* end up in the trace."""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+# ---------- Profilers ----------
+
+_cpu_profiles: list = []
+_cpu_lock = threading.Lock()
+
+
+def enable(cpu: bool = False, memory: bool = False) -> None:
+    """Start recording spans, plus cProfile (*cpu*) and tracemalloc (*memory*) if asked."""
+    global enabled
+    enabled = True
+    if cpu and not _cpu_profiles:
+        _start_cpu_profile()
+    if memory:
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_FRAMES)
+
+
+def disable() -> None:
+    """Stop recording. ``dump`` first to keep what was collected; memory traces are dropped."""
+    import tracemalloc
+
+    global enabled
+    enabled = False
+    threading.setprofile(None)
+    with _cpu_lock:
+        profiles, _cpu_profiles[:] = list(_cpu_profiles), []
+    for profile in profiles:
+        profile.disable()  # before 3.12 this only reaches the calling thread's profile
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def status() -> dict:
+    import tracemalloc
+
+    return {
+        "enabled": enabled,
+        "spans": len(_spans),
+        "cpu": bool(_cpu_profiles),
+        "memory": tracemalloc.is_tracing(),
+    }
+
+
+def _start_cpu_profile() -> None:
+    import cProfile
+
+    if sys.version_info >= (3, 12):
+        # cProfile hooks every thread from one profile since 3.12
+        profile = cProfile.Profile()
+        profile.enable()
+        _cpu_profiles.append(profile)
+        return
+
+    # Before 3.12 a profile only sees the thread that enabled it: this one,
+    # and every thread started from now on gets its own
+    def _profile_thread(frame, event, arg):
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with _cpu_lock:
+            _cpu_profiles.append(profile)
+        profile.enable()
+
+    threading.setprofile(_profile_thread)
+    profile = cProfile.Profile()
+    with _cpu_lock:
+        _cpu_profiles.append(profile)
+    profile.enable()
+
+
+# ---------- Dumps ----------
+
+def dump(out_dir: Path) -> dict:
+    """Write everything collected so far to a new folder in *out_dir*; returns the paths.
+
+    Always writes ``trace.json``; ``cpu.pstats`` and ``memory.snapshot`` /
+    ``memory.txt`` only when those profilers ran. Spans are cleared, the
+    profilers keep running.
+    """
+    folder = Path(out_dir) / time.strftime("profile-%Y%m%d-%H%M%S")
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = {"folder": str(folder), "trace": str(folder / "trace.json")}
+
+    spans = list(_spans)
+    _spans.clear()
+    (folder / "trace.json").write_text(json.dumps(_chrome_trace(spans)), encoding="utf-8")
+
+    with _cpu_lock:
+        profiles, _cpu_profiles[:] = list(_cpu_profiles), []
+    if profiles:
+        import pstats
+
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(str(folder / "cpu.pstats"))
+        paths["cpu"] = str(folder / "cpu.pstats")
+        if enabled:
+            _start_cpu_profile()
+
+    import tracemalloc
+
+    if tracemalloc.is_tracing():
+        snapshot = tracemalloc.take_snapshot()
+        snapshot.dump(str(folder / "memory.snapshot"))
+        top = snapshot.statistics("lineno")[:MEMORY_TOP]
+        (folder / "memory.txt").write_text("\n".join(str(s) for s in top) + "\n", encoding="utf-8")
+        paths["memory"] = str(folder / "memory.snapshot")
+    return paths
+
+
+def _chrome_trace(spans: list[tuple]) -> dict:
+    def us(t: float) -> float:
+        return round((t - _T0) * 1e6, 1)
+
+    events: list[dict] = [
+        {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+        for tid, name in list(_thread_names.items())
+    ]
+    for name, ms in list(startup._marks):
+        events.append({"name": f"startup.{name}", "ph": "i", "s": "g", "pid": 1, "tid": 0, "ts": ms * 1000})
+    for name, start, end, tid, args in spans:
+        events.append({
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "pid": 1,
+            "tid": tid,
+            "ts": us(start),
+            "dur": us(end) - us(start),
+            "args": {k: v if isinstance(v, (int, float, bool)) else str(v) for k, v in args.items()},
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
@@ -0,0 +1,120 @@
+"""Typed progress events built from yt-dlp's hook dicts.
+
+yt-dlp already hands its hooks everything it knows about a transfer
+(bytes, total, speed, ETA, fragments), so both the in-process path and
+worker processes build a ``ProgressEvent`` straight from the hook and never
+parse log text. Workers send ``event.to_dict()`` over the pipe and the
+runner rebuilds it with ``ProgressEvent.from_dict``.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Callable
+
+# Phases, in the order a download normally moves through them
+DOWNLOAD = "download"
+MERGE = "merge"
+POSTPROCESS = "postprocess"
+
+MIN_INTERVAL = 0.1  # seconds between download events; phase changes always go out
+
+_QUIET_POSTPROCESSORS = {"MoveFiles"}  # fast bookkeeping steps not worth a phase
+
+
+@dataclass
+class ProgressEvent:
+    phase: str = DOWNLOAD
+    pct: float | None = None
+    downloaded_bytes: int | None = None
+    total_bytes: int | None = None
+    speed: float | None = None          # bytes per second
+    eta: float | None = None            # seconds
+    fragment_index: int | None = None
+    fragment_count: int | None = None
+    postprocessor: str = ""
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ProgressEvent":
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in d.items() if k in names})
+
+
+def from_progress_hook(d: dict) -> ProgressEvent | None:
+    """Event for a yt-dlp ``progress_hooks`` call, or None if there is nothing to show."""
+    status = d.get("status")
+    if status not in ("downloading", "finished"):
+        return None
+    total = d.get("total_bytes") or d.get("total_bytes_estimate")
+    downloaded = d.get("downloaded_bytes")
+    frag_index = d.get("fragment_index")
+    frag_count = d.get("fragment_count")
+
+    pct = None
+    if status == "finished":
+        pct = 100.0
+    elif total and downloaded is not None:
+        pct = downloaded / total * 100.0
+    elif frag_index and frag_count:
+        pct = frag_index / frag_count * 100.0
+
+    return ProgressEvent(
+        phase=DOWNLOAD,
+        pct=pct,
+        downloaded_bytes=downloaded,
+        total_bytes=int(total) if total else None,
+        speed=d.get("speed"),
+        eta=d.get("eta"),
+        fragment_index=frag_index,
+        fragment_count=frag_count,
+    )
+
+
+def starts_postprocessing(d: dict) -> bool:
+    """Whether a ``postprocessor_hooks`` call is a real (ffmpeg) step starting."""
+    return d.get("status") == "started" and (d.get("postprocessor") or "") not in _QUIET_POSTPROCESSORS
+
+
+def from_postprocessor_hook(d: dict) -> ProgressEvent | None:
+    """Event when a postprocessor starts; merging gets its own phase."""
+    if not starts_postprocessing(d):
+        return None
+    name = d.get("postprocessor") or ""
+    return ProgressEvent(phase=MERGE if name == "Merger" else POSTPROCESS, postprocessor=name)
+
+
+class ProgressReporter:
+    """Turns hook calls into events for *emit*, at most one per MIN_INTERVAL.
+
+    yt-dlp can call its progress hook for every block it writes, so download
+    events are rate limited; the first and last event of a transfer and any
+    phase change always go through.
+    """
+
+    def __init__(self, emit: Callable[[ProgressEvent], None], interval: float = MIN_INTERVAL):
+        self._emit = emit
+        self._interval = interval
+        self._last = 0.0
+        self._phase = ""
+
+    def progress_hook(self, d: dict) -> None:
+        event = from_progress_hook(d)
+        if event is None:
+            return
+        now = time.monotonic()
+        if d.get("status") == "downloading" and self._phase == DOWNLOAD and now - self._last < self._interval:
+            return
+        self._send(event, now)
+
+    def postprocessor_hook(self, d: dict) -> None:
+        event = from_postprocessor_hook(d)
+        if event is not None:
+            self._send(event, time.monotonic())
+
+    def _send(self, event: ProgressEvent, now: float) -> None:
+        self._last = now
+        self._phase = event.phase
+        self._emit(event)
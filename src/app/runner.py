@@ -1,33 +1,162 @@
 # src/app/runner.py
 from __future__ import annotations
 
-import subprocess
+import os
 import sys
 import threading
 import time
-import re
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Callable, Optional, Dict
 
-DOWNLOAD_PCT_RE = re.compile(r"\[download\]\s+(\d+(?:\.\d+)?)%")
-
-LogFn = Callable[[str], None]
-ProgressFn = Callable[[float], None]  # 0.0 to 100.0
-DoneFn = Callable[[int], None]        # exit code (0 = success)
+from app import bandwidth, handoff, profiling
+from app.bandwidth import Lease, ProgressThrottle
+from app.cookies import CookieSnapshots
+from app.deps import get_bin_dir, get_data_dir
+from app.library import file_record
+from app.metrics import JobMetrics, MetricsStore
+from app.progress import DOWNLOAD, ProgressEvent, ProgressReporter, starts_postprocessing
+from app.tuning import AUTO, PROFILES, ThroughputTuner, profile_opts
+from app.worker import Worker, WorkerError, WorkerPool
+from app.ydlpool import YdlPool
+
+STOP_GRACE_SECONDS = 5.0  # then a worker that ignored the cancel is killed
+COOKIE_SNAPSHOT_TIMEOUT = 120.0  # long enough to answer a keychain prompt
+
+LogFn = Callable[[str, str], None]       # (job_id, line)
+ProgressFn = Callable[[str, ProgressEvent], None]  # (job_id, event)
+DoneFn = Callable[[str, int], None]      # (job_id, exit code; 0 = success)
+UpdateFn = Callable[[dict], None]        # job snapshot, see JobHandle.snapshot()
+FileFn = Callable[[str, dict], None]     # (job_id, finished file, see library.file_record)
+InfoFn = Callable[[], Optional[dict]]    # the URL's info dict from its preview, if any
+
+# Job states, in the order a job normally moves through them
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+STOPPED = "stopped"
+
+# Stages of a running job. Only jobs in the download stage count against
+# max_concurrent; postprocessing (ffmpeg merges and conversions) takes one
+# of a separate, core sized set of slots instead.
+STAGE_DOWNLOAD = "download"
+STAGE_POSTPROCESS_WAIT = "postprocess_wait"
+STAGE_POSTPROCESS = "postprocess"
+
+MAX_CONCURRENCY = 8
+POSTPROCESS_POLL = 0.25  # seconds between stop checks while waiting for a slot
+
+
+def default_concurrency() -> int:
+    """Parallel jobs to run when the user hasn't picked a number.
+
+    Downloads are network bound, but each one also spends CPU on merging and
+    fragment handling, so scale with cores and keep it low enough to not
+    split a typical home link into uselessly thin streams.
+    """
+    cores = os.cpu_count() or 2
+    return max(1, min(4, cores // 2))
+
+
+def default_postprocess_slots() -> int:
+    """ffmpeg steps to run at once: one per core this process may use."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        return max(1, os.cpu_count() or 1)
 
 
 @dataclass
 class JobHandle:
     job_id: str
     stop_event: threading.Event
-    proc: subprocess.Popen[str] | None = None
+    worker: Worker | None = None
+    url: str = ""
+    out_dir: str = ""
+    preset: str = "best"
+    cookies_browser: str = ""
+    title: str = ""
+    playlist_items: str = ""  # download only these entries of a playlist URL
+    download_archive: str = ""  # yt-dlp archive file to check and record in
+    throughput: str = ""  # profile the job runs with, resolved when it starts
+    lease: Lease | None = field(default=None, repr=False)  # share of the bandwidth budget while running
+    metrics: dict | None = None  # see app.metrics, once the job has ended
+    state: str = QUEUED
+    stage: str = ""  # STAGE_* while running
+    holds_postprocess_slot: bool = field(default=False, repr=False)
+    progress: float = 0.0  # percent of the current transfer
+    started_at: float | None = None
+    on_log: Optional[LogFn] = field(default=None, repr=False)
+    on_progress: Optional[ProgressFn] = field(default=None, repr=False)
+    on_done: Optional[DoneFn] = field(default=None, repr=False)
+    on_update: Optional[UpdateFn] = field(default=None, repr=False)
+    on_file: Optional[FileFn] = field(default=None, repr=False)
+    load_info: Optional[InfoFn] = field(default=None, repr=False)
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "url": self.url,
+            "title": self.title,
+            "out_dir": self.out_dir,
+            "preset": self.preset,
+            "state": self.state,
+            "stage": self.stage,
+            "progress": self.progress,
+            "started_at": self.started_at,
+            "metrics": self.metrics,
+        }
 
 
 class Runner:
-    def __init__(self):
+    """Queue of yt-dlp jobs, at most ``max_concurrent`` of them running at once.
+
+    Jobs start in the order they were queued; ``move`` reorders jobs that are
+    still waiting. All callbacks receive the job id so one set of callbacks
+    can serve every job.
+    """
+
+    def __init__(self, max_concurrent: int = 0):
         self._jobs: Dict[str, JobHandle] = {}
+        self._queue: list[str] = []  # waiting job ids, next to start first
         self._lock = threading.Lock()
+        self._worker_lock = threading.Lock()  # JobHandle.worker and messages sent to it
+        self.pool = WorkerPool()
+        self.contexts = YdlPool()  # in-process (frozen) mode only
+        self.cookies = CookieSnapshots(get_data_dir() / "cookies")
+        self._cookie_locks: dict[str, threading.Lock] = {}
+        self.tuner = ThroughputTuner(get_data_dir() / "throughput.json")
+        self.metrics = MetricsStore(get_data_dir() / "metrics.json")
+        self.postprocess_slots = threading.BoundedSemaphore(default_postprocess_slots())
+        self._throughput = AUTO
+        self._max_concurrent = 1
+        self.set_max_concurrent(max_concurrent)
+
+    # ---------- Queue control ----------
+
+    @property
+    def max_concurrent(self) -> int:
+        return self._max_concurrent
+
+    def set_max_concurrent(self, n: int) -> int:
+        """Set the parallel job limit; 0 picks one from the machine."""
+        n = int(n or 0)
+        if n <= 0:
+            n = default_concurrency()
+        self._max_concurrent = max(1, min(MAX_CONCURRENCY, n))
+        self._schedule()
+        return self._max_concurrent
+
+    @property
+    def throughput(self) -> str:
+        return self._throughput
+
+    def set_throughput(self, profile: str) -> str:
+        """Profile for jobs that haven't started yet; unknown names mean ``auto``."""
+        profile = (profile or "").strip().lower()
+        self._throughput = profile if profile in PROFILES else AUTO
+        return self._throughput
 
     def start_ytdlp(
         self,
@@ -38,45 +167,324 @@ class Runner:
         on_log: LogFn,
         on_progress: ProgressFn,
         on_done: DoneFn,
+        on_update: UpdateFn | None = None,
+        title: str = "",
+        playlist_items: str = "",
+        download_archive: str = "",
+        on_file: FileFn | None = None,
+        load_info: InfoFn | None = None,
     ) -> str:
+        """Queue a download and return its job id; it starts when a slot frees up.
+
+        *load_info* is asked for the URL's probed info dict when the job
+        starts; if it is still fresh, the download skips extraction (see
+        ``app.handoff``).
+        """
         job_id = uuid.uuid4().hex
-        stop_event = threading.Event()
-        handle = JobHandle(job_id=job_id, stop_event=stop_event, proc=None)
+        handle = JobHandle(
+            job_id=job_id,
+            stop_event=threading.Event(),
+            url=url,
+            out_dir=out_dir,
+            preset=preset,
+            cookies_browser=cookies_browser,
+            title=title,
+            playlist_items=playlist_items,
+            download_archive=download_archive,
+            on_log=on_log,
+            on_progress=on_progress,
+            on_done=on_done,
+            on_update=on_update,
+            on_file=on_file,
+            load_info=load_info,
+        )
 
         with self._lock:
             self._jobs[job_id] = handle
+            self._queue.append(job_id)
 
-        t = threading.Thread(
-            target=self._run_ytdlp,
-            args=(handle, url, out_dir, preset, cookies_browser, on_log, on_progress, on_done),
-            daemon=True,
-        )
-        t.start()
+        self._notify(handle)
+        self._schedule()
         return job_id
 
     def stop(self, job_id: str) -> bool:
+        """Stop a running job, or drop it from the queue if it hasn't started."""
         with self._lock:
             handle = self._jobs.get(job_id)
-        if not handle:
-            return False
+            if not handle:
+                return False
+            was_queued = job_id in self._queue
+            if was_queued:
+                self._queue.remove(job_id)
+                self._jobs.pop(job_id, None)
+                handle.state = STOPPED
 
         handle.stop_event.set()
-        proc = handle.proc
-        if proc is not None and proc.poll() is None:
+        if was_queued:
+            self._notify(handle)
+            return True
+
+        # Under the lock so the worker can't go back to the pool in between
+        with self._worker_lock:
+            worker = handle.worker
+            if worker is not None:
+                # Cancel lets the worker stop cleanly and stay warm; kill it if
+                # it is stuck somewhere the cancel can't reach (e.g. extraction)
+                worker.cancel()
+
+        if worker is not None:
+            def _kill_if_stuck():
+                if worker.busy_with == job_id:
+                    worker.kill()
+
+            t = threading.Timer(STOP_GRACE_SECONDS, _kill_if_stuck)
+            t.daemon = True
+            t.start()
+
+        return True
+
+    def stop_all(self) -> int:
+        """Stop every running job and clear the queue. Returns how many were affected."""
+        with self._lock:
+            # Clear waiting jobs first so stopping a running one can't start them
+            job_ids = list(self._queue) + [j for j in self._jobs if j not in self._queue]
+        return sum(1 for job_id in job_ids if self.stop(job_id))
+
+    def move(self, job_id: str, index: int) -> bool:
+        """Move a waiting job to *index* in the queue (0 = next to start)."""
+        with self._lock:
+            if job_id not in self._queue:
+                return False
+            self._queue.remove(job_id)
+            index = max(0, min(len(self._queue), int(index)))
+            self._queue.insert(index, job_id)
+        return True
+
+    def snapshot_cookies(
+        self,
+        ydl_opts: dict,
+        on_log: Callable[[str], None] | None = None,
+        worker: Worker | None = None,
+        force: bool = False,
+        tag: str = "",
+    ) -> dict:
+        """Swap ``cookiesfrombrowser`` in *ydl_opts* for a cookie file snapshot.
+
+        The snapshot is taken by *worker* if given (its request tagged with
+        *tag*), else in this process.
+        If it can't be taken, *ydl_opts* is left reading the browser directly.
+        """
+        browser = (ydl_opts.get("cookiesfrombrowser") or ("",))[0]
+        if not browser:
+            return ydl_opts
+
+        with self._lock:
+            lock = self._cookie_locks.setdefault(browser, threading.Lock())
+
+        # One snapshot per browser at a time; concurrent jobs wait and reuse it
+        with lock:
             try:
-                proc.terminate()
-            except Exception:
-                # If terminate fails for any reason, try kill as a fallback
-                try:
-                    proc.kill()
-                except Exception:
-                    pass
+                if worker is None:
+                    path = str(self.cookies.get(browser, force=force))
+                else:
+                    res = worker.request(
+                        {
+                            "type": "cookies",
+                            "browser": browser,
+                            "dir": str(self.cookies.snap_dir),
+                            "max_age": self.cookies.max_age,
+                            "force": force,
+                        },
+                        timeout=COOKIE_SNAPSHOT_TIMEOUT,
+                        tag=tag,
+                    )
+                    if not res.get("ok"):
+                        raise RuntimeError(res.get("error") or "cookie snapshot failed")
+                    path = res["path"]
+            except Exception as e:
+                if on_log:
+                    on_log(f"[cookies] snapshot of {browser} failed, reading browser directly: {e}")
+                return ydl_opts
+
+        ydl_opts = dict(ydl_opts)
+        del ydl_opts["cookiesfrombrowser"]
+        ydl_opts["cookiefile"] = path
+        return ydl_opts
+
+    def jobs(self) -> list[dict]:
+        """Snapshots of running jobs followed by waiting jobs in queue order."""
+        with self._lock:
+            running = [h.snapshot() for h in self._jobs.values() if h.state == RUNNING]
+            queued = [self._jobs[j].snapshot() for j in self._queue]
+        return running + queued
+
+    def queued_count(self) -> int:
+        with self._lock:
+            return len(self._queue)
 
+    def is_idle(self) -> bool:
+        with self._lock:
+            return not self._jobs
+
+    # ---------- Scheduling ----------
+
+    def _schedule(self) -> None:
+        to_start: list[JobHandle] = []
+        with self._lock:
+            running = sum(1 for h in self._jobs.values() if h.state == RUNNING and h.stage == STAGE_DOWNLOAD)
+            while self._queue and running < self._max_concurrent:
+                handle = self._jobs[self._queue.pop(0)]
+                handle.state = RUNNING
+                handle.stage = STAGE_DOWNLOAD
+                handle.started_at = time.time()
+                running += 1
+                to_start.append(handle)
+
+        for handle in to_start:
+            self._notify(handle)
+            t = threading.Thread(target=self._run_job, args=(handle,), daemon=True)
+            t.start()
+
+    def _run_job(self, handle: JobHandle) -> None:
+        job_id = handle.job_id
+        handle.throughput = self.tuner.resolve(self._throughput, handle.url)
+        metrics = JobMetrics(handle.url, handle.throughput)
+
+        def on_log(line: str) -> None:
+            metrics.on_log(line)
+            if handle.on_log:
+                handle.on_log(job_id, line)
+
+        def on_progress(event: ProgressEvent) -> None:
+            if event.phase == DOWNLOAD and handle.stage != STAGE_DOWNLOAD:
+                # The next file of a playlist: back to a download slot
+                self._leave_postprocess(handle)
+            if event.pct is not None:
+                handle.progress = event.pct
+            metrics.on_progress(event)
+            if handle.on_progress:
+                handle.on_progress(job_id, event)
+
+        def on_file(file: dict) -> None:
+            metrics.on_file(file)
+            if handle.on_file:
+                handle.on_file(job_id, file)
+
+        def on_postprocess() -> bool:
+            metrics.waiting_for_cpu()
+            return self._enter_postprocess(handle)
+
+        def on_share(share: float) -> None:
+            with self._worker_lock:
+                worker = handle.worker
+                if worker is not None:
+                    worker.set_rate(share)
+
+        codes: list[int] = []
+
+        handle.lease = bandwidth.budget.lease(bandwidth.DOWNLOAD, on_share)
+        try:
+            self._run_ytdlp(
+                handle,
+                handle.url,
+                handle.out_dir,
+                handle.preset,
+                handle.cookies_browser,
+                on_log,
+                on_progress,
+                on_file,
+                on_postprocess,
+                codes.append,
+            )
+        finally:
+            handle.lease.close()
+            self._release_postprocess_slot(handle)
+
+        # Report only after _finish so listeners see an up to date queue
+        code = codes[-1] if codes else 1
+        if handle.stop_event.is_set():
+            handle.state = STOPPED
+        else:
+            handle.state = DONE if code == 0 else FAILED
+            if code != 0 and handle.stage == STAGE_POSTPROCESS:
+                on_log("[runner] postprocessing failed, the downloaded files were kept")
+        handle.metrics = metrics.finish(handle.state)
+        self.metrics.record(handle.metrics)
+        on_log(metrics.summary())
+        if handle.state == DONE:
+            self._record_throughput(handle)
+        if handle.on_done:
+            handle.on_done(job_id, code)
+        self._notify(handle)
+
+    # ---------- Postprocessing stage ----------
+
+    def _enter_postprocess(self, handle: JobHandle) -> bool:
+        """Move a job from its download slot to a postprocessing slot.
+
+        Called when an ffmpeg step is about to start. The download slot is
+        given to the next queued job and the job's bandwidth share to the
+        others; returns False if the job was stopped while waiting.
+        """
+        if handle.stage != STAGE_DOWNLOAD:
+            return True  # already holds a slot, e.g. a conversion after a merge
+        handle.stage = STAGE_POSTPROCESS_WAIT
+        if handle.lease is not None:
+            handle.lease.pause()
+        self._notify(handle)
+        self._schedule()
+        with profiling.span("runner.postprocess_wait"):
+            while not self.postprocess_slots.acquire(timeout=POSTPROCESS_POLL):
+                if handle.stop_event.is_set():
+                    return False
+        handle.holds_postprocess_slot = True
+        handle.stage = STAGE_POSTPROCESS
+        self._notify(handle)
         return True
 
+    def _leave_postprocess(self, handle: JobHandle) -> None:
+        # The job takes a download slot again even if that briefly exceeds
+        # max_concurrent; the scheduler catches up as jobs end
+        self._release_postprocess_slot(handle)
+        if handle.lease is not None:
+            handle.lease.resume()
+        handle.stage = STAGE_DOWNLOAD
+        self._notify(handle)
+
+    def _release_postprocess_slot(self, handle: JobHandle) -> None:
+        if handle.holds_postprocess_slot:
+            handle.holds_postprocess_slot = False
+            self.postprocess_slots.release()
+
+    def _handoff_info(self, handle: JobHandle, on_log: Callable[[str], None]) -> dict | None:
+        if handle.load_info is None or handle.playlist_items:
+            return None
+        try:
+            info = handoff.usable_info(handle.load_info(), handle.url)
+        except Exception as e:
+            on_log(f"[runner] could not read the preview's info: {e!r}")
+            return None
+        if info is not None:
+            on_log("[runner] starting from the preview's info, skipping extraction")
+        return info
+
+    def _record_throughput(self, handle: JobHandle) -> None:
+        # Files found already downloaded transfer nothing, so they don't count
+        m = handle.metrics or {}
+        if m.get("bytes") and m.get("download_s", 0) >= 1.0:
+            self.tuner.record(handle.url, handle.throughput, m["bytes"] / m["download_s"], m.get("extractor", ""))
+
+    def _notify(self, handle: JobHandle) -> None:
+        if handle.on_update:
+            try:
+                handle.on_update(handle.snapshot())
+            except Exception:
+                pass
+
     def _finish(self, job_id: str) -> None:
         with self._lock:
             self._jobs.pop(job_id, None)
+        self._schedule()
 
     def _run_ytdlp(
         self,
@@ -85,112 +493,108 @@ class Runner:
         out_dir: str,
         preset: str,
         cookies_browser: str,
-        on_log: LogFn,
-        on_progress: ProgressFn,
-        on_done: DoneFn,
+        on_log: Callable[[str], None],
+        on_progress: Callable[[ProgressEvent], None],
+        on_file: Callable[[dict], None],
+        on_postprocess: Callable[[], bool],
+        on_done: Callable[[int], None],
     ) -> None:
         return_code = 1
         try:
-            if _use_inprocess_ytdlp():
-                return_code = self._run_ytdlp_inprocess(
-                    handle, url, out_dir, preset, cookies_browser, on_log, on_progress
-                )
-            else:
-                creationflags = 0
-                if sys.platform.startswith("win"):
-                    creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
-
-                on_log("[runner] starting download")
-                on_log(f"[runner] url={url}")
-                on_log(f"[runner] out_dir={out_dir}")
-                on_log(f"[runner] preset={preset}")
-                on_log(f"[runner] cookies={cookies_browser or '(none)'}")
-
-                out_dir = (out_dir or "").strip()
-                preset = (preset or "best").strip().lower()
-                cookies_browser = (cookies_browser or "").strip().lower()
-
-                # Base command: run yt-dlp from the current venv
-                args: list[str] = [sys.executable, "-m", "yt_dlp"]
-
-                # Cookies (optional)
-                if cookies_browser:
-                    args += ["--cookies-from-browser", cookies_browser]
-
-                # Presets -> yt-dlp flags
-                if preset == "best":
-                    args += ["-f", "bv*+ba/best"]
-                elif preset == "mp4":
-                    args += ["-f", "bv*+ba/best", "--merge-output-format", "mp4"]
-                elif preset == "1080p":
-                    args += ["-f", "bv*[height<=1080]+ba/best[height<=1080]"]
-                elif preset in ("videoonly", "video_only", "video"):
-                    args += ["-f", "bv*"]
-                elif preset == "audio":
-                    args += ["-f", "ba"]
-                elif preset == "mp3":
-                    args += ["-f", "ba", "-x", "--audio-format", "mp3"]
+            with profiling.span("runner.job", url=url, preset=preset, throughput=handle.throughput) as sp:
+                if _use_inprocess_ytdlp():
+                    return_code = self._run_ytdlp_inprocess(
+                        handle, url, out_dir, preset, cookies_browser, on_log, on_progress, on_file, on_postprocess
+                    )
                 else:
-                    on_log(f"[runner] unknown preset '{preset}', falling back to best")
-                    args += ["-f", "bv*+ba/best"]
-
-                # Output folder (optional)
-                if out_dir:
-                    args += ["-P", out_dir]
-
-                # URL + progress-friendly output
-                args += ["--newline", url]
-
-                on_log("[runner] cmd: " + " ".join(args))
-
-                proc = subprocess.Popen(
-                    args,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    encoding="utf-8",
-                    errors="replace",
-                    bufsize=1,
-                    creationflags=creationflags,
-                )
-                handle.proc = proc
-
-                assert proc.stdout is not None
-
-                for line in proc.stdout:
-                    text = line.rstrip("\n")
-                    on_log(text)
-
-                    m = DOWNLOAD_PCT_RE.search(text)
-                    if m:
-                        try:
-                            on_progress(float(m.group(1)))
-                        except ValueError:
-                            pass
-
-                    if handle.stop_event.is_set():
-                        on_log("[runner] stop requested; terminating yt-dlp...")
-                        proc.terminate()
-                        break
-
-                proc.stdout.close()
-                return_code = proc.wait(timeout=10)
-
-        except subprocess.TimeoutExpired:
-            on_log("[runner] terminate timed out; killing yt-dlp...")
-            if handle.proc and handle.proc.poll() is None:
-                handle.proc.kill()
-            return_code = handle.proc.wait() if handle.proc else 1
+                    return_code = self._run_ytdlp_worker(
+                        handle, url, out_dir, preset, cookies_browser, on_log, on_progress, on_file, on_postprocess
+                    )
+                sp.set(code=return_code)
 
         except Exception as e:
             on_log(f"[runner] error: {e!r}")
             return_code = 1
 
         finally:
-            handle.proc = None
+            handle.worker = None
             on_done(return_code)
             self._finish(handle.job_id)
 
+    def _run_ytdlp_worker(
+        self,
+        handle: JobHandle,
+        url: str,
+        out_dir: str,
+        preset: str,
+        cookies_browser: str,
+        on_log: Callable[[str], None],
+        on_progress: Callable[[ProgressEvent], None],
+        on_file: Callable[[dict], None],
+        on_postprocess: Callable[[], bool],
+    ) -> int:
+        on_log("[runner] starting download")
+        on_log(f"[runner] url={url}")
+        on_log(f"[runner] out_dir={out_dir}")
+        on_log(f"[runner] preset={preset}")
+        on_log(f"[runner] cookies={cookies_browser or '(none)'}")
+        on_log(f"[runner] throughput={handle.throughput}")
+
+        ydl_opts = build_ydl_opts(
+            preset, out_dir, cookies_browser, on_log, handle.playlist_items, handle.download_archive,
+            handle.throughput,
+        )
+        _limit_external_downloader(ydl_opts, handle.lease)
+        info = self._handoff_info(handle, on_log)
+
+        def on_message(msg: dict) -> None:
+            kind = msg.get("type")
+            if kind == "log":
+                on_log(msg.get("line", ""))
+            elif kind == "progress":
+                on_progress(ProgressEvent.from_dict(msg.get("event") or {}))
+            elif kind == "file":
+                on_file(msg["file"])
+            elif kind == "postprocess_wait":
+                if on_postprocess():
+                    worker.resume_postprocess()
+
+        with profiling.span("runner.acquire_worker"):
+            worker = self.pool.acquire()
+        with self._worker_lock:
+            handle.worker = worker
+        try:
+            if handle.stop_event.is_set():
+                return 1
+            # Set after handle.worker so a rebalance in between isn't lost
+            worker.set_rate(handle.lease.share if handle.lease else 0)
+            on_log(f"[runner] using worker pid {worker.proc.pid}")
+            with profiling.span("runner.cookies"):
+                ydl_opts = self.snapshot_cookies(ydl_opts, on_log, worker, tag=handle.job_id)
+            if handle.stop_event.is_set():
+                return 1
+            with profiling.span("runner.download"):
+                result = worker.request(
+                    {"type": "download", "url": url, "opts": ydl_opts, "info": info, "gate_postprocess": True},
+                    on_message=on_message,
+                    tag=handle.job_id,
+                    cancelled=handle.stop_event.is_set,
+                )
+        except WorkerError:
+            if handle.stop_event.is_set():
+                return 1
+            raise
+        finally:
+            # Detach first: once released the worker may already belong to
+            # another job, which must not get this one's cancel or rate
+            with self._worker_lock:
+                handle.worker = None
+            self.pool.release(worker)
+
+        if result.get("error"):
+            on_log(f"[runner] error: {result['error']}")
+        return int(result.get("code", 0 if result.get("ok") else 1))
+
     def _run_ytdlp_inprocess(
         self,
         handle: JobHandle,
@@ -198,8 +602,10 @@ class Runner:
         out_dir: str,
         preset: str,
         cookies_browser: str,
-        on_log: LogFn,
-        on_progress: ProgressFn,
+        on_log: Callable[[str], None],
+        on_progress: Callable[[ProgressEvent], None],
+        on_file: Callable[[dict], None],
+        on_postprocess: Callable[[], bool],
     ) -> int:
         try:
             import yt_dlp
@@ -209,69 +615,120 @@ class Runner:
             on_log(f"[runner] out_dir={out_dir}")
             on_log(f"[runner] preset={preset}")
             on_log(f"[runner] cookies={cookies_browser or '(none)'}")
+            on_log(f"[runner] throughput={handle.throughput}")
 
-            out_dir = (out_dir or "").strip()
-            preset = (preset or "best").strip().lower()
-            cookies_browser = (cookies_browser or "").strip().lower()
-
-            fmt = "bv*+ba/best"
-            if preset == "mp4":
-                fmt = "bv*+ba/best"
-            elif preset == "1080p":
-                fmt = "bv*[height<=1080]+ba/best[height<=1080]"
-            elif preset in ("videoonly", "video_only", "video"):
-                fmt = "bv*"
-            elif preset == "audio":
-                fmt = "ba"
-            elif preset == "mp3":
-                fmt = "ba"
-            elif preset != "best":
-                on_log(f"[runner] unknown preset '{preset}', falling back to best")
+            reporter = ProgressReporter(on_progress)
+            throttle = ProgressThrottle(handle.lease.bucket, handle.stop_event.is_set) if handle.lease else None
 
             def progress_hook(d):
                 if handle.stop_event.is_set():
-                    raise yt_dlp.utils.DownloadError("Download cancelled")
-                if d.get("status") != "downloading":
-                    return
-                total = d.get("total_bytes") or d.get("total_bytes_estimate")
-                downloaded = d.get("downloaded_bytes")
-                if total and downloaded is not None:
-                    on_progress((downloaded / total) * 100.0)
-
-            ydl_opts: dict = {
-                "format": fmt,
-                "progress_hooks": [progress_hook],
-                "logger": _YtDlpLogger(on_log),
-            }
+                    raise yt_dlp.utils.DownloadCancelled("Download cancelled")
+                reporter.progress_hook(d)
+                if throttle is not None:
+                    throttle(d)
+
+            def postprocessor_hook(d):
+                if starts_postprocessing(d) and not on_postprocess():
+                    raise yt_dlp.utils.DownloadCancelled("Download cancelled")
+                reporter.postprocessor_hook(d)
+                record = file_record(d)
+                if record:
+                    on_file(record)
+
+            ydl_opts = build_ydl_opts(
+                preset, out_dir, cookies_browser, on_log, handle.playlist_items, handle.download_archive,
+                handle.throughput,
+            )
+            _limit_external_downloader(ydl_opts, handle.lease)
+            with profiling.span("runner.cookies"):
+                ydl_opts = self.snapshot_cookies(ydl_opts, on_log)
+            ydl_opts["progress_hooks"] = [progress_hook]
+            ydl_opts["postprocessor_hooks"] = [postprocessor_hook]
+            ydl_opts["logger"] = _YtDlpLogger(on_log)
+
+            info = self._handoff_info(handle, on_log)
+            with profiling.span("runner.download", handoff=info is not None), self.contexts.borrow(ydl_opts) as ydl:
+                if info is not None:
+                    code = handoff.download_with_info(ydl, info)
+                else:
+                    code = ydl.download([url])
 
-            if out_dir:
-                ydl_opts["paths"] = {"home": out_dir}
+            return code
+        except Exception as e:
+            on_log(f"[runner] error: {e!r}")
+            return 1
 
-            if cookies_browser:
-                ydl_opts["cookiesfrombrowser"] = (cookies_browser,)
 
-            if preset == "mp4":
-                ydl_opts["merge_output_format"] = "mp4"
+def build_ydl_opts(
+    preset: str,
+    out_dir: str,
+    cookies_browser: str,
+    on_log: Callable[[str], None] | None = None,
+    playlist_items: str = "",
+    download_archive: str = "",
+    throughput: str = "",
+) -> dict:
+    """YoutubeDL options for a download, without hooks or logger.
+
+    The result only holds JSON-safe values so it can be sent to a worker
+    process as is.
+    """
+    out_dir = (out_dir or "").strip()
+    preset = (preset or "best").strip().lower()
+    cookies_browser = (cookies_browser or "").strip().lower()
+
+    fmt = "bv*+ba/best"
+    if preset == "mp4":
+        fmt = "bv*+ba/best"
+    elif preset == "1080p":
+        fmt = "bv*[height<=1080]+ba/best[height<=1080]"
+    elif preset in ("videoonly", "video_only", "video"):
+        fmt = "bv*"
+    elif preset == "audio":
+        fmt = "ba"
+    elif preset == "mp3":
+        fmt = "ba"
+    elif preset != "best" and on_log:
+        on_log(f"[runner] unknown preset '{preset}', falling back to best")
+
+    ydl_opts: dict = {"format": fmt}
+    ydl_opts.update(profile_opts(throughput, get_bin_dir()))
+
+    if out_dir:
+        ydl_opts["paths"] = {"home": out_dir}
+
+    if cookies_browser:
+        ydl_opts["cookiesfrombrowser"] = (cookies_browser,)
+
+    if playlist_items:
+        ydl_opts["playlist_items"] = playlist_items
+
+    if download_archive:
+        ydl_opts["download_archive"] = download_archive
+
+    if preset == "mp4":
+        ydl_opts["merge_output_format"] = "mp4"
+
+    if preset == "mp3":
+        ydl_opts["postprocessors"] = [
+            {
+                "key": "FFmpegExtractAudio",
+                "preferredcodec": "mp3",
+            }
+        ]
 
-            if preset == "mp3":
-                ydl_opts["postprocessors"] = [
-                    {
-                        "key": "FFmpegExtractAudio",
-                        "preferredcodec": "mp3",
-                    }
-                ]
+    return ydl_opts
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
 
-            return 0
-        except Exception as e:
-            on_log(f"[runner] error: {e!r}")
-            return 1
+def _limit_external_downloader(ydl_opts: dict, lease: Lease | None) -> None:
+    # aria2c moves the bytes itself, out of reach of the progress hook throttle,
+    # so it gets the job's share as of the start as its own limit
+    if lease is not None and lease.share and ydl_opts.get("external_downloader"):
+        ydl_opts["ratelimit"] = int(lease.share)
 
 
 class _YtDlpLogger:
-    def __init__(self, on_log: LogFn):
+    def __init__(self, on_log: Callable[[str], None]):
         self._on_log = on_log
 
     def debug(self, msg: str):
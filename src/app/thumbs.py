@@ -0,0 +1,191 @@
+"""On-disk cache of preview thumbnails, downscaled to the size they are shown at.
+
+Sites hand out full-size thumbnails (often 1280px or more) for a card a few
+hundred pixels wide. The UI used to load them straight from the site on
+every preview; now ``Api`` fetches each one once in the background with a
+preview-class bandwidth lease, shrinks it to ``WIDTH`` pixels with ffmpeg
+and passes it to the UI as a data URL. Without ffmpeg nothing is cached:
+a full-size image pushed through the bridge as base64 would cost more than
+letting the webview load the remote one. Files are keyed by the
+thumbnail's URL and the directory is kept under ``max_bytes`` by evicting
+the least recently used ones, so re-previews and anything else showing the
+same video load from disk.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import urllib.request
+from pathlib import Path
+from typing import Callable
+
+from app import bandwidth
+
+WIDTH = 480  # pixels; the preview card at 2x scale
+DEFAULT_DISK_BYTES = 32 * 1024 * 1024
+MAX_SOURCE_BYTES = 8 * 1024 * 1024
+FETCH_TIMEOUT = 15
+CHUNK_SIZE = 64 * 1024
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+)
+
+
+def image_type(data: bytes) -> str | None:
+    """MIME type of *data* if it looks like an image a webview can show."""
+    for magic, mime in _SIGNATURES:
+        if data.startswith(magic):
+            return mime
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_DISK_BYTES, width: int = WIDTH):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.width = width
+        self._pending: dict[str, list[Callable[[str | None], None]]] = {}
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether thumbnails can be downscaled (and so are worth caching) here."""
+        return shutil.which("ffmpeg") is not None
+
+    def get(self, url: str) -> str | None:
+        """Data URL of the cached thumbnail for *url*, or None."""
+        path = self._path(url)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # mtime doubles as last-used time for eviction
+        except OSError:
+            return None
+        return _data_url(data)
+
+    def fetch_async(self, url: str, on_done: Callable[[str | None], None]) -> None:
+        """Fetch *url* in the background and call *on_done* with its data URL (None on failure).
+
+        Requests for a URL that is already being fetched wait for that fetch.
+        """
+        with self._lock:
+            waiters = self._pending.get(url)
+            if waiters is not None:
+                waiters.append(on_done)
+                return
+            self._pending[url] = [on_done]
+        threading.Thread(target=self._fetch, args=(url,), daemon=True).start()
+
+    def _fetch(self, url: str) -> None:
+        try:
+            data_url = self.fetch(url)
+        except Exception as e:
+            print(f"[thumbs] could not fetch {url}: {e!r}")
+            data_url = None
+        with self._lock:
+            waiters = self._pending.pop(url, [])
+        for on_done in waiters:
+            try:
+                on_done(data_url)
+            except Exception:
+                pass
+
+    def fetch(self, url: str) -> str | None:
+        """Download, downscale and store the thumbnail at *url*; returns its data URL."""
+        cached = self.get(url)
+        if cached is not None:
+            return cached
+        data = _download(url)
+        if image_type(data) is None:
+            return None
+        data = self._downscale(data)
+        if data is None:
+            return None  # the caller keeps the remote URL
+        self._store(url, data)
+        return _data_url(data)
+
+    def _downscale(self, data: bytes) -> bytes | None:
+        """*data* at most ``width`` pixels wide, or None if ffmpeg can't do it."""
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            return None
+        cmd = [
+            ffmpeg, "-v", "error", "-i", "pipe:0",
+            "-vf", f"scale='min({self.width},iw)':-2", "-frames:v", "1",
+            "-c:v", "mjpeg", "-q:v", "5", "-f", "image2pipe", "pipe:1",
+        ]
+        creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0) if sys.platform.startswith("win") else 0
+        try:
+            proc = subprocess.run(cmd, input=data, capture_output=True, timeout=FETCH_TIMEOUT,
+                                  creationflags=creationflags)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        out = proc.stdout
+        if proc.returncode != 0 or image_type(out) is None:
+            return None
+        # Already small images can come out bigger as JPEG
+        return out if len(out) < len(data) else data
+
+    def _path(self, url: str) -> Path:
+        return self.cache_dir / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".img")
+
+    def _store(self, url: str, data: bytes) -> None:
+        path = self._path(url)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[thumbs] could not store thumbnail: {e!r}")
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        try:
+            files = [(p, p.stat()) for p in self.cache_dir.glob("*.img")]
+        except OSError:
+            return
+        total = sum(st.st_size for _, st in files)
+        for path, st in sorted(files, key=lambda f: f[1].st_mtime):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= st.st_size
+
+
+def _download(url: str) -> bytes:
+    if not url.startswith(("http://", "https://")):
+        raise ValueError("not an http(s) URL")
+    req = urllib.request.Request(url, headers={"User-Agent": "yt-dlp-gui/1.0"})
+    chunks: list[bytes] = []
+    size = 0
+    with bandwidth.budget.lease(bandwidth.PROBE) as lease, urllib.request.urlopen(req, timeout=FETCH_TIMEOUT) as resp:
+        while True:
+            chunk = resp.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_SOURCE_BYTES:
+                raise ValueError("thumbnail too large")
+            chunks.append(chunk)
+            lease.throttle(len(chunk))
+    return b"".join(chunks)
+
+
+def _data_url(data: bytes) -> str | None:
+    mime = image_type(data)
+    if mime is None:
+        return None
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
@@ -0,0 +1,143 @@
+"""Throughput profiles: how hard yt-dlp pushes a download.
+
+A profile maps to yt-dlp's transfer options (parallel fragment downloads
+for HLS/DASH, HTTP chunk size, buffer size and, for ``max``, aria2c for
+plain HTTP when it is installed). ``auto`` picks a profile per host from
+the throughput earlier jobs reached with each one, stored in the app data
+dir.
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import shutil
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit
+
+CONSERVATIVE = "conservative"
+BALANCED = "balanced"
+MAX = "max"
+AUTO = "auto"
+
+PROFILES = (CONSERVATIVE, BALANCED, MAX)
+
+MIN_SAMPLES = 2      # jobs per profile before auto trusts its average
+EXPLORE_RATE = 0.1   # share of auto jobs that retry a profile that isn't the best
+SMOOTHING = 0.3      # weight of the newest sample in a profile's average
+
+_MiB = 1024 * 1024
+
+
+def profile_opts(profile: str, bin_dir: Path | None = None) -> dict:
+    """YoutubeDL options for *profile*; unknown names get yt-dlp's defaults."""
+    if profile == CONSERVATIVE:
+        return {"concurrent_fragment_downloads": 1, "buffersize": 64 * 1024}
+    if profile == BALANCED:
+        return {
+            "concurrent_fragment_downloads": 4,
+            "http_chunk_size": 10 * _MiB,
+            "buffersize": 1 * _MiB,
+        }
+    if profile == MAX:
+        opts: dict = {
+            "concurrent_fragment_downloads": 16,
+            "http_chunk_size": 10 * _MiB,
+            "buffersize": 4 * _MiB,
+        }
+        aria2c = _find_aria2c(bin_dir)
+        if aria2c:
+            # aria2c splits one progressive file over several connections;
+            # fragmented formats stay on the native downloader above
+            opts["external_downloader"] = {"http": aria2c}
+            opts["external_downloader_args"] = {"aria2c": ["-x", "8", "-s", "8", "-k", "1M"]}
+        return opts
+    return {}
+
+
+def _find_aria2c(bin_dir: Path | None) -> str | None:
+    if bin_dir is not None:
+        for name in ("aria2c.exe", "aria2c"):
+            candidate = bin_dir / name
+            if candidate.exists():
+                return str(candidate)
+    return shutil.which("aria2c")
+
+
+def host_key(url: str) -> str:
+    try:
+        host = (urlsplit(url).hostname or "").lower()
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+class ThroughputTuner:
+    """Learns which profile is fastest for each host.
+
+    Stats live in one small JSON file: per host, a smoothed bytes/second
+    and a sample count for every profile tried, plus the extractors seen on
+    that host. The extractor is only known once a job has run, so choices
+    are made per host, which in practice maps to one extractor.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict] | None = None
+
+    def resolve(self, profile: str, url: str) -> str:
+        """The concrete profile to use for *url*; ``auto`` is looked up, others pass through."""
+        profile = (profile or AUTO).strip().lower()
+        if profile in PROFILES:
+            return profile
+        return self.choose(host_key(url))
+
+    def choose(self, key: str) -> str:
+        with self._lock:
+            stats = self._load().get(key, {}).get("profiles", {})
+        # Try every profile a few times before trusting the averages
+        for profile in (BALANCED, MAX, CONSERVATIVE):
+            if stats.get(profile, {}).get("n", 0) < MIN_SAMPLES:
+                return profile
+        if random.random() < EXPLORE_RATE:
+            return random.choice(PROFILES)
+        return max(PROFILES, key=lambda p: stats[p]["bps"])
+
+    def record(self, url: str, profile: str, bytes_per_sec: float, extractor: str = "") -> None:
+        key = host_key(url)
+        if not key or profile not in PROFILES or bytes_per_sec <= 0:
+            return
+        with self._lock:
+            entry = self._load().setdefault(key, {"profiles": {}, "extractors": []})
+            s = entry["profiles"].setdefault(profile, {"n": 0, "bps": 0.0})
+            s["bps"] = bytes_per_sec if not s["n"] else (
+                SMOOTHING * bytes_per_sec + (1 - SMOOTHING) * s["bps"]
+            )
+            s["n"] += 1
+            if extractor and extractor not in entry["extractors"]:
+                entry["extractors"].append(extractor)
+            self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return json.loads(json.dumps(self._load()))
+
+    def _load(self) -> dict:
+        if self._stats is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            self._stats = data if isinstance(data, dict) else {}
+        return self._stats
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._stats), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[tuning] could not save throughput stats: {e!r}")
@@ -1,10 +1,34 @@
-"""Check for app and dependency updates using only stdlib."""
+"""Check for app and dependency updates using only stdlib.
+
+Installed versions come from ``importlib.metadata``; latest versions come
+from the PyPI JSON API (all packages at once) and the GitHub releases API.
+Answers are cached on disk with their ETag: within CHECK_INTERVAL the cache
+is used without asking, and after that a conditional request usually comes
+back as an empty 304.
+"""
 from __future__ import annotations
 
+import hashlib
 import json
+import os
 import subprocess
 import sys
+import time
+import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
+from typing import Callable
+
+from app import bandwidth
+from app.deps import get_data_dir
+
+CHECK_INTERVAL = 6 * 3600  # seconds before a cached answer is checked again
+RELEASES_URL = "https://api.github.com/repos/Perhaskadas/yt-dl_GUI/releases/latest"
+PYPI_URL = "https://pypi.org/pypi/{}/json"
+
+# PyPI project name -> key in check_pip_updates' result
+PIP_PACKAGES = {"yt-dlp": "yt_dlp", "yt-dlp-ejs": "yt_dlp_ejs"}
 
 
 def _parse_version(s: str) -> tuple[int, ...]:
@@ -12,14 +36,53 @@ def _parse_version(s: str) -> tuple[int, ...]:
     return tuple(int(x) for x in s.lstrip("v").split("."))
 
 
-def check_for_app_update(current_version: str) -> dict | None:
-    """Hit GitHub Releases API; return release info dict if newer, else None."""
-    url = "https://api.github.com/repos/Perhaskadas/yt-dl_GUI/releases/latest"
-    req = urllib.request.Request(url, headers={"Accept": "application/vnd.github+json"})
+def _fetch_json(url: str, extract: Callable[[dict], dict], headers: dict | None = None) -> dict | None:
+    """``extract(json)`` for *url*, answered from the on-disk cache when it can be.
+
+    Only the extracted dict is cached (PyPI's full answer lists every
+    release ever made). Returns None if there is no answer, fresh or cached.
+    """
+    path = get_data_dir() / "cache" / "http" / (hashlib.sha1(url.encode()).hexdigest() + ".json")
     try:
-        with urllib.request.urlopen(req, timeout=8) as resp:
-            data = json.loads(resp.read().decode())
+        cached = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        cached = None
+    if cached and time.time() - cached.get("checked", 0) < CHECK_INTERVAL:
+        return cached.get("value")
+
+    headers = dict(headers or {}, **{"User-Agent": "yt-dlp-gui"})
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    req = urllib.request.Request(url, headers=headers)
+    try:
+        with bandwidth.budget.lease(bandwidth.BACKGROUND), urllib.request.urlopen(req, timeout=8) as resp:
+            entry = {"etag": resp.headers.get("ETag"), "value": extract(json.loads(resp.read().decode()))}
+    except urllib.error.HTTPError as e:
+        if e.code != 304 or not cached:
+            return None
+        entry = cached
     except Exception:
+        return cached.get("value") if cached else None
+
+    entry["checked"] = time.time()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entry), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return entry["value"]
+
+
+def check_for_app_update(current_version: str) -> dict | None:
+    """Hit GitHub Releases API; return release info dict if newer, else None."""
+    data = _fetch_json(
+        RELEASES_URL,
+        lambda d: {k: d.get(k) for k in ("tag_name", "name", "body", "html_url")},
+        {"Accept": "application/vnd.github+json"},
+    )
+    if not data:
         return None
 
     tag = data.get("tag_name", "")
@@ -46,32 +109,28 @@ def check_pip_updates() -> dict[str, str | None]:
     Only intended for dev (non-frozen) mode.  Returns e.g.
     {"yt_dlp": "2026.3.1", "yt_dlp_ejs": None}
     """
-    result: dict[str, str | None] = {"yt_dlp": None, "yt_dlp_ejs": None}
-    for pkg, key in [("yt-dlp", "yt_dlp"), ("yt-dlp-ejs", "yt_dlp_ejs")]:
+    result: dict[str, str | None] = {key: None for key in PIP_PACKAGES.values()}
+    installed: dict[str, str] = {}
+    for pkg in PIP_PACKAGES:
+        try:
+            installed[pkg] = metadata.version(pkg)
+        except metadata.PackageNotFoundError:
+            continue
+    if not installed:
+        return result
+
+    def _latest(pkg: str) -> str | None:
+        data = _fetch_json(PYPI_URL.format(pkg), lambda d: {"version": (d.get("info") or {}).get("version")})
+        return (data or {}).get("version")
+
+    with ThreadPoolExecutor(len(installed)) as pool:
+        latest = dict(zip(installed, pool.map(_latest, installed)))
+
+    for pkg, cur in installed.items():
         try:
-            proc = subprocess.run(
-                [sys.executable, "-m", "pip", "index", "versions", pkg],
-                capture_output=True, text=True, timeout=10,
-            )
-            if proc.returncode != 0:
-                continue
-            # Output like: "yt-dlp (2026.03.01)"
-            out = proc.stdout.strip()
-            latest = out.split("(")[1].split(")")[0].strip() if "(" in out else None
-            if not latest:
-                continue
-            # Compare to installed
-            installed = subprocess.run(
-                [sys.executable, "-m", "pip", "show", pkg],
-                capture_output=True, text=True, timeout=10,
-            )
-            for line in installed.stdout.splitlines():
-                if line.startswith("Version:"):
-                    cur = line.split(":", 1)[1].strip()
-                    if _parse_version(latest) > _parse_version(cur):
-                        result[key] = latest
-                    break
-        except Exception:
+            if latest[pkg] and _parse_version(latest[pkg]) > _parse_version(cur):
+                result[PIP_PACKAGES[pkg]] = latest[pkg]
+        except ValueError:
             continue
     return result
 
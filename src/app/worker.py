@@ -0,0 +1,470 @@
+"""Long-lived yt-dlp worker processes.
+
+Starting ``python -m yt_dlp`` for every probe and download pays for a fresh
+interpreter and the yt-dlp import (often over a second) before any network
+I/O. Instead we keep a few worker processes around that have already
+imported ``yt_dlp`` and hand them requests over a pipe.
+
+Protocol: one JSON object per line. The parent writes requests to the
+worker's stdin; the worker replies on its stdout with zero or more
+``log``/``progress``/``file``/``meta``/``entry`` messages followed by
+exactly one ``result``. Every request carries an ``id``; a ``cancel``
+message names the request it is for and may arrive before that request
+starts, so a Stop sent while an earlier request was still running isn't
+lost. A ``rate`` message sets the worker's
+download speed limit (see ``app.bandwidth``) from then on. A download
+sent with ``gate_postprocess`` sends ``postprocess_wait`` before each
+ffmpeg step and holds it until the parent answers ``postprocess_go``, so
+the runner can bound how many run at once. The worker's own
+stdout is redirected to stderr before yt-dlp is imported, so nothing but
+protocol messages ever reaches the pipe.
+
+Run as ``python -m app.worker``; the parent side is ``WorkerPool``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+MAX_JOBS_PER_WORKER = 25  # recycle after this many requests to cap leaks
+MAX_IDLE_WORKERS = 2
+
+MessageFn = Callable[[dict], None]
+
+
+class WorkerError(RuntimeError):
+    """The worker died or stopped answering."""
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+
+class Worker:
+    def __init__(self):
+        creationflags = 0
+        if sys.platform.startswith("win"):
+            creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+        # The child must be able to import this package even when we were
+        # started from a source checkout rather than an installed copy
+        env = dict(os.environ)
+        src_dir = str(Path(__file__).resolve().parents[1])
+        env["PYTHONPATH"] = src_dir + os.pathsep + env.get("PYTHONPATH", "")
+        env["PYTHONIOENCODING"] = "utf-8"
+
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "app.worker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+            env=env,
+            creationflags=creationflags,
+        )
+        self.jobs = 0
+        self.busy_with: str | None = None
+        self._request_id = 0
+        self._messages: queue.Queue[dict | None] = queue.Queue()
+        self._write_lock = threading.Lock()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def request(
+        self,
+        msg: dict,
+        on_message: MessageFn | None = None,
+        timeout: float | None = None,
+        tag: str = "",
+        cancelled: Callable[[], bool] | None = None,
+    ) -> dict:
+        """Send *msg* and block until its ``result``; other messages go to *on_message*.
+
+        If *cancelled()* is already true once the request is sent, it is
+        cancelled right away; this covers a ``cancel`` that went out while
+        the previous request was still running.
+
+        Raises WorkerError if the worker dies, and TimeoutError (after killing
+        the worker) if no result arrives within *timeout* seconds.
+        """
+        self.jobs += 1
+        self._request_id += 1
+        self.busy_with = tag or msg.get("type", "")
+        try:
+            self._send(dict(msg, id=self._request_id))
+            if cancelled is not None and cancelled():
+                self.cancel()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    reply = self._messages.get(timeout=remaining)
+                except queue.Empty:
+                    self.kill()
+                    raise TimeoutError("worker did not answer in time")
+                if reply is None:
+                    raise WorkerError(f"worker exited with code {self.proc.poll()}")
+                kind = reply.get("type")
+                if kind == "result":
+                    return reply
+                if kind != "ready" and on_message is not None:
+                    on_message(reply)
+        finally:
+            self.busy_with = None
+
+    def cancel(self) -> None:
+        """Ask the running request to stop at its next progress tick."""
+        try:
+            self._send({"type": "cancel", "id": self._request_id})
+        except WorkerError:
+            pass
+
+    def resume_postprocess(self) -> None:
+        """Let a download waiting in ``postprocess_wait`` start its ffmpeg step."""
+        try:
+            self._send({"type": "postprocess_go"})
+        except WorkerError:
+            pass
+
+    def set_rate(self, rate: float) -> None:
+        """Limit this worker's downloads to *rate* bytes/second (0 = unlimited)."""
+        try:
+            self._send({"type": "rate", "rate": rate})
+        except WorkerError:
+            pass
+
+    def kill(self) -> None:
+        if self.alive:
+            try:
+                self.proc.kill()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        # Closing stdin makes an idle worker exit on its own
+        try:
+            if self.proc.stdin:
+                self.proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            self.proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.kill()
+
+    def _send(self, msg: dict) -> None:
+        with self._write_lock:
+            try:
+                assert self.proc.stdin is not None
+                self.proc.stdin.write(json.dumps(msg) + "\n")
+                self.proc.stdin.flush()
+            except (OSError, ValueError) as e:
+                raise WorkerError(f"worker pipe closed: {e!r}") from e
+
+    def _read(self) -> None:
+        assert self.proc.stdout is not None
+        for line in self.proc.stdout:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                msg = {"type": "log", "line": line.rstrip("\n")}
+            self._messages.put(msg)
+        self._messages.put(None)
+
+
+class WorkerPool:
+    """Hands out warm workers, recycling them after MAX_JOBS_PER_WORKER requests or a crash.
+
+    Each worker serves one request at a time. ``acquire`` never blocks: if
+    no idle worker is available a new one is started, and the Runner's
+    concurrency limit is what bounds how many exist at once. Up to
+    *max_idle* healthy workers are kept warm between requests.
+    """
+
+    def __init__(self, max_idle: int = MAX_IDLE_WORKERS, max_jobs: int = MAX_JOBS_PER_WORKER):
+        self.max_idle = max_idle
+        self.max_jobs = max_jobs
+        self._idle: list[Worker] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive:
+                    return worker
+        return Worker()
+
+    def release(self, worker: Worker) -> None:
+        if worker.alive and worker.jobs < self.max_jobs:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(worker)
+                    return
+        if worker.alive:
+            worker.close()
+        else:
+            worker.kill()
+
+    def prewarm(self, n: int = 1) -> None:
+        """Start workers in the background until *n* are idle."""
+        def _run():
+            with self._lock:
+                missing = n - len(self._idle)
+            for _ in range(max(0, missing)):
+                try:
+                    worker = Worker()
+                except Exception as e:
+                    print(f"[worker] prewarm failed: {e!r}")
+                    return
+                self.release(worker)
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
+
+
+# ---------------------------------------------------------------------------
+# Child side
+# ---------------------------------------------------------------------------
+
+class _Child:
+    def __init__(self, out):
+        from app.bandwidth import TokenBucket
+        from app.ydlpool import YdlPool
+
+        self._out = out
+        self._out_lock = threading.Lock()
+        self.cancel = threading.Event()
+        self._cancel_lock = threading.Lock()
+        self._cancelled_ids: set = set()
+        self._request_id = None
+        self.postprocess_go = threading.Event()
+        self.bucket = TokenBucket()
+        self.contexts = YdlPool()
+
+    def cancel_request(self, request_id) -> None:
+        """Cancel request *request_id*, now if it is running or as soon as it starts."""
+        with self._cancel_lock:
+            if request_id is None or request_id == self._request_id:
+                self.cancel.set()
+            else:
+                self._cancelled_ids.add(request_id)
+
+    def send(self, msg: dict) -> None:
+        # Progress hooks can fire from yt-dlp's fragment threads
+        line = json.dumps(msg)
+        with self._out_lock:
+            self._out.write(line + "\n")
+            self._out.flush()
+
+    def log(self, line: str) -> None:
+        self.send({"type": "log", "line": line})
+
+    def probe(self, req: dict) -> dict:
+        import yt_dlp
+        from app import playlist
+
+        from app.ydlpool import cancellable
+
+        opts = _child_opts(req.get("opts") or {})
+        opts["logger"] = _QuietLogger()
+        with self.contexts.borrow(opts) as ydl, cancellable(ydl, self.cancel.is_set):
+            data = playlist.probe_info(ydl, req["url"])
+        if not data:
+            return {"ok": False, "error": "Preview failed"}
+        if data.get("entries"):
+            data = dict(next(iter(data["entries"]), data))
+        return {"ok": True, "info": yt_dlp.YoutubeDL.sanitize_info(data)}
+
+    def download(self, req: dict) -> dict:
+        import yt_dlp
+        from app import handoff
+        from app.bandwidth import ProgressThrottle
+        from app.library import file_record
+        from app.progress import ProgressReporter, starts_postprocessing
+
+        gated = bool(req.get("gate_postprocess"))
+        reporter = ProgressReporter(lambda event: self.send({"type": "progress", "event": event.to_dict()}))
+        throttle = ProgressThrottle(self.bucket, self.cancel.is_set)
+
+        def progress_hook(d):
+            if self.cancel.is_set():
+                raise yt_dlp.utils.DownloadCancelled("Download cancelled")
+            reporter.progress_hook(d)
+            throttle(d)
+
+        def postprocessor_hook(d):
+            if gated and starts_postprocessing(d):
+                self.postprocess_go.clear()
+                self.send({"type": "postprocess_wait", "postprocessor": d.get("postprocessor") or ""})
+                while not self.postprocess_go.wait(0.25):
+                    if self.cancel.is_set():
+                        raise yt_dlp.utils.DownloadCancelled("Download cancelled")
+            reporter.postprocessor_hook(d)
+            record = file_record(d)
+            if record:
+                self.send({"type": "file", "file": record})
+
+        opts = _child_opts(req.get("opts") or {})
+        opts["progress_hooks"] = [progress_hook]
+        opts["postprocessor_hooks"] = [postprocessor_hook]
+        opts["logger"] = _ChildLogger(self.log)
+        with self.contexts.borrow(opts) as ydl:
+            if req.get("info"):
+                code = handoff.download_with_info(ydl, req["info"])
+            else:
+                code = ydl.download([req["url"]])
+        return {"ok": code == 0, "code": code}
+
+    def playlist(self, req: dict) -> dict:
+        from app import playlist
+
+        opts = _child_opts(req.get("opts") or {})
+        opts["logger"] = _QuietLogger()
+        with self.contexts.borrow(opts) as ydl:
+            complete = playlist.enumerate_playlist(
+                ydl,
+                req["url"],
+                start=int(req.get("start") or 0),
+                on_meta=lambda meta: self.send({"type": "meta", "meta": meta}),
+                on_entry=lambda entry: self.send({"type": "entry", "entry": entry}),
+                cancelled=self.cancel.is_set,
+            )
+        return {"ok": True, "complete": complete}
+
+    def archive_ids(self, req: dict) -> dict:
+        from app.archive import archive_ids
+
+        return {"ok": True, "ids": archive_ids(list(req.get("urls") or []))}
+
+    def cookies(self, req: dict) -> dict:
+        from app.cookies import CookieSnapshots
+
+        snaps = CookieSnapshots(Path(req["dir"]), max_age=req.get("max_age") or 0)
+        path = snaps.get(req["browser"], force=bool(req.get("force")))
+        return {"ok": True, "path": str(path)}
+
+    def handle(self, req: dict) -> dict:
+        handler = {
+            "probe": self.probe,
+            "download": self.download,
+            "playlist": self.playlist,
+            "archive_ids": self.archive_ids,
+            "cookies": self.cookies,
+        }.get(req.get("type", ""))
+        if handler is None:
+            return {"ok": False, "error": f"unknown request {req.get('type')!r}"}
+        with self._cancel_lock:
+            self._request_id = req.get("id")
+            if self._request_id in self._cancelled_ids:
+                self.cancel.set()
+            else:
+                self.cancel.clear()
+            self._cancelled_ids.clear()
+        try:
+            return handler(req)
+        except BaseException as e:  # yt-dlp raises SystemExit-style errors too
+            if isinstance(e, KeyboardInterrupt):
+                raise
+            return {"ok": False, "code": 1, "error": _error_text(e), "cancelled": self.cancel.is_set()}
+
+
+class _QuietLogger:
+    def debug(self, msg): pass
+    def info(self, msg): pass
+    def warning(self, msg): pass
+    def error(self, msg): pass
+
+
+class _ChildLogger:
+    def __init__(self, log: Callable[[str], None]):
+        self._log = log
+
+    def debug(self, msg):
+        if msg:
+            self._log(str(msg))
+
+    def info(self, msg):
+        if msg:
+            self._log(str(msg))
+
+    def warning(self, msg):
+        if msg:
+            self._log(f"[warn] {msg}")
+
+    def error(self, msg):
+        if msg:
+            self._log(f"[error] {msg}")
+
+
+def _child_opts(opts: dict) -> dict:
+    opts = dict(opts)
+    # JSON turns tuples into lists; yt-dlp expects a tuple here
+    if isinstance(opts.get("cookiesfrombrowser"), list):
+        opts["cookiesfrombrowser"] = tuple(opts["cookiesfrombrowser"])
+    return opts
+
+
+def _error_text(e: BaseException) -> str:
+    text = str(e).strip() or repr(e)
+    return text.splitlines()[-1]
+
+
+def main() -> None:
+    # Keep a private copy of stdout for the protocol and point fd 1 at stderr,
+    # so stray prints from yt-dlp, ffmpeg or plugins can't corrupt it
+    out = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    child = _Child(out)
+    import yt_dlp  # noqa: F401  (the whole point: pay the import once)
+    child.send({"type": "ready", "pid": os.getpid()})
+
+    requests: queue.Queue[dict | None] = queue.Queue()
+
+    def read_stdin():
+        for line in sys.stdin:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            if msg.get("type") == "cancel":
+                child.cancel_request(msg.get("id"))
+            elif msg.get("type") == "postprocess_go":
+                child.postprocess_go.set()
+            elif msg.get("type") == "rate":
+                child.bucket.set_rate(msg.get("rate") or 0)
+            else:
+                requests.put(msg)
+        requests.put(None)
+
+    threading.Thread(target=read_stdin, daemon=True).start()
+
+    while True:
+        req = requests.get()
+        if req is None:
+            break
+        result = child.handle(req)
+        child.send(dict(result, type="result"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Reusable YoutubeDL instances for in-process probes and downloads."""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+MAX_IDLE_PER_KEY = 2
+
+# Options that change per job and are swapped in on every borrow; everything
+# else in the options dict is part of the pool key
+_PER_JOB_OPTS = ("paths", "logger", "progress_hooks", "postprocessor_hooks")
+
+
+class YdlPool:
+    """Keyed pool of ``yt_dlp.YoutubeDL`` objects.
+
+    Building a YoutubeDL parses and validates options, compiles the format
+    selector, sets up postprocessors and, on first request, loads the cookie
+    jar (which for --cookies-from-browser means decrypting the browser
+    database) and instantiates extractors. All of that is reused here.
+
+    Instances are keyed by their options minus the per-job ones (output
+    paths, logger, hooks), so a key effectively means "cookie source +
+    preset family". A borrowed instance belongs to one thread until it is
+    returned. Instances with the same cookie source share one cookie jar, so
+    a probe followed by a download of the same URL only loads cookies once.
+
+    A cookie file is treated as read-only input: pooled instances are not
+    allowed to write it back, and an instance is rebuilt when the file has
+    been replaced since it was created. The ``download_archive`` file is
+    shared with other instances and worker processes, so its id set is
+    reloaded whenever the file has changed since the instance last read it.
+    Call ``invalidate`` when something else outside the options changes.
+    """
+
+    def __init__(self, max_idle_per_key: int = MAX_IDLE_PER_KEY):
+        self.max_idle_per_key = max_idle_per_key
+        self._idle: dict[str, list] = {}
+        self._jars: dict[str, tuple[float, object]] = {}  # jar_key -> (created, jar)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def borrow(self, opts: dict) -> Iterator:
+        """Yield a YoutubeDL configured with *opts*, reusing an idle one when possible."""
+        import yt_dlp
+
+        base = {k: v for k, v in opts.items() if k not in _PER_JOB_OPTS}
+        key = _opts_key(base)
+        jar_key = _opts_key({k: base.get(k) for k in ("cookiefile", "cookiesfrombrowser")})
+
+        cookies_mtime = _mtime(base.get("cookiefile"))
+
+        with self._lock:
+            idle = self._idle.get(key) or []
+            ydl = idle.pop() if idle else None
+            jar_entry = self._jars.get(jar_key)
+            if jar_entry is not None and jar_entry[0] < cookies_mtime:
+                self._jars.pop(jar_key, None)
+                jar_entry = None
+            generation = self._generation
+
+        if ydl is not None and ydl._pool_created < cookies_mtime:
+            _close(ydl)
+            ydl = None
+
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(dict(base, logger=opts.get("logger")))  # type: ignore[arg-type]
+            ydl._pool_created = time.time()
+            if jar_entry is not None:
+                # cookiejar is a cached_property; seeding it skips the load
+                ydl.__dict__["cookiejar"] = jar_entry[1]
+
+        _prepare(ydl, opts)
+        _refresh_archive(ydl)
+        ok = False
+        try:
+            yield ydl
+            ok = True
+        except yt_dlp.utils.YoutubeDLError:
+            # Ordinary download/extraction failures leave the instance usable
+            ok = True
+            raise
+        finally:
+            _prepare(ydl, {})
+            self._give_back(key, jar_key, generation, ydl, ok)
+
+    def invalidate(self) -> None:
+        """Drop every idle instance and shared cookie jar."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+            self._jars = {}
+            self._generation += 1
+        for instances in idle.values():
+            for ydl in instances:
+                _close(ydl)
+
+    def _give_back(self, key: str, jar_key: str, generation: int, ydl, ok: bool) -> None:
+        with self._lock:
+            current = generation == self._generation
+            if current and "cookiejar" in ydl.__dict__:
+                self._jars.setdefault(jar_key, (ydl._pool_created, ydl.__dict__["cookiejar"]))
+            idle = self._idle.setdefault(key, [])
+            if ok and current and len(idle) < self.max_idle_per_key:
+                idle.append(ydl)
+                return
+        _close(ydl)
+
+
+@contextmanager
+def cancellable(ydl, cancelled: Callable[[], bool]) -> Iterator:
+    """Make *ydl*'s requests raise ``DownloadCancelled`` once *cancelled()* is true.
+
+    yt-dlp can't interrupt an extraction, but extractors fetch everything
+    through ``YoutubeDL.urlopen``, so this stops one at its next request.
+    """
+    import yt_dlp
+
+    urlopen = ydl.urlopen
+
+    def guarded(req):
+        if cancelled():
+            raise yt_dlp.utils.DownloadCancelled("Cancelled")
+        return urlopen(req)
+
+    ydl.urlopen = guarded
+    try:
+        yield ydl
+    finally:
+        del ydl.urlopen
+
+
+def _prepare(ydl, opts: dict) -> None:
+    """Swap the per-job options of a pooled instance."""
+    ydl.params["paths"] = opts.get("paths") or {}
+    ydl.params["logger"] = opts.get("logger")
+    ydl._progress_hooks = list(opts.get("progress_hooks") or [])
+    ydl._postprocessor_hooks = list(opts.get("postprocessor_hooks") or [])
+    # Postprocessors built from params["postprocessors"] copied the hooks the
+    # instance had when it was created; give them this job's, as a fresh
+    # YoutubeDL(opts) would
+    for pps in ydl._pps.values():
+        for pp in pps:
+            pp._progress_hooks = [pp.report_progress, *ydl._postprocessor_hooks]
+    ydl._download_retcode = 0
+    ydl._num_downloads = 0
+
+
+def _refresh_archive(ydl) -> None:
+    """Reload ``ydl.archive`` if the archive file changed since it was read."""
+    path = ydl.params.get("download_archive")
+    if not isinstance(path, (str, os.PathLike)):
+        return
+    try:
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    if not hasattr(ydl, "_pool_archive_stamp"):
+        # Loaded by YoutubeDL.__init__ just now
+        ydl._pool_archive_stamp = stamp
+        return
+    if stamp == ydl._pool_archive_stamp:
+        return
+    archive = set()
+    try:
+        with open(path, encoding="utf-8") as f:
+            archive.update(line.strip() for line in f)
+    except OSError:
+        pass
+    archive.discard("")
+    ydl.archive = archive
+    ydl._pool_archive_stamp = stamp
+
+
+def _close(ydl) -> None:
+    # close() saves the jar back to the cookie file; ours are snapshots
+    ydl.params["cookiefile"] = None
+    try:
+        ydl.close()
+    except Exception:
+        pass
+
+
+def _mtime(path: str | None) -> float:
+    if not path:
+        return 0.0
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def _opts_key(opts: dict) -> str:
+    return json.dumps(opts, sort_keys=True, default=repr)
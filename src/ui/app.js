@@ -23,6 +23,7 @@ const setupText = document.getElementById("setupText");
 const setupIndicator = document.getElementById("setupIndicator");
 const setupPct = document.getElementById("setupPct");
 const setupProgress = setupOverlay ? setupOverlay.querySelector(".progress") : null;
+const depProgress = {}; // dep label -> pct, -1 while unknown
 
 // Update modal
 const updateModal = document.getElementById("updateModal");
@@ -37,6 +38,38 @@ const previewSkeleton = document.getElementById("previewSkeleton");
 const previewPanel = document.getElementById("previewPanel");
 const logPanel = document.getElementById("logPanel");
 
+// Download queue
+const queuePanel = document.getElementById("queuePanel");
+const queueList = document.getElementById("queueList");
+const queueSummary = document.getElementById("queueSummary");
+const concurrencyEl = document.getElementById("concurrencyEl");
+const throughputEl = document.getElementById("throughputEl");
+const bandwidthEl = document.getElementById("bandwidthEl");
+
+// History elements
+const historyPanel = document.getElementById("historyPanel");
+const historySearch = document.getElementById("historySearch");
+const historySummary = document.getElementById("historySummary");
+const historyList = document.getElementById("historyList");
+const btnHistoryMore = document.getElementById("btnHistoryMore");
+
+// Import elements
+const importModal = document.getElementById("importModal");
+const importText = document.getElementById("importText");
+const btnImport = document.getElementById("btnImport");
+const btnImportFile = document.getElementById("btnImportFile");
+const btnImportStart = document.getElementById("btnImportStart");
+const btnImportCancel = document.getElementById("btnImportCancel");
+
+// Playlist elements
+const tabPlaylist = document.getElementById("tabPlaylist");
+const playlistPanel = document.getElementById("playlistPanel");
+const playlistList = document.getElementById("playlistList");
+const playlistSummary = document.getElementById("playlistSummary");
+const btnPlaylistAll = document.getElementById("btnPlaylistAll");
+const btnPlaylistNone = document.getElementById("btnPlaylistNone");
+const btnPlaylistStop = document.getElementById("btnPlaylistStop");
+
 // Tab bar
 const tabBtns = document.querySelectorAll(".tab-bar .tab-btn");
 
@@ -162,9 +195,141 @@ function hideDoneModal() {
   doneModal.classList.add("hidden");
 }
 
-function log(line) {
-  logEl.textContent += line + "\n";
-  logEl.scrollTop = logEl.scrollHeight;
+function formatLogLine(line, jobId) {
+  // Tag lines with a short job id so parallel downloads stay readable
+  return jobId ? `[${jobId.slice(0, 6)}] ${line}` : line;
+}
+
+// ---------- Log view ----------
+// Lines live in a fixed-size ring buffer and only the rows in view are put in
+// the DOM, so appending is O(1) and rendering cost doesn't grow with the log.
+// The full session log is kept on disk by Python (see "Download full log").
+
+const logSpacer = logEl.querySelector(".log-spacer");
+const logRows = logEl.querySelector(".log-rows");
+const logCountEl = document.getElementById("logCount");
+const logCapEl = document.getElementById("logCapEl");
+const btnSaveLog = document.getElementById("btnSaveLog");
+
+const LOG_OVERSCAN = 20;
+
+const logBuf = {
+  lines: new Array(5000),
+  start: 0,   // index of the oldest line
+  size: 0,
+  dropped: 0, // lines pushed out by the cap since the last clear
+};
+
+let logRowHeight = 19;
+let logFollow = true;      // keep the newest line in view until the user scrolls up
+let logRenderQueued = false;
+
+function logCapacity() {
+  return logBuf.lines.length;
+}
+
+function logAt(i) {
+  return logBuf.lines[(logBuf.start + i) % logCapacity()];
+}
+
+function logPush(text) {
+  const cap = logCapacity();
+  if (logBuf.size < cap) {
+    logBuf.lines[(logBuf.start + logBuf.size) % cap] = text;
+    logBuf.size++;
+  } else {
+    logBuf.lines[logBuf.start] = text;
+    logBuf.start = (logBuf.start + 1) % cap;
+    logBuf.dropped++;
+  }
+}
+
+function setLogCapacity(cap) {
+  // Keep the newest lines that still fit
+  const keep = Math.min(logBuf.size, cap);
+  const lines = new Array(cap);
+  for (let i = 0; i < keep; i++) lines[i] = logAt(logBuf.size - keep + i);
+  logBuf.dropped += logBuf.size - keep;
+  logBuf.lines = lines;
+  logBuf.start = 0;
+  logBuf.size = keep;
+  scheduleLogRender();
+}
+
+function clearLog() {
+  logBuf.start = 0;
+  logBuf.size = 0;
+  logBuf.dropped = 0;
+  logFollow = true;
+  scheduleLogRender();
+}
+
+function scheduleLogRender() {
+  if (logRenderQueued) return;
+  logRenderQueued = true;
+  requestAnimationFrame(renderLog);
+}
+
+function renderLog() {
+  logRenderQueued = false;
+
+  logCountEl.textContent = logBuf.dropped
+    ? `${logBuf.size.toLocaleString()} lines (${logBuf.dropped.toLocaleString()} older hidden)`
+    : `${logBuf.size.toLocaleString()} lines`;
+
+  // Hidden panel has no geometry; render when it's shown again
+  if (logPanel.classList.contains("hidden")) return;
+
+  logSpacer.style.height = `${logBuf.size * logRowHeight}px`;
+  if (logFollow) logEl.scrollTop = logEl.scrollHeight;
+
+  const first = Math.max(0, Math.floor(logEl.scrollTop / logRowHeight) - LOG_OVERSCAN);
+  const visible = Math.ceil(logEl.clientHeight / logRowHeight) + LOG_OVERSCAN * 2;
+  const last = Math.min(logBuf.size, first + visible);
+
+  const rows = [];
+  for (let i = first; i < last; i++) rows.push(logAt(i));
+  logRows.textContent = rows.join("\n");
+  logRows.style.transform = `translateY(${first * logRowHeight}px)`;
+}
+
+function log(line, jobId) {
+  logLines([[jobId, line]]);
+}
+
+function logLines(entries) {
+  if (!entries.length) return;
+  for (const [jobId, line] of entries) logPush(formatLogLine(line, jobId));
+  scheduleLogRender();
+}
+
+logEl.addEventListener("scroll", () => {
+  logFollow = logEl.scrollTop + logEl.clientHeight >= logEl.scrollHeight - logRowHeight;
+  scheduleLogRender();
+}, { passive: true });
+
+window.addEventListener("resize", scheduleLogRender);
+
+logCapEl.addEventListener("change", () => {
+  localStorage.setItem("log_cap", logCapEl.value);
+  setLogCapacity(parseInt(logCapEl.value, 10) || 5000);
+});
+
+btnSaveLog.addEventListener("click", async () => {
+  try {
+    const res = await pywebview.api.save_log();
+    if (res && res.ok) showToast("Log saved");
+    else if (res && res.error !== "cancelled") showToast(res.error || "Could not save log");
+  } catch (e) {
+    log(`[error] ${e}`);
+  }
+});
+
+function initLog() {
+  const rowHeight = parseFloat(getComputedStyle(logEl).getPropertyValue("--log-row-height"));
+  if (rowHeight > 0) logRowHeight = rowHeight;
+  logCapEl.value = localStorage.getItem("log_cap") || "5000";
+  setLogCapacity(parseInt(logCapEl.value, 10) || 5000);
 }
 
 // Tab switching
@@ -176,16 +341,21 @@ function switchTab(tab) {
     btn.classList.toggle("active", btn.dataset.tab === tab);
   });
 
+  logPanel.classList.toggle("hidden", tab !== "logs");
+  queuePanel.classList.toggle("hidden", tab !== "queue");
+  playlistPanel.classList.toggle("hidden", tab !== "playlist");
+  historyPanel.classList.toggle("hidden", tab !== "history");
+  if (tab === "logs") scheduleLogRender();
+  if (tab === "history") loadHistory();
+
   if (tab === "preview") {
-    logPanel.classList.add("hidden");
     // Show the appropriate preview state
     showCurrentPreviewState();
   } else {
-    // Hide all preview states, show logs
+    // Hide all preview states
     previewEmpty.classList.add("hidden");
     previewSkeleton.classList.add("hidden");
     previewPanel.classList.add("hidden");
-    logPanel.classList.remove("hidden");
   }
 }
 
@@ -198,50 +368,639 @@ function showCurrentPreviewState() {
   previewPanel.classList.toggle("hidden", previewState !== "content");
 }
 
+let queueRunning = false;
+
 function setRunning(running) {
-  downloadBtn.disabled = running;
-  browseBtn.disabled = running;
+  // Inputs stay enabled so more downloads can be queued while jobs run
   stopBtn.disabled = !running;
 
-  // Disable inputs while downloading
-  urlEl.disabled = running;
-  presetEl.disabled = running;
-  cookiesEl.disabled = running;
-
   // Spinner on download button
   downloadBtn.classList.toggle("downloading", running);
 
-  if (running) {
+  if (running && !queueRunning) {
     // Show progress row in indeterminate mode
     progressRow.classList.add("visible");
     progressTrack.classList.add("indeterminate");
     progressTrack.classList.remove("active");
     progressIndicator.style.width = "0%";
-  } else {
+  } else if (!running) {
+    progressTrack.classList.remove("indeterminate");
+  }
+  queueRunning = running;
+}
+
+// ---------- Download queue ----------
+
+// job_id -> {job_id, url, state, progress}; insertion order is display order
+const jobs = new Map();
+
+const stateLabels = {
+  queued: "Queued",
+  running: "Downloading",
+  done: "Done",
+  failed: "Failed",
+  stopped: "Stopped",
+};
+
+function jobIsActive(job) {
+  return job.state === "queued" || job.state === "running";
+}
+
+function queuedJobIds() {
+  return [...jobs.values()].filter((j) => j.state === "queued").map((j) => j.job_id);
+}
+
+function renderQueueSummary() {
+  const all = [...jobs.values()];
+  const running = all.filter((j) => j.state === "running").length;
+  const queued = all.filter((j) => j.state === "queued").length;
+  const finished = all.length - running - queued;
+  queueSummary.textContent = all.length
+    ? `${running} running \u00b7 ${queued} queued \u00b7 ${finished} finished`
+    : "No downloads queued";
+}
+
+function renderJob(job) {
+  let li = queueList.querySelector(`[data-job-id="${job.job_id}"]`);
+  if (!li) {
+    li = document.createElement("li");
+    li.dataset.jobId = job.job_id;
+    li.innerHTML = `
+      <div class="queue-url"></div>
+      <div class="queue-state"></div>
+      <div class="progress"><div class="progress-indicator"></div></div>
+      <div class="queue-actions">
+        <button class="btn ghost" data-action="up" title="Move up">\u25B2</button>
+        <button class="btn ghost" data-action="down" title="Move down">\u25BC</button>
+        <button class="btn ghost" data-action="stop" title="Stop">\u2715</button>
+      </div>
+    `;
+    li.querySelector(".queue-url").textContent = job.title || job.url;
+    li.querySelector(".queue-url").title = job.url;
+    queueList.appendChild(li);
+  }
+
+  li.className = `queue-item ${job.state}`;
+  const pct = Math.max(0, Math.min(100, job.progress || 0));
+  li.querySelector(".queue-state").textContent =
+    job.state === "running" ? runningLabel(job, pct) : (stateLabels[job.state] || job.state);
+  li.querySelector(".progress-indicator").style.width = (job.state === "done" ? 100 : pct) + "%";
+
+  const queued = job.state === "queued";
+  li.querySelector('[data-action="up"]').disabled = !queued;
+  li.querySelector('[data-action="down"]').disabled = !queued;
+  li.querySelector('[data-action="stop"]').disabled = !jobIsActive(job);
+}
+
+const phaseLabels = {
+  merge: "Merging\u2026",
+  postprocess: "Processing\u2026",
+};
+
+function formatSpeed(bytesPerSec) {
+  return bytesPerSec ? `${formatSize(bytesPerSec)}/s` : "";
+}
+
+function runningLabel(job, pct) {
+  if (job.stage === "postprocess_wait") return "Waiting for CPU\u2026";
+  if (phaseLabels[job.phase]) return phaseLabels[job.phase];
+  const parts = [`${pct.toFixed(1)}%`];
+  if (job.speed) parts.push(formatSpeed(job.speed));
+  if (job.eta != null) parts.push(`${formatDuration(Math.round(job.eta)) || "0:00"} left`);
+  else if (job.fragment_count) parts.push(`frag ${job.fragment_index || 0}/${job.fragment_count}`);
+  return parts.join(" \u00b7 ");
+}
+
+function renderAggregateProgress() {
+  const active = [...jobs.values()].filter(jobIsActive);
+  if (!active.length) return;
+  const pct = active.reduce((sum, j) => sum + (j.progress || 0), 0) / active.length;
+  const running = active.filter((j) => j.state === "running").length;
+  const speed = active
+    .filter((j) => j.state === "running" && j.phase === "download")
+    .reduce((sum, j) => sum + (j.speed || 0), 0);
+  const rate = speed ? ` \u00b7 ${formatSpeed(speed)}` : "";
+
+  // Transition from indeterminate → determinate on first tick
+  if (progressTrack.classList.contains("indeterminate")) {
     progressTrack.classList.remove("indeterminate");
+    progressTrack.classList.add("active");
+  }
+  progressIndicator.style.width = pct + "%";
+  progressPctEl.textContent = pct.toFixed(1) + "%";
+  statusEl.textContent = active.length > 1
+    ? `Downloading ${running} of ${active.length}\u2026 ${pct.toFixed(1)}%${rate}`
+    : `Downloading\u2026 ${pct.toFixed(1)}%${rate}`;
+}
+
+function upsertJob(update) {
+  const job = Object.assign(jobs.get(update.job_id) || {}, update);
+  jobs.set(job.job_id, job);
+  renderJob(job);
+  renderQueueSummary();
+  return job;
+}
+
+function clearFinishedJobs() {
+  for (const [id, job] of jobs) {
+    if (jobIsActive(job)) continue;
+    jobs.delete(id);
+    const li = queueList.querySelector(`[data-job-id="${id}"]`);
+    if (li) li.remove();
+  }
+  renderQueueSummary();
+}
+
+queueList.addEventListener("click", async (e) => {
+  const btn = e.target.closest("button[data-action]");
+  if (!btn) return;
+  const jobId = btn.closest(".queue-item").dataset.jobId;
+  const action = btn.dataset.action;
+
+  try {
+    if (action === "stop") {
+      await pywebview.api.stop(jobId);
+      return;
+    }
+
+    const order = queuedJobIds();
+    const index = order.indexOf(jobId) + (action === "up" ? -1 : 1);
+    if (index < 0 || index >= order.length) return;
+    const res = await pywebview.api.move_job(jobId, index);
+    if (res && res.ok) reorderQueue(res.jobs);
+  } catch (err) {
+    log(`[error] ${err}`);
+  }
+});
+
+function reorderQueue(snapshot) {
+  // Jobs start in queue order, so queued rows always trail the list and can
+  // simply be re-appended in the runner's order
+  snapshot
+    .filter((j) => j.state === "queued")
+    .forEach((j) => {
+      const li = queueList.querySelector(`[data-job-id="${j.job_id}"]`);
+      if (li) queueList.appendChild(li);
+    });
+
+  const reordered = [...queueList.children]
+    .map((li) => jobs.get(li.dataset.jobId))
+    .filter(Boolean);
+  jobs.clear();
+  reordered.forEach((job) => jobs.set(job.job_id, job));
+}
+
+// ---------- Playlist ----------
+
+// playlist_id -> {entries: Map(index -> entry), selected: Set(index), listing, autoSelect}.
+// Entries can arrive before list_playlist() returns, so state is created on
+// whichever comes first and duplicates are dropped by index.
+const playlists = new Map();
+let activePlaylist = null; // {id, url}
+
+function playlistState(id) {
+  if (!playlists.has(id)) {
+    playlists.set(id, { entries: new Map(), selected: new Set(), listing: true, autoSelect: true });
+  }
+  return playlists.get(id);
+}
+
+function formatDuration(seconds) {
+  if (!seconds || seconds < 0) return "";
+  const h = Math.floor(seconds / 3600);
+  const m = Math.floor((seconds % 3600) / 60);
+  const s = String(seconds % 60).padStart(2, "0");
+  return h ? `${h}:${String(m).padStart(2, "0")}:${s}` : `${m}:${s}`;
+}
+
+function playlistRow(entry, checked) {
+  const li = document.createElement("li");
+  li.className = "playlist-item";
+  li.innerHTML = `
+    <label>
+      <input type="checkbox" />
+      <span class="playlist-index"></span>
+      <span class="playlist-title"></span>
+      <span class="playlist-duration"></span>
+    </label>
+  `;
+  const box = li.querySelector("input");
+  box.dataset.index = entry.index;
+  box.checked = checked;
+  li.querySelector(".playlist-index").textContent = entry.index;
+  li.querySelector(".playlist-title").textContent = entry.title;
+  li.querySelector(".playlist-title").title = entry.url || entry.title;
+  li.querySelector(".playlist-duration").textContent = formatDuration(entry.duration);
+  return li;
+}
+
+function addPlaylistEntries(id, entries) {
+  const state = playlistState(id);
+  const active = activePlaylist && activePlaylist.id === id;
+  const frag = document.createDocumentFragment();
+  for (const entry of entries) {
+    if (state.entries.has(entry.index)) continue;
+    state.entries.set(entry.index, entry);
+    if (state.autoSelect) state.selected.add(entry.index);
+    if (active) frag.appendChild(playlistRow(entry, state.selected.has(entry.index)));
+  }
+  if (active) {
+    playlistList.appendChild(frag);
+    renderPlaylistSummary();
+  }
+}
+
+function renderPlaylist() {
+  playlistList.textContent = "";
+  if (!activePlaylist) return;
+  const state = playlistState(activePlaylist.id);
+  const frag = document.createDocumentFragment();
+  [...state.entries.values()]
+    .sort((a, b) => a.index - b.index)
+    .forEach((entry) => frag.appendChild(playlistRow(entry, state.selected.has(entry.index))));
+  playlistList.appendChild(frag);
+  renderPlaylistSummary();
+}
+
+function renderPlaylistSummary() {
+  if (!activePlaylist) return;
+  const state = playlistState(activePlaylist.id);
+  const listing = state.listing ? " \u00b7 listing\u2026" : "";
+  playlistSummary.textContent =
+    `${state.entries.size} entries \u00b7 ${state.selected.size} selected${listing}`;
+  btnPlaylistStop.disabled = !state.listing;
+}
+
+function selectAllPlaylist(on) {
+  if (!activePlaylist) return;
+  const state = playlistState(activePlaylist.id);
+  state.autoSelect = on;
+  state.selected = on ? new Set(state.entries.keys()) : new Set();
+  playlistList.querySelectorAll("input[type=checkbox]").forEach((box) => (box.checked = on));
+  renderPlaylistSummary();
+}
+
+async function openPlaylist(url, refresh = false) {
+  try {
+    const res = await pywebview.api.list_playlist(url, cookiesEl.value || "", refresh);
+    if (!res || !res.ok) {
+      showToast((res && res.error) || "Could not list playlist");
+      return;
+    }
+    if (refresh) playlists.delete(res.playlist_id);
+    const state = playlistState(res.playlist_id);
+    if (res.complete) state.listing = false;
+    activePlaylist = { id: res.playlist_id, url };
+    tabPlaylist.classList.remove("hidden");
+    renderPlaylist();
+    addPlaylistEntries(res.playlist_id, res.entries || []);
+  } catch (e) {
+    log(`[ui] list_playlist failed: ${e}`);
+  }
+}
+
+function closePlaylist() {
+  activePlaylist = null;
+  tabPlaylist.classList.add("hidden");
+  playlistList.textContent = "";
+  if (currentTab === "playlist") switchTab("preview");
+}
+
+playlistList.addEventListener("change", (e) => {
+  const box = e.target.closest("input[type=checkbox]");
+  if (!box || !activePlaylist) return;
+  const state = playlistState(activePlaylist.id);
+  const index = parseInt(box.dataset.index, 10);
+  if (box.checked) state.selected.add(index);
+  else state.selected.delete(index);
+  renderPlaylistSummary();
+});
+
+btnPlaylistAll.addEventListener("click", () => selectAllPlaylist(true));
+btnPlaylistNone.addEventListener("click", () => selectAllPlaylist(false));
+btnPlaylistStop.addEventListener("click", async () => {
+  if (!activePlaylist) return;
+  try {
+    await pywebview.api.stop_playlist(activePlaylist.id);
+  } catch (e) {
+    log(`[ui] stop_playlist failed: ${e}`);
+  }
+});
+
+// ---------- History ----------
+
+const HISTORY_PAGE = 100;
+let historyOffset = 0;
+let historyReqId = 0;
+let historyTimer = null;
+
+function formatSize(bytes) {
+  if (!bytes) return "";
+  const units = ["B", "KB", "MB", "GB", "TB"];
+  let i = 0;
+  while (bytes >= 1024 && i < units.length - 1) {
+    bytes /= 1024;
+    i++;
+  }
+  return `${bytes.toFixed(i ? 1 : 0)} ${units[i]}`;
+}
+
+function historyRow(item) {
+  const li = document.createElement("li");
+  li.className = `queue-item history-item${item.exists ? "" : " missing"}`;
+  li.dataset.id = item.id;
+  li.dataset.folder = item.folder;
+  li.innerHTML = `
+    <div>
+      <div class="queue-url"></div>
+      <div class="history-meta"></div>
+    </div>
+    <div class="queue-actions">
+      <button class="btn ghost" data-action="folder" title="Open folder">\u2197</button>
+      <button class="btn ghost" data-action="forget" title="Remove from history">\u2715</button>
+    </div>
+  `;
+  li.querySelector(".queue-url").textContent = item.title || item.url;
+  li.querySelector(".queue-url").title = item.path || item.url;
+  const when = new Date(item.finished_at * 1000).toLocaleString();
+  li.querySelector(".history-meta").textContent = [item.uploader, item.preset, formatSize(item.size), when]
+    .filter(Boolean)
+    .join(" \u00b7 ");
+  li.querySelector('[data-action="folder"]').disabled = !item.exists;
+  return li;
+}
+
+async function loadHistory(more = false) {
+  if (!more) historyOffset = 0;
+  const myId = ++historyReqId;
+  try {
+    const res = await pywebview.api.search_history(historySearch.value, HISTORY_PAGE, historyOffset);
+    if (myId !== historyReqId || !res || !res.ok) return;
+    if (!more) historyList.textContent = "";
+    const frag = document.createDocumentFragment();
+    res.items.forEach((item) => frag.appendChild(historyRow(item)));
+    historyList.appendChild(frag);
+    historyOffset += res.items.length;
+    historySummary.textContent = `${res.total} downloads`;
+    btnHistoryMore.classList.toggle("hidden", res.items.length < HISTORY_PAGE);
+  } catch (e) {
+    log(`[ui] search_history failed: ${e}`);
+  }
+}
+
+historySearch.addEventListener("input", () => {
+  clearTimeout(historyTimer);
+  historyTimer = setTimeout(() => loadHistory(), 200);
+});
+
+btnHistoryMore.addEventListener("click", () => loadHistory(true));
+
+historyList.addEventListener("click", async (e) => {
+  const btn = e.target.closest("button[data-action]");
+  if (!btn) return;
+  const li = btn.closest(".history-item");
+  try {
+    if (btn.dataset.action === "folder") {
+      const res = await pywebview.api.open_folder(li.dataset.folder);
+      if (!res.ok) showToast(res.error || "Could not open folder");
+    } else if (btn.dataset.action === "forget") {
+      const res = await pywebview.api.delete_history(parseInt(li.dataset.id, 10));
+      if (res && res.ok) li.remove();
+    }
+  } catch (err) {
+    log(`[error] ${err}`);
+  }
+});
+
+// Last start_download call that skipped already-downloaded URLs, for "Download again"
+let lastSkippedDownload = null;
+
+function reportAlreadyDownloaded(items, args) {
+  if (!items || !items.length) return;
+  lastSkippedDownload = [items.map((i) => i.url).join("\n"), ...args.slice(1)];
+  const what = items.length === 1 ? `"${escapeHtml(items[0].title || items[0].url)}" was` : `${items.length} videos were`;
+  showToastHtml(
+    `<div class="toast-title">Already downloaded</div>` +
+    `<div>${what} downloaded before with this preset and skipped.</div>` +
+    `<button class="btn" style="margin-top:8px" onclick="downloadAgain()">Download again</button>`,
+    6000,
+  );
+}
+
+async function downloadAgain() {
+  if (!lastSkippedDownload) return;
+  const args = lastSkippedDownload;
+  lastSkippedDownload = null;
+  hideToast();
+  try {
+    const res = await pywebview.api.start_download(...args, true);
+    if (!res.ok) showToast(res.error || "Error starting download");
+    else switchTab("queue");
+  } catch (e) {
+    log(`[error] ${e}`);
+  }
+}
+
+function escapeHtml(s) {
+  const div = document.createElement("div");
+  div.textContent = s;
+  return div.innerHTML;
+}
+
+// ---------- Bulk import ----------
+
+let importRunning = false;
+
+function importSummary(stats) {
+  return `${stats.queued} queued \u00b7 ${stats.archived} already downloaded \u00b7 ${stats.duplicates} duplicates`;
+}
+
+function importInputProblems() {
+  const problems = [];
+  if (!outEl.value.trim()) problems.push("Select an output folder.");
+  if (importRunning) problems.push("An import is already running.");
+  return problems;
+}
+
+async function startImport(fromFile) {
+  const problems = importInputProblems();
+  if (!fromFile && !importText.value.trim()) problems.push("Paste at least one URL.");
+  if (problems.length) {
+    showToastList(problems);
+    return;
+  }
+
+  const args = [outEl.value.trim(), presetEl.value || "best", cookiesEl.value || ""];
+  try {
+    const res = fromFile
+      ? await pywebview.api.import_file(...args)
+      : await pywebview.api.import_urls(importText.value, ...args);
+    if (!res || !res.ok) {
+      if (res && res.error !== "cancelled") showToast(res.error || "Import failed");
+      return;
+    }
+    importRunning = true;
+    btnImport.disabled = true;
+    importText.value = "";
+    importModal.classList.add("hidden");
+    if (!queueRunning) {
+      clearLog();
+      clearFinishedJobs();
+    }
+    statusEl.textContent = "Importing\u2026";
+    switchTab("queue");
+  } catch (e) {
+    log(`[error] ${e}`);
+    showToast("Unexpected error. Check logs.");
+  }
+}
+
+btnImport.addEventListener("click", () => {
+  importModal.classList.remove("hidden");
+  importText.focus();
+});
+btnImportCancel.addEventListener("click", () => importModal.classList.add("hidden"));
+btnImportStart.addEventListener("click", () => startImport(false));
+btnImportFile.addEventListener("click", () => startImport(true));
+importModal.addEventListener("click", (e) => {
+  if (e.target === importModal) importModal.classList.add("hidden");
+});
+
+// ---------- Debug panel ----------
+
+const debugModal = document.getElementById("debugModal");
+const debugStartup = document.getElementById("debugStartup");
+const debugHistory = document.getElementById("debugHistory");
+const debugCpu = document.getElementById("debugCpu");
+const debugMemory = document.getElementById("debugMemory");
+const debugStatus = document.getElementById("debugStatus");
+const btnDebugToggle = document.getElementById("btnDebugToggle");
+let debugFolder = "";
+
+function renderDebug(res, paths) {
+  if (!res || !res.ok) return;
+  debugFolder = res.folder || "";
+  const s = res.startup;
+  debugStartup.textContent = s
+    ? `Interactive after ${Math.round(s.tti_ms)} ms (target ${s.target_ms} ms)`
+    : "Startup still running";
+  debugHistory.innerHTML = (res.history || [])
+    .slice()
+    .reverse()
+    .map((h) => `<li>${new Date(h.at * 1000).toLocaleString()}: ${Math.round(h.tti_ms)} ms</li>`)
+    .join("");
+  debugCpu.checked = res.cpu;
+  debugMemory.checked = res.memory;
+  debugCpu.disabled = debugMemory.disabled = res.enabled;
+  btnDebugToggle.textContent = res.enabled ? "Stop and save" : "Start recording";
+  debugStatus.textContent = res.enabled ? `Recording \u00b7 ${res.spans} spans` : "Not recording";
+  if (paths) debugStatus.textContent = `Saved to ${paths.folder}`;
+}
+
+async function openDebug() {
+  debugModal.classList.remove("hidden");
+  try {
+    renderDebug(await pywebview.api.profiling_status());
+  } catch (e) {
+    log(`[ui] profiling_status failed: ${e}`);
   }
 }
 
+btnDebugToggle.addEventListener("click", async () => {
+  const start = btnDebugToggle.textContent === "Start recording";
+  try {
+    const res = await pywebview.api.set_profiling(start, debugCpu.checked, debugMemory.checked);
+    renderDebug(res, res && res.paths);
+  } catch (e) {
+    log(`[ui] set_profiling failed: ${e}`);
+  }
+});
+
+document.getElementById("btnDebugDump").addEventListener("click", async () => {
+  try {
+    const res = await pywebview.api.dump_profile();
+    if (res && res.ok) debugStatus.textContent = `Saved to ${res.paths.folder}`;
+    else showToast((res && res.error) || "Dump failed");
+  } catch (e) {
+    log(`[ui] dump_profile failed: ${e}`);
+  }
+});
+
+document.getElementById("btnDebugFolder").addEventListener("click", async () => {
+  if (!debugFolder) return;
+  const res = await pywebview.api.open_folder(debugFolder);
+  if (res && !res.ok) showToast("Nothing saved yet");
+});
+
+document.getElementById("btnDebugClose").addEventListener("click", () => debugModal.classList.add("hidden"));
+debugModal.addEventListener("click", (e) => {
+  if (e.target === debugModal) debugModal.classList.add("hidden");
+});
+
+document.addEventListener("keydown", (e) => {
+  if ((e.ctrlKey || e.metaKey) && e.shiftKey && e.key.toLowerCase() === "d") {
+    e.preventDefault();
+    openDebug();
+  }
+});
+
+concurrencyEl.addEventListener("change", async () => {
+  localStorage.setItem("concurrency", concurrencyEl.value);
+  try {
+    await pywebview.api.set_concurrency(parseInt(concurrencyEl.value, 10) || 0);
+  } catch (e) {
+    log(`[ui] set_concurrency failed: ${e}`);
+  }
+});
+
+throughputEl.addEventListener("change", async () => {
+  localStorage.setItem("throughput", throughputEl.value);
+  try {
+    await pywebview.api.set_throughput(throughputEl.value);
+  } catch (e) {
+    log(`[ui] set_throughput failed: ${e}`);
+  }
+});
+
+// Applies to running downloads too, no restart needed
+bandwidthEl.addEventListener("change", async () => {
+  localStorage.setItem("bandwidth", bandwidthEl.value);
+  try {
+    await pywebview.api.set_bandwidth_limit(parseInt(bandwidthEl.value, 10) || 0);
+  } catch (e) {
+    log(`[ui] set_bandwidth_limit failed: ${e}`);
+  }
+});
+
 window.ui = {
+  // One call per frame from app/bridge.py: log lines, then calls in the
+  // order they were queued (progress already coalesced to the newest value)
+  onBatch: (batch) => {
+    logLines(batch.lines || []);
+    for (const [fn, args] of batch.events || []) {
+      if (window.ui[fn]) window.ui[fn](...args);
+    }
+  },
+  // Deps install in parallel: one label naming all of them, one averaged bar
   onDepStatus: (text) => {
-    const labels = {
-      downloading_ffmpeg: "Downloading FFmpeg\u2026",
-      downloading_deno: "Downloading Deno\u2026",
-    };
-    if (setupText) setupText.textContent = labels[text] || text;
-    // Reset to indeterminate when starting a new dep
+    const names = { downloading_ffmpeg: "FFmpeg", downloading_deno: "Deno" };
+    const name = names[text] || text;
+    if (!(name in depProgress)) depProgress[name] = -1;
+    if (setupText) setupText.textContent = `Downloading ${Object.keys(depProgress).join(" and ")}\u2026`;
     if (setupProgress) setupProgress.classList.add("indeterminate");
     if (setupIndicator) setupIndicator.style.width = "0%";
     if (setupPct) setupPct.textContent = "";
   },
   onDepProgress: (info) => {
     if (!info) return;
-    const pct = info.pct;
-    if (pct >= 0 && setupProgress) {
-      setupProgress.classList.remove("indeterminate");
-      setupIndicator.style.width = Math.min(100, pct).toFixed(1) + "%";
-      setupPct.textContent = Math.min(100, pct).toFixed(0) + "%";
-    }
+    const name = { ffmpeg: "FFmpeg", deno: "Deno" }[info.dep] || info.dep;
+    depProgress[name] = info.pct;
+    const known = Object.values(depProgress);
+    if (known.some((p) => p < 0) || !setupProgress) return;
+    const pct = Math.min(100, known.reduce((a, b) => a + b, 0) / known.length);
+    setupProgress.classList.remove("indeterminate");
+    setupIndicator.style.width = pct.toFixed(1) + "%";
+    setupPct.textContent = pct.toFixed(0) + "%";
   },
   onDepComplete: (status) => {
     if (setupOverlay) setupOverlay.classList.add("hidden");
@@ -274,28 +1033,65 @@ window.ui = {
   onPipUpdateComplete: (ok) => {
     showToast(ok ? "pip update complete — restart to use new version" : "pip update failed — check logs", 4000);
   },
-  onLog: (line) => log(line),
-  onProgress: (pct) => {
-    const clamped = Math.max(0, Math.min(100, pct));
-    // Transition from indeterminate → determinate on first tick
-    if (progressTrack.classList.contains("indeterminate")) {
-      progressTrack.classList.remove("indeterminate");
-      progressTrack.classList.add("active");
-    }
-    progressIndicator.style.width = clamped + "%";
-    progressPctEl.textContent = clamped.toFixed(1) + "%";
-    statusEl.textContent = `Downloading\u2026 ${clamped.toFixed(1)}%`;
+  onImportProgress: (stats) => {
+    statusEl.textContent = `Importing\u2026 ${importSummary(stats)}`;
+  },
+  onImportDone: (stats) => {
+    importRunning = false;
+    btnImport.disabled = false;
+    if (stats.error) log(`[import] failed: ${stats.error}`);
+    showToast(`Import ${stats.stopped ? "stopped" : "finished"}: ${importSummary(stats)}`, 4200);
+    if (!stats.queued && !queueRunning) statusEl.textContent = "Ready";
+  },
+  onPlaylistEntries: (id, entries) => addPlaylistEntries(id, entries),
+  onPlaylistDone: (id, res) => {
+    playlistState(id).listing = false;
+    if (!activePlaylist || activePlaylist.id !== id) return;
+    renderPlaylistSummary();
+    if (!res.ok) showToast(res.error || "Playlist listing failed", 4000);
+  },
+  onThumbnail: (url, dataUrl) => {
+    // Fall back to the remote image if it couldn't be cached
+    if (previewState === "content" && url && pvThumb.dataset.url === url) previewSetThumbnail(dataUrl || url);
+  },
+  onLog: (line, jobId) => log(line, jobId),
+  // ev: {phase, pct, downloaded_bytes, total_bytes, speed, eta, fragment_index, fragment_count}
+  onProgress: (jobId, ev) => {
+    if (!jobs.has(jobId)) return;
+    upsertJob({
+      job_id: jobId,
+      progress: Math.max(0, Math.min(100, ev.pct || 0)),
+      phase: ev.phase,
+      speed: ev.speed,
+      eta: ev.eta,
+      fragment_index: ev.fragment_index,
+      fragment_count: ev.fragment_count,
+    });
+    renderAggregateProgress();
   },
-  onJobEnd: (code, outDir) => {
+  onJobUpdate: (job) => {
+    upsertJob(job);
+    if (jobIsActive(job)) setRunning(true);
+  },
+  onJobEnd: (jobId, code, outDir) => {
+    lastOutDir = outDir || lastOutDir;
+    if (code !== 0) log(`[ui] job ${jobId.slice(0, 6)} failed (code ${code})`);
+  },
+  onQueueIdle: (summary) => {
     setRunning(false);
-    const success = (code === 0);
+    const success = summary.failed === 0 && summary.done > 0;
     progressTrack.classList.remove("active", "indeterminate");
     if (success) {
       progressIndicator.style.width = "100%";
+      progressPctEl.textContent = "100%";
     }
-    statusEl.textContent = success ? "Complete" : `Failed (code ${code})`;
-    progressPctEl.textContent = success ? "100%" : progressPctEl.textContent;
-    showDoneModal(success, outDir);
+    const total = summary.done + summary.failed + summary.stopped;
+    if (total > 1) {
+      statusEl.textContent = `${summary.done} of ${total} complete`;
+    } else {
+      statusEl.textContent = success ? "Complete" : (summary.stopped ? "Stopped" : "Failed");
+    }
+    if (summary.done || summary.failed) showDoneModal(success, summary.out_dir);
   },
 };
 
@@ -317,38 +1113,62 @@ downloadBtn.addEventListener("click", async () => {
   // Validate first
   const problems = [];
   if (!url) problems.push("Enter a URL.");
-  else if (!isLikelyUrl(url)) problems.push("URL must start with http:// or https://");
+  else if (!url.split(/\s+/).every(isLikelyUrl)) problems.push("URL must start with http:// or https://");
   if (!outDir) problems.push("Select an output folder.");
 
+  // A listed playlist downloads its selected entries as separate jobs
+  const playlistMode = activePlaylist && activePlaylist.url === url;
+  if (playlistMode && !playlistState(activePlaylist.id).selected.size) {
+    problems.push("Select at least one playlist entry.");
+  }
+
   if (problems.length) {
     statusEl.textContent = "Fix input";
     showToastList(problems);
     return;
   }
 
-  // Clear logs
-  logEl.textContent = "";
+  // Starting a fresh batch: clear logs and finished rows from the last one
+  if (!queueRunning) {
+    clearLog();
+    clearFinishedJobs();
+  }
 
-  // Auto-switch to logs tab
-  switchTab("logs");
+  // Auto-switch to queue tab
+  switchTab("queue");
 
   // Run
   try {
-    setRunning(true);
-    progressIndicator.style.width = "0%";
-    progressPctEl.textContent = "0%";
-    statusEl.textContent = "Starting download\u2026";
+    if (!queueRunning) {
+      setRunning(true);
+      progressIndicator.style.width = "0%";
+      progressPctEl.textContent = "0%";
+      statusEl.textContent = "Starting download\u2026";
+    }
 
-    const res = await pywebview.api.start_download(url, outDir, preset, cookies);
+    let res;
+    if (playlistMode) {
+      const indexes = [...playlistState(activePlaylist.id).selected].sort((a, b) => a - b);
+      res = await pywebview.api.download_entries(activePlaylist.id, indexes, outDir, preset, cookies);
+    } else {
+      res = await pywebview.api.start_download(url, outDir, preset, cookies);
+      reportAlreadyDownloaded(res.already_downloaded, [url, outDir, preset, cookies]);
+    }
     log(`[python] ${JSON.stringify(res)}`);
 
+    if (res.already_downloaded && res.already_downloaded.length && !res.ok) {
+      if (![...jobs.values()].some(jobIsActive)) setRunning(false);
+      statusEl.textContent = "Already downloaded";
+      return;
+    }
+
     if (!res.ok) {
-      setRunning(false);
+      if (![...jobs.values()].some(jobIsActive)) setRunning(false);
       statusEl.textContent = "Error";
       showToast(res.error || "Error starting download");
     }
   } catch (e) {
-    setRunning(false);
+    if (![...jobs.values()].some(jobIsActive)) setRunning(false);
     log(`[error] ${e}`);
     statusEl.textContent = "Error";
     showToast("Unexpected error. Check logs.");
@@ -498,6 +1318,7 @@ function previewSetError(msg) {
   }
   pvThumb.classList.add("hidden");
   pvThumb.removeAttribute("src");
+  pvThumb.dataset.url = "";
   pvRefreshBtn.disabled = false;
   if (currentTab === "preview") showCurrentPreviewState();
 }
@@ -510,11 +1331,14 @@ function previewSetData(pv) {
   const badges = [];
   if (pv.uploader) badges.push(pv.uploader);
   if (pv.duration_text) badges.push(pv.duration_text);
+  if (pv.downloaded) badges.push(`Downloaded ${new Date(pv.downloaded.finished_at * 1000).toLocaleDateString()}`);
+  if (pv.is_playlist) badges.push(pv.playlist_count ? `Playlist \u00b7 ${pv.playlist_count} entries` : "Playlist");
   pvBadges.innerHTML = badges.map((b) => `<span class="preview-badge">${b}</span>`).join("");
 
-  if (pv.thumbnail) {
-    pvThumb.src = pv.thumbnail;
-    pvThumb.classList.remove("hidden");
+  // Thumbnails come from the local cache; a pending one arrives via onThumbnail
+  pvThumb.dataset.url = pv.thumbnail || "";
+  if (pv.thumbnail_data || (pv.thumbnail && !pv.thumbnail_pending)) {
+    previewSetThumbnail(pv.thumbnail_data || pv.thumbnail);
   } else {
     pvThumb.classList.add("hidden");
     pvThumb.removeAttribute("src");
@@ -523,6 +1347,11 @@ function previewSetData(pv) {
   if (currentTab === "preview") showCurrentPreviewState();
 }
 
+function previewSetThumbnail(src) {
+  pvThumb.src = src;
+  pvThumb.classList.remove("hidden");
+}
+
 let previewTimer = null;
 let lastPreviewUrl = "";
 
@@ -533,12 +1362,13 @@ function schedulePreview(url) {
 
 let previewReqId = 0;
 
-async function runPreview(url) {
+async function runPreview(url, refresh = false) {
   url = (url || "").trim();
   lastPreviewUrl = url;
 
   if (!url) {
     previewSetIdle();
+    closePlaylist();
     return;
   }
   if (!isLikelyUrl(url)) {
@@ -554,10 +1384,11 @@ async function runPreview(url) {
   const myId = ++previewReqId;
 
   try {
-    const res = await pywebview.api.probe(url, cookiesEl.value || "");
+    // latest: the backend cancels the probe this one supersedes
+    const res = await pywebview.api.probe(url, cookiesEl.value || "", refresh, true);
 
     // ignore stale responses (user typed another URL)
-    if (myId !== previewReqId) return;
+    if (myId !== previewReqId || (res && res.cancelled)) return;
 
     if (!res || !res.ok) {
       previewSetError((res && res.error) || "Preview failed");
@@ -565,6 +1396,8 @@ async function runPreview(url) {
     }
 
     previewSetData(res.preview);
+    if (res.preview.is_playlist) openPlaylist(url, refresh);
+    else closePlaylist();
   } catch (e) {
     if (myId !== previewReqId) return;
     previewSetError(String(e));
@@ -574,7 +1407,8 @@ async function runPreview(url) {
 
 urlEl.addEventListener("input", () => schedulePreview(urlEl.value));
 
-pvRefreshBtn.addEventListener("click", () => runPreview(urlEl.value));
+// Refresh bypasses the probe cache
+pvRefreshBtn.addEventListener("click", () => runPreview(urlEl.value, true));
 
 
 const themeToggle = document.getElementById("themeToggle");
@@ -608,6 +1442,9 @@ function setTheme(theme, animate = true) {
 function loadOptions() {
   presetEl.value = localStorage.getItem("preset") || "best";
   cookiesEl.value = localStorage.getItem("cookies_browser") || "";
+  concurrencyEl.value = localStorage.getItem("concurrency") || "0";
+  throughputEl.value = localStorage.getItem("throughput") || "auto";
+  bandwidthEl.value = localStorage.getItem("bandwidth") || "0";
 }
 
 async function syncOptionsToPython() {
@@ -617,6 +1454,9 @@ async function syncOptionsToPython() {
   // make python aware of cookie choice for probe/download
   try {
     await pywebview.api.set_cookies_browser(cookiesEl.value || "");
+    await pywebview.api.set_concurrency(parseInt(concurrencyEl.value, 10) || 0);
+    await pywebview.api.set_throughput(throughputEl.value);
+    await pywebview.api.set_bandwidth_limit(parseInt(bandwidthEl.value, 10) || 0);
   } catch (e) {
     // ignore if python not ready yet; logs will show
     log(`[ui] set_cookies_browser failed: ${e}`);
@@ -647,14 +1487,27 @@ cookiesEl.addEventListener("change", async () => {
 });
 
 loadOptions();
+initLog();
 
 // pywebview API bridge isn't available until the 'pywebviewready' event fires
 window.addEventListener("pywebviewready", () => {
   syncOptionsToPython();
-  checkDependencies();
-  pywebview.api.check_for_updates();
+  // Anything that can wait starts after the first frame is on screen
+  requestAnimationFrame(() => setTimeout(afterFirstPaint, 0));
 });
 
+const UPDATE_CHECK_DELAY_MS = 3000;
+
+async function afterFirstPaint() {
+  try {
+    await pywebview.api.ui_ready();
+  } catch (e) {
+    log(`[ui] ui_ready failed: ${e}`);
+  }
+  checkDependencies();
+  setTimeout(() => pywebview.api.check_for_updates(), UPDATE_CHECK_DELAY_MS);
+}
+
 
 function initTheme() {
   const saved = localStorage.getItem("theme");
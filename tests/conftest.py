@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+
+import pytest
+
+from app.runner import build_ydl_opts
+from app.ydlpool import YdlPool
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Keep the app's data dir (caches, metrics, logs) inside the test's tmp dir."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def pooled_mp3(tmp_path):
+    """Borrow a reused mp3-preset YoutubeDL with the given hooks; yields its ExtractAudio postprocessor.
+
+    The pool is warmed first, so the job gets an instance another job has
+    already used, as the second download of a session would.
+    """
+    opts = dict(build_ydl_opts("mp3", str(tmp_path), ""), quiet=True)
+    pool = YdlPool()
+    with pool.borrow(opts):
+        pass
+
+    @contextmanager
+    def borrow(**hooks):
+        with pool.borrow(dict(opts, **hooks)) as ydl:
+            yield next(pp for pps in ydl._pps.values() for pp in pps if pp.pp_key() == "ExtractAudio")
+
+    return borrow
@@ -0,0 +1,39 @@
+import time
+
+from app import api
+
+
+class FakeWorker:
+    def __init__(self):
+        self.busy_with = None
+        self.cancelled = False
+        self.killed = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def kill(self):
+        self.killed = True
+
+
+def _supersede_while(busy_with, monkeypatch):
+    monkeypatch.setattr(api, "PROBE_CANCEL_GRACE", 0.05)
+    flight = api._ProbeFlight("same-url-key", latest=True)
+    worker = FakeWorker()
+    assert flight.attach(worker)
+    worker.busy_with = flight.id
+    flight.supersede()
+    worker.busy_with = busy_with(flight)
+    time.sleep(0.2)
+    return worker
+
+
+def test_superseded_probe_is_killed_if_still_running(monkeypatch):
+    worker = _supersede_while(lambda flight: flight.id, monkeypatch)
+    assert worker.cancelled and worker.killed
+
+
+def test_new_probe_of_the_same_url_on_the_same_worker_survives(monkeypatch):
+    newer = api._ProbeFlight("same-url-key", latest=True)
+    worker = _supersede_while(lambda flight: newer.id, monkeypatch)
+    assert worker.cancelled and not worker.killed
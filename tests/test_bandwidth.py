@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+
+from app import bandwidth
+from app.bandwidth import DOWNLOAD, PROBE, BACKGROUND, BandwidthBudget, ProgressThrottle, TokenBucket
+
+
+class FakeTime:
+    """Stands in for the ``time`` module; sleeping just moves the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, s):
+        self.now += s
+        self.slept += s
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(bandwidth, "time", fake)
+    return fake
+
+
+def test_bucket_sleeps_off_everything_beyond_the_allowed_lead(clock):
+    bucket = TokenBucket(1000)
+    bucket.consume(250)  # exactly MAX_LEAD ahead: no wait
+    assert clock.slept == 0
+    bucket.consume(1000)
+    assert clock.slept == pytest.approx(1.0)
+
+
+def test_unlimited_bucket_never_sleeps(clock):
+    bucket = TokenBucket(0)
+    bucket.consume(10 ** 9)
+    assert clock.slept == 0
+
+
+def test_debt_is_repaid_at_the_new_rate(clock):
+    bucket = TokenBucket(1000)
+    bucket.consume(1250)  # sleeps 1s, leaving 250 bytes (MAX_LEAD) owed
+    assert clock.slept == pytest.approx(1.0)
+    bucket.set_rate(500)  # those 250 bytes now take 0.5s
+    bucket.consume(250)  # plus 0.5s for these, minus the lead
+    assert clock.slept == pytest.approx(1.0 + 0.75)
+
+
+def test_cancel_stops_the_wait(clock):
+    bucket = TokenBucket(100)
+    bucket.consume(10_000, cancelled=lambda: True)
+    assert clock.slept == 0
+
+
+def test_limit_is_split_by_priority_weight():
+    budget = BandwidthBudget(1300)
+    probe, download, background = budget.lease(PROBE), budget.lease(DOWNLOAD), budget.lease(BACKGROUND)
+    assert (probe.share, download.share, background.share) == (800, 400, 100)
+
+    probe.close()
+    assert (download.share, background.share) == (1040, 260)
+    assert budget.status() == {"limit": 1300, "leases": {PROBE: 0, DOWNLOAD: 1, BACKGROUND: 1}}
+
+    budget.set_limit(0)
+    assert (download.share, background.share) == (0, 0)
+
+
+def test_paused_lease_gives_its_share_back():
+    budget = BandwidthBudget(1000)
+    first, second = budget.lease(DOWNLOAD), budget.lease(DOWNLOAD)
+    assert first.share == second.share == 500
+    first.pause()
+    assert second.share == 1000
+    first.resume()
+    assert first.share == second.share == 500
+
+
+def test_concurrent_rebalances_apply_the_newest_shares_last():
+    budget = BandwidthBudget()
+    heard, entered, release = [], threading.Event(), threading.Event()
+
+    def on_share(share):
+        if share == 100:
+            entered.set()
+            release.wait(5)  # the first rebalance is slow to deliver
+        heard.append(share)
+
+    lease = budget.lease(DOWNLOAD, on_share)
+    first = threading.Thread(target=budget.set_limit, args=(100,))
+    first.start()
+    entered.wait(5)
+    second = threading.Thread(target=budget.set_limit, args=(200,))
+    second.start()
+    second.join(0.2)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert heard == [0, 100, 200]
+    assert lease.share == 200
+
+
+def test_progress_throttle_charges_each_files_new_bytes_once():
+    charged = []
+    bucket = type("Bucket", (), {"consume": lambda self, n, cancelled=None: charged.append(n)})()
+    throttle = ProgressThrottle(bucket)
+    throttle({"status": "downloading", "tmpfilename": "a", "downloaded_bytes": 100})
+    throttle({"status": "downloading", "tmpfilename": "b", "downloaded_bytes": 50})
+    throttle({"status": "downloading", "tmpfilename": "a", "downloaded_bytes": 100})
+    throttle({"status": "downloading", "tmpfilename": "a", "downloaded_bytes": 300})
+    throttle({"status": "finished", "tmpfilename": "a", "downloaded_bytes": 400})
+    assert charged == [100, 50, 200]
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from app import bridge
+
+
+@pytest.fixture
+def ui(monkeypatch):
+    """A bridge whose batches are flushed by the test instead of the dispatcher thread."""
+    monkeypatch.setattr(bridge.UiBridge, "_run", lambda self: None)
+    b = bridge.UiBridge()
+    b.batches = []
+    b.attach_sink(b.batches.append)
+    return b
+
+
+def calls(batch):
+    return [(fn, list(args)) for fn, args in batch["events"]]
+
+
+def test_progress_queued_before_the_end_is_delivered_before_it(ui):
+    ui.latest("onImportProgress", "import", {"read": 1})
+    ui.latest("onImportProgress", "import", {"read": 2})
+    ui.emit("onImportDone", {"read": 2})
+    ui.flush()
+    assert calls(ui.batches[0]) == [
+        ("onImportProgress", [{"read": 2}]),
+        ("onImportDone", [{"read": 2}]),
+    ]
+
+
+def test_latest_keeps_only_the_newest_value_at_its_position(ui):
+    ui.latest("onProgress", "a", "a", 10)
+    ui.emit("onJobUpdate", "b")
+    ui.latest("onProgress", "b", "b", 5)
+    ui.latest("onProgress", "a", "a", 20)
+    ui.flush()
+    assert calls(ui.batches[0]) == [
+        ("onJobUpdate", ["b"]),
+        ("onProgress", ["b", 5]),
+        ("onProgress", ["a", 20]),
+    ]
+
+
+def test_appended_items_go_out_as_one_call(ui):
+    for i in range(5000):
+        ui.append("onPlaylistEntries", "p1", {"index": i})
+    ui.emit("onPlaylistDone", "p1")
+    ui.flush()
+    (entries, done) = calls(ui.batches[0])
+    assert entries[0] == "onPlaylistEntries"
+    assert entries[1][0] == "p1"
+    assert [e["index"] for e in entries[1][1]] == list(range(5000))
+    assert done == ("onPlaylistDone", ["p1"])
+
+    ui.append("onPlaylistEntries", "p1", {"index": 5000})
+    ui.flush()
+    assert calls(ui.batches[1]) == [("onPlaylistEntries", ["p1", [{"index": 5000}]])]
+
+
+def test_lines_are_capped_per_flush_and_drops_summarised(ui, monkeypatch):
+    monkeypatch.setattr(bridge, "MAX_PENDING_LINES", 10)
+    monkeypatch.setattr(bridge, "MAX_LINES_PER_FLUSH", 4)
+    for i in range(15):
+        ui.log(f"line {i}")
+    ui.flush()
+    ui.flush()
+    first, second = ui.batches[0]["lines"], ui.batches[1]["lines"]
+    assert first[0] == ("", "[ui] output too fast, skipped 5 log lines")
+    assert [line for _, line in first[1:] + second] == [f"line {i}" for i in range(5, 13)]
+
+
+def test_producers_wait_for_a_flush_when_events_pile_up(ui, monkeypatch):
+    monkeypatch.setattr(bridge, "MAX_PENDING_EVENTS", 3)
+    producer = threading.Thread(target=lambda: [ui.emit("onJobUpdate", i) for i in range(5)])
+    producer.start()
+    producer.join(0.2)
+    assert producer.is_alive()
+    assert ui._queued == 3
+
+    ui.flush()
+    producer.join(1)
+    assert not producer.is_alive()
+    ui.flush()
+    assert [args[0] for batch in ui.batches for _, args in batch["events"]] == list(range(5))
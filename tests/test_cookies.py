@@ -0,0 +1,48 @@
+import os
+import time
+
+from app import cookies
+
+
+def _snapshots(tmp_path, monkeypatch, max_age=60, db_mtime=None):
+    taken = []
+
+    def export(browser, dest):
+        taken.append(browser)
+        dest.write_text(f"# snapshot {len(taken)}\n")
+
+    monkeypatch.setattr(cookies, "export_browser_cookies", export)
+    monkeypatch.setattr(cookies, "browser_db_mtime", lambda browser: db_mtime)
+    return cookies.CookieSnapshots(tmp_path / "cookies", max_age=max_age), taken
+
+
+def test_snapshot_is_reused_while_fresh(tmp_path, monkeypatch):
+    snaps, taken = _snapshots(tmp_path, monkeypatch)
+    path = snaps.get("chrome")
+    assert snaps.get("chrome") == path
+    assert taken == ["chrome"]
+    assert not list(path.parent.glob("*.tmp"))
+
+
+def test_old_snapshot_is_retaken(tmp_path, monkeypatch):
+    snaps, taken = _snapshots(tmp_path, monkeypatch)
+    path = snaps.get("chrome")
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    snaps.get("chrome")
+    assert taken == ["chrome", "chrome"]
+    assert path.read_text() == "# snapshot 2\n"
+
+
+def test_snapshot_is_retaken_when_the_browser_db_changes(tmp_path, monkeypatch):
+    snaps, taken = _snapshots(tmp_path, monkeypatch, db_mtime=time.time() + 5)
+    snaps.get("firefox")
+    snaps.get("firefox")
+    assert taken == ["firefox", "firefox"]
+
+
+def test_force_retakes_a_fresh_snapshot(tmp_path, monkeypatch):
+    snaps, taken = _snapshots(tmp_path, monkeypatch)
+    snaps.get("chrome")
+    snaps.get("chrome", force=True)
+    assert taken == ["chrome", "chrome"]
@@ -0,0 +1,148 @@
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import deps
+
+
+class Server:
+    """Serves one file with ETag and Range/If-Range support, optionally dropping connections."""
+
+    def __init__(self, data: bytes, ranges: bool = True):
+        self.data = data
+        self.etag = '"v1"'
+        self.ranges = ranges
+        self.cut_after: int | None = None  # bytes into the next full-size GET before dropping it
+        self.requests: list[str | None] = []  # Range header of each GET
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(self.headers.get("Range"))
+                data, start = server.data, 0
+                status = 200
+                rng = self.headers.get("Range")
+                if_range = self.headers.get("If-Range")
+                if server.ranges and rng and (if_range is None or if_range == server.etag):
+                    first, _, last = rng.removeprefix("bytes=").partition("-")
+                    start = int(first)
+                    end = int(last) if last else len(data) - 1
+                    status = 206
+                    body = data[start:end + 1]
+                else:
+                    body = data
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", server.etag)
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{start + len(body) - 1}/{len(data)}")
+                self.end_headers()
+                if server.cut_after is not None and len(body) > 1:
+                    cut, server.cut_after = server.cut_after, None
+                    self.wfile.write(body[:cut])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}/ffmpeg.zip"
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+DATA = random.Random(7).randbytes(300_000)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(deps.time, "sleep", lambda s: None)
+    monkeypatch.setattr(deps, "CHUNK_SIZE", 16 * 1024)
+    s = Server(DATA)
+    yield s
+    s.close()
+
+
+def _single(server, tmp_path):
+    dest = tmp_path / "ffmpeg.zip"
+    return deps._download_single(server.url, dest, None), dest
+
+
+def test_interrupted_download_resumes_with_a_range_request(server, tmp_path):
+    server.cut_after = 100_000
+    path, dest = _single(server, tmp_path)
+    assert path.read_bytes() == DATA
+    assert server.requests == [None, "bytes=100000-"]
+    assert not dest.with_name("ffmpeg.zip.part").exists()
+    assert not dest.with_name("ffmpeg.zip.part.json").exists()
+
+
+def test_part_left_by_an_earlier_launch_is_resumed(server, tmp_path):
+    dest = tmp_path / "ffmpeg.zip"
+    dest.with_name("ffmpeg.zip.part").write_bytes(DATA[:50_000])
+    dest.with_name("ffmpeg.zip.part.json").write_text(
+        json.dumps({"url": server.url, "validator": server.etag, "total": len(DATA)})
+    )
+    assert deps._download_single(server.url, dest, None).read_bytes() == DATA
+    assert server.requests == ["bytes=50000-"]
+
+
+def test_part_of_a_file_that_changed_upstream_starts_over(server, tmp_path):
+    dest = tmp_path / "ffmpeg.zip"
+    dest.with_name("ffmpeg.zip.part").write_bytes(b"x" * 50_000)
+    dest.with_name("ffmpeg.zip.part.json").write_text(
+        json.dumps({"url": server.url, "validator": '"old"', "total": len(DATA)})
+    )
+    assert deps._download_single(server.url, dest, None).read_bytes() == DATA
+
+
+def test_large_file_is_fetched_in_segments(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(deps, "SEGMENTED_MIN_SIZE", 1)
+    progress = []
+    dest = tmp_path / "ffmpeg.zip"
+    deps._download_to_file(server.url, dest, lambda read, total: progress.append((read, total)))
+
+    assert dest.read_bytes() == DATA
+    size = len(DATA)
+    segment_ranges = {f"bytes={i * size // 4}-{(i + 1) * size // 4 - 1}" for i in range(4)}
+    assert server.requests[0] == "bytes=0-0"  # the probe
+    assert set(server.requests[1:]) == segment_ranges
+    assert progress[-1] == (size, size)
+    assert not list(tmp_path.glob("ffmpeg.zip.*"))
+
+
+def test_segment_resumes_after_what_it_already_holds(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(deps, "SEGMENTED_MIN_SIZE", 1)
+    dest = tmp_path / "ffmpeg.zip"
+    size = len(DATA)
+    dest.with_name("ffmpeg.zip.seg.json").write_text(
+        json.dumps({"url": server.url, "validator": server.etag, "size": size})
+    )
+    dest.with_name("ffmpeg.zip.seg2").write_bytes(DATA[2 * size // 4:2 * size // 4 + 1000])
+
+    deps._download_to_file(server.url, dest, None)
+    assert dest.read_bytes() == DATA
+    assert f"bytes={2 * size // 4 + 1000}-{3 * size // 4 - 1}" in server.requests
+
+
+def test_server_without_ranges_gets_one_plain_download(tmp_path, monkeypatch):
+    monkeypatch.setattr(deps, "SEGMENTED_MIN_SIZE", 1)
+    server = Server(DATA, ranges=False)
+    try:
+        dest = tmp_path / "ffmpeg.zip"
+        deps._download_to_file(server.url, dest, None)
+    finally:
+        server.close()
+    assert dest.read_bytes() == DATA
+    assert server.requests == ["bytes=0-0", None]
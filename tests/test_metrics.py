@@ -0,0 +1,46 @@
+from app.metrics import JobMetrics, MetricsStore
+from app.progress import ProgressReporter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_audio_job_splits_download_and_postprocess_time(pooled_mp3):
+    clock = Clock()
+    metrics = JobMetrics("https://example.com/watch?v=1", "balanced", clock=clock)
+    reporter = ProgressReporter(metrics.on_progress, interval=0)
+    with pooled_mp3(postprocessor_hooks=[reporter.postprocessor_hook]) as extract_audio:
+        clock.now += 2  # extracting
+        metrics.on_log("[download] Destination: a.webm")
+        clock.now += 0.5
+        reporter.progress_hook({"status": "downloading", "downloaded_bytes": 1000, "total_bytes": 2000})
+        clock.now += 3
+        reporter.progress_hook({"status": "finished", "downloaded_bytes": 2000, "total_bytes": 2000})
+        metrics.waiting_for_cpu()
+        clock.now += 1
+        extract_audio._hook_progress({"status": "started"}, {})
+        clock.now += 4
+
+    m = metrics.finish("done")
+    assert m["bytes"] == 2000
+    assert (m["extract_s"], m["download_s"], m["postprocess_wait_s"], m["postprocess_s"]) == (2, 3.5, 1, 4)
+    assert m["total_s"] == 10.5
+    assert m["ttfb_s"] == 2.5
+    assert m["avg_speed"] == round(2000 / 3.5)
+
+
+def test_store_totals_per_extractor_and_host(tmp_path):
+    store = MetricsStore(tmp_path / "metrics.json")
+    metrics = JobMetrics("https://example.com/a", "balanced")
+    metrics.on_log("[generic] Extracting URL: https://example.com/a")
+    store.record(metrics.finish("done"))
+
+    (group,) = store.snapshot()["groups"]
+    assert (group["extractor"], group["host"], group["jobs"]) == ("generic", "example.com", {"done": 1})
+    assert 'ytdlp_gui_postprocess_seconds_total{extractor="generic",host="example.com"}' in store.prometheus()
+    assert store.prom_path.exists()
@@ -0,0 +1,12 @@
+from app.progress import DOWNLOAD, POSTPROCESS, ProgressReporter
+
+
+def test_mp3_transcode_reports_its_phase_through_a_pooled_instance(pooled_mp3):
+    events = []
+    reporter = ProgressReporter(events.append, interval=0)
+    with pooled_mp3(postprocessor_hooks=[reporter.postprocessor_hook]) as extract_audio:
+        reporter.progress_hook({"status": "finished", "downloaded_bytes": 10, "total_bytes": 10})
+        extract_audio._hook_progress({"status": "started"}, {})
+
+    assert [e.phase for e in events] == [DOWNLOAD, POSTPROCESS]
+    assert events[-1].postprocessor == "ExtractAudio"
@@ -0,0 +1,132 @@
+import threading
+
+from app import bandwidth
+from app.progress import starts_postprocessing
+from app.runner import STAGE_DOWNLOAD, STAGE_POSTPROCESS, JobHandle, Runner
+
+
+def test_mp3_transcode_reaches_the_postprocess_gate(pooled_mp3):
+    gated = []
+
+    def gate(d):
+        if starts_postprocessing(d):
+            gated.append(d["postprocessor"])
+
+    with pooled_mp3(postprocessor_hooks=[gate]) as extract_audio:
+        extract_audio._hook_progress({"status": "started"}, {})
+
+    assert gated == ["ExtractAudio"]
+
+
+def _handle(job_id):
+    handle = JobHandle(job_id=job_id, stop_event=threading.Event(), stage=STAGE_DOWNLOAD)
+    handle.lease = bandwidth.budget.lease(bandwidth.DOWNLOAD)
+    return handle
+
+
+def test_postprocess_slots_bound_concurrent_steps():
+    runner = Runner(2)
+    runner.postprocess_slots = threading.BoundedSemaphore(1)
+    first, second = _handle("a"), _handle("b")
+
+    assert runner._enter_postprocess(first)
+    assert first.stage == STAGE_POSTPROCESS
+    assert bandwidth.budget.status()["leases"][bandwidth.DOWNLOAD] == 1  # first's lease is paused
+
+    entered = []
+    t = threading.Thread(target=lambda: entered.append(runner._enter_postprocess(second)))
+    t.start()
+    t.join(0.5)
+    assert t.is_alive()  # waiting for the only slot
+
+    runner._leave_postprocess(first)
+    t.join(5)
+    assert entered == [True] and second.stage == STAGE_POSTPROCESS
+
+    second.lease.close()
+    first.lease.close()
+    runner._release_postprocess_slot(second)
+
+
+def test_stopped_job_gives_up_waiting_for_a_slot():
+    runner = Runner(1)
+    runner.postprocess_slots = threading.BoundedSemaphore(1)
+    holder, waiter = _handle("a"), _handle("b")
+    assert runner._enter_postprocess(holder)
+
+    waiter.stop_event.set()
+    assert runner._enter_postprocess(waiter) is False
+
+    holder.lease.close()
+    waiter.lease.close()
+
+
+class FakeWorker:
+    def __init__(self, on_request=None):
+        self.proc = type("Proc", (), {"pid": 0})()
+        self.busy_with = None
+        self.requests = []
+        self.cancels = 0
+        self._on_request = on_request
+
+    def request(self, msg, on_message=None, timeout=None, tag="", cancelled=None):
+        self.requests.append((msg["type"], tag))
+        if self._on_request:
+            self._on_request(msg)
+        return {"ok": True, "path": "cookies.txt"}
+
+    def set_rate(self, rate):
+        pass
+
+    def cancel(self):
+        self.cancels += 1
+
+
+class FakePool:
+    def __init__(self, worker):
+        self.worker = worker
+        self.released_while_attached = []
+
+    def acquire(self):
+        return self.worker
+
+    def release(self, worker):
+        self.released_while_attached.append(self.handle.worker is not None)
+
+
+def _run_worker_job(runner, handle, tmp_path, cookies_browser=""):
+    return runner._run_ytdlp_worker(
+        handle, "https://example.com/v", str(tmp_path), "best", cookies_browser,
+        on_log=lambda line: None, on_progress=None, on_file=None, on_postprocess=None,
+    )
+
+
+def test_stop_during_the_cookie_snapshot_skips_the_download(tmp_path):
+    runner = Runner(1)
+    handle = _handle("a")
+    worker = FakeWorker(on_request=lambda msg: handle.stop_event.set())
+    runner.pool = FakePool(worker)
+    runner.pool.handle = handle
+
+    code = _run_worker_job(runner, handle, tmp_path, "chrome")
+
+    assert code == 1
+    assert worker.requests == [("cookies", "a")]  # tagged, so a stuck snapshot gets killed too
+    handle.lease.close()
+
+
+def test_worker_is_detached_before_it_goes_back_to_the_pool(tmp_path):
+    runner = Runner(1)
+    handle = _handle("a")
+    worker = FakeWorker()
+    runner.pool = FakePool(worker)
+    runner.pool.handle = handle
+
+    _run_worker_job(runner, handle, tmp_path)
+    assert runner.pool.released_while_attached == [False]
+
+    # A late Stop must not reach the worker, which may serve another job now
+    runner._jobs["a"] = handle
+    runner.stop("a")
+    assert worker.cancels == 0
+    handle.lease.close()
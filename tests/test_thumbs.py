@@ -0,0 +1,41 @@
+import functools
+import http.server
+import threading
+
+import pytest
+
+from app import thumbs
+from app.thumbs import ThumbnailCache
+
+JPEG = b"\xff\xd8\xff" + b"x" * 200_000
+
+
+@pytest.fixture
+def image_url(tmp_path):
+    (tmp_path / "big.jpg").write_bytes(JPEG)
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(tmp_path))
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/big.jpg"
+    server.shutdown()
+
+
+def test_without_ffmpeg_nothing_is_cached(tmp_path, image_url, monkeypatch):
+    monkeypatch.setattr(thumbs.shutil, "which", lambda name: None)
+    cache = ThumbnailCache(tmp_path / "thumbs")
+
+    assert not cache.available()
+    assert cache.fetch(image_url) is None
+    assert cache.get(image_url) is None
+
+
+def test_downscaled_thumbnail_is_cached(tmp_path, image_url, monkeypatch):
+    small = b"\xff\xd8\xff" + b"s" * 100
+    monkeypatch.setattr(ThumbnailCache, "_downscale", lambda self, data: small)
+    cache = ThumbnailCache(tmp_path / "thumbs")
+
+    data_url = cache.fetch(image_url)
+    assert data_url.startswith("data:image/jpeg;base64,")
+    assert cache.get(image_url) == data_url
+    assert [p.stat().st_size for p in (tmp_path / "thumbs").glob("*.img")] == [len(small)]
@@ -0,0 +1,79 @@
+import io
+import json
+
+import pytest
+
+from app import worker as worker_mod
+from app.worker import Worker, _Child
+
+# Nothing listens here, so an un-cancelled probe fails on connect
+DEAD_URL = "http://127.0.0.1:9/video"
+
+
+@pytest.fixture
+def child(monkeypatch):
+    c = _Child(io.StringIO())
+    seen = []
+    monkeypatch.setattr(c, "archive_ids", lambda req: seen.append(c.cancel.is_set()) or {"ok": True})
+    c.seen = seen
+    return c
+
+
+def test_cancel_sent_before_its_request_starts_still_applies(child):
+    child.handle({"type": "archive_ids", "id": 1})
+    child.cancel_request(2)
+    child.handle({"type": "archive_ids", "id": 2})
+    assert child.seen == [False, True]
+
+
+def test_cancel_of_a_finished_request_does_not_leak_into_the_next(child):
+    child.handle({"type": "archive_ids", "id": 1})
+    child.cancel_request(1)
+    child.handle({"type": "archive_ids", "id": 2})
+    assert child.seen == [False, False]
+
+
+def test_child_replies_with_json_lines():
+    out = io.StringIO()
+    c = _Child(out)
+    c.log("hello")
+    c.send({"type": "result", "ok": True})
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == [
+        {"type": "log", "line": "hello"},
+        {"type": "result", "ok": True},
+    ]
+
+
+def test_unknown_request_is_an_error_result(child):
+    assert child.handle({"type": "nope", "id": 1}) == {"ok": False, "error": "unknown request 'nope'"}
+
+
+@pytest.fixture
+def worker():
+    w = Worker()
+    yield w
+    w.close()
+
+
+def test_worker_answers_requests_in_turn(worker):
+    res = worker.request({"type": "archive_ids", "urls": []}, timeout=60)
+    assert res["type"] == "result" and res["ok"] and res["ids"] == []
+    res = worker.request({"type": "nope"}, timeout=60)
+    assert not res["ok"] and "unknown request" in res["error"]
+    assert worker.busy_with is None and worker.jobs == 2
+
+
+def test_request_cancelled_before_it_was_sent_is_cancelled(worker):
+    res = worker.request({"type": "probe", "url": DEAD_URL, "opts": {"quiet": True}}, timeout=60,
+                         cancelled=lambda: True)
+    assert res["cancelled"] and not res["ok"]
+
+    res = worker.request({"type": "probe", "url": DEAD_URL, "opts": {"quiet": True}}, timeout=60)
+    assert not res["cancelled"] and not res["ok"]
+
+
+def test_dead_worker_raises(worker):
+    worker.kill()
+    worker.proc.wait()
+    with pytest.raises(worker_mod.WorkerError):
+        worker.request({"type": "archive_ids", "urls": []}, timeout=60)
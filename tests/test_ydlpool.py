@@ -0,0 +1,64 @@
+from app.ydlpool import YdlPool
+
+MP3_OPTS = {
+    "quiet": True,
+    "format": "ba",
+    "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "mp3"}],
+}
+
+
+def _hooks_by_pp(ydl):
+    # A fresh YoutubeDL may register a hook twice; what matters is which ones reach each postprocessor
+    return {
+        pp.pp_key(): {h for h in pp._progress_hooks if h != pp.report_progress}
+        for pps in ydl._pps.values()
+        for pp in pps
+    }
+
+
+def test_pooled_instance_gives_prebuilt_postprocessors_the_job_hooks():
+    import yt_dlp
+
+    first, second = [], []
+    pool = YdlPool()
+    with pool.borrow(dict(MP3_OPTS, postprocessor_hooks=[first.append])) as ydl:
+        pooled_id = id(ydl)
+    with pool.borrow(dict(MP3_OPTS, postprocessor_hooks=[second.append])) as ydl:
+        assert id(ydl) == pooled_id  # reused, not rebuilt
+        pooled = _hooks_by_pp(ydl)
+
+    fresh_ydl = yt_dlp.YoutubeDL(dict(MP3_OPTS, postprocessor_hooks=[second.append]))
+    fresh = _hooks_by_pp(fresh_ydl)
+
+    assert pooled == fresh
+    assert pooled["ExtractAudio"] == {second.append}
+
+
+def test_returned_instance_drops_the_job_hooks():
+    hooks = []
+    pool = YdlPool()
+    with pool.borrow(dict(MP3_OPTS, postprocessor_hooks=[hooks.append])) as ydl:
+        pass
+    assert ydl._postprocessor_hooks == []
+    assert all(not hs for hs in _hooks_by_pp(ydl).values())
+
+
+def test_pooled_instances_see_ids_archived_by_others(tmp_path):
+    archive = tmp_path / "archive.txt"
+    archive.write_text("youtube seen\n")
+    opts = {"quiet": True, "download_archive": str(archive)}
+    video = {"id": "new", "extractor_key": "Youtube", "extractor": "youtube"}
+
+    pool = YdlPool()
+    with pool.borrow(opts) as a, pool.borrow(opts) as b:
+        assert a is not b
+        a.record_download_archive(video)
+        assert a.in_download_archive(video)
+    # b was built before the id was recorded; it must not download it again
+    with pool.borrow(opts) as ydl, pool.borrow(opts) as other:
+        assert ydl.in_download_archive(video) and other.in_download_archive(video)
+
+    with archive.open("a") as f:
+        f.write("youtube fromworker\n")  # e.g. written by a worker process
+    with pool.borrow(opts) as ydl:
+        assert ydl.in_download_archive({"id": "fromworker", "extractor_key": "Youtube"})